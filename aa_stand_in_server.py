@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Local Account Aggregator stand-in for offline integration tests and benchmarks
+
+Implements the consent and FI fetch endpoints AAClient talks to, serving
+seeded synthetic transactions with configurable latency, error rate and
+payload size. Point the client at it with:
+
+    python aa_stand_in_server.py
+    AA_BASE_URL=http://127.0.0.1:8010 AA_USE_MOCK_DATA=false python run_app.py
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+import uvicorn
+from datetime import date
+from typing import Dict, List, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from app.services.fi_decryption import encrypt_fi_data, generate_key_pair, key_material, NONCE_SIZE
+from app.synthetic_data import SyntheticBankDataGenerator
+
+class DataRange(BaseModel):
+    # "from" is a keyword, so the wire names come in through aliases
+    start: date = Field(date(2024, 1, 1), alias="from")
+    end: date = Field(date(2024, 12, 31), alias="to")
+
+    model_config = {"populate_by_name": True}
+
+class FIRequest(BaseModel):
+    KeyMaterial: Dict
+
+class ConsentRequest(BaseModel):
+    userId: str
+    accounts: List[str] = []
+    dataRange: DataRange = DataRange()
+
+def _account_for_user(user_id: str) -> str:
+    return str(int(hashlib.sha256(user_id.encode("utf-8")).hexdigest(), 16) % 10 ** 14).zfill(14)
+
+def create_app(latency_ms: Optional[float] = None, latency_jitter_ms: Optional[float] = None,
+               error_rate: Optional[float] = None, transactions_per_account: Optional[int] = None,
+               approval_seconds: Optional[float] = None, seed: Optional[int] = None) -> FastAPI:
+    """Build the stand-in app; unset options come from AA_STANDIN_* env vars"""
+    config = {
+        "latency_ms": latency_ms if latency_ms is not None else float(os.getenv("AA_STANDIN_LATENCY_MS", "50")),
+        "latency_jitter_ms": latency_jitter_ms if latency_jitter_ms is not None
+        else float(os.getenv("AA_STANDIN_LATENCY_JITTER_MS", "20")),
+        "error_rate": error_rate if error_rate is not None else float(os.getenv("AA_STANDIN_ERROR_RATE", "0")),
+        "transactions_per_account": transactions_per_account if transactions_per_account is not None
+        else int(os.getenv("AA_STANDIN_TRANSACTIONS", "200")),
+        "approval_seconds": approval_seconds if approval_seconds is not None
+        else float(os.getenv("AA_STANDIN_APPROVAL_SECONDS", "1")),
+    }
+    generator = SyntheticBankDataGenerator(seed=seed if seed is not None else int(os.getenv("AA_STANDIN_SEED", "42")))
+    # Key pair of the simulated FIP that encrypts FI data
+    fip_private_key, fip_public_key = generate_key_pair()
+    consents: Dict[str, Dict] = {}
+    stats = {"requests": 0, "injected_errors": 0}
+
+    app = FastAPI(title="Account Aggregator stand-in")
+    app.state.config = config
+    app.state.consents = consents
+    app.state.stats = stats
+
+    @app.middleware("http")
+    async def simulate_network(request, call_next):
+        stats["requests"] += 1
+        delay = config["latency_ms"] + random.uniform(-1, 1) * config["latency_jitter_ms"]
+        await asyncio.sleep(max(0.0, delay) / 1000)
+        if random.random() < config["error_rate"]:
+            stats["injected_errors"] += 1
+            return JSONResponse(status_code=503, content={"error": "Injected failure"})
+        return await call_next(request)
+
+    def _consent(consent_id: str) -> Dict:
+        consent = consents.get(consent_id)
+        if consent is None:
+            raise HTTPException(status_code=404, detail="Consent not found")
+        if consent["status"] == "PENDING" and time.monotonic() >= consent["approve_at"]:
+            consent["status"] = "ACTIVE"
+        return consent
+
+    @app.post("/consent")
+    async def create_consent(request: ConsentRequest):
+        consent_id = str(uuid.uuid4())
+        consents[consent_id] = {
+            "id": consent_id,
+            "userId": request.userId,
+            "accounts": request.accounts or [_account_for_user(request.userId)],
+            "dataRange": request.dataRange,
+            "status": "PENDING",
+            "approve_at": time.monotonic() + config["approval_seconds"]
+        }
+        return {"id": consent_id, "status": "PENDING"}
+
+    @app.get("/consent/{consent_id}/status")
+    async def consent_status(consent_id: str):
+        consent = _consent(consent_id)
+        return {"id": consent_id, "status": consent["status"]}
+
+    @app.post("/consent/{consent_id}/approve")
+    async def approve_consent(consent_id: str):
+        consent = _consent(consent_id)
+        consent["status"] = "ACTIVE"
+        return {"id": consent_id, "status": consent["status"]}
+
+    @app.post("/consent/{consent_id}/reject")
+    async def reject_consent(consent_id: str):
+        consent = _consent(consent_id)
+        consent["status"] = "REJECTED"
+        return {"id": consent_id, "status": consent["status"]}
+
+    def _active_consent(consent_id: str) -> Dict:
+        consent = _consent(consent_id)
+        if consent["status"] != "ACTIVE":
+            raise HTTPException(status_code=403, detail=f"Consent is {consent['status']}")
+        return consent
+
+    def _account_records(consent: Dict, account_number: str, per_account: Optional[int]):
+        data_range = consent["dataRange"]
+        days = (data_range.end - data_range.start).days + 1
+        count = per_account if per_account is not None else config["transactions_per_account"]
+        return generator.account_transactions(account_number, count, data_range.end, days)
+
+    @app.get("/fi/fetch/{consent_id}")
+    async def fetch_fi_data(consent_id: str, transactions: Optional[int] = None):
+        consent = _active_consent(consent_id)
+
+        def items():
+            for account_number in consent["accounts"]:
+                for record in _account_records(consent, account_number, transactions):
+                    yield json.dumps({
+                        "date": record["timestamp"].isoformat(),
+                        "amount": record["amount"],
+                        "description": record["description"],
+                        "type": record["type"],
+                        "account": account_number
+                    })
+
+        def body():
+            yield f'{{"consentId": "{consent_id}", "transactions": ['.encode()
+            # Written in batches; one write per item makes the server the bottleneck
+            separator, batch = "", []
+            for item in items():
+                batch.append(item)
+                if len(batch) == 500:
+                    yield (separator + ",".join(batch)).encode()
+                    separator, batch = ",", []
+            if batch:
+                yield (separator + ",".join(batch)).encode()
+            yield b"]}"
+
+        return StreamingResponse(body(), media_type="application/json")
+
+    @app.post("/fi/fetch/{consent_id}")
+    async def fetch_encrypted_fi_data(consent_id: str, request: FIRequest, transactions: Optional[int] = None):
+        """FI data encrypted per account for the key material sent by the FIU"""
+        consent = _active_consent(consent_id)
+        nonce = os.urandom(NONCE_SIZE)
+
+        def encrypted_account(account_number: str) -> Dict:
+            fi_account = {
+                "maskedAccNumber": f"XXXXXXXX{account_number[-4:]}",
+                "Transactions": {"Transaction": [
+                    {
+                        "txnId": f"{account_number}-{i}",
+                        "type": record["type"].upper(),
+                        "mode": "UPI",
+                        "amount": f"{abs(record['amount']):.2f}",
+                        "transactionTimestamp": record["timestamp"].isoformat() + "+05:30",
+                        "narration": record["description"]
+                    }
+                    for i, record in enumerate(_account_records(consent, account_number, transactions))
+                ]}
+            }
+            return {
+                "linkRefNumber": account_number,
+                "maskedAccNumber": fi_account["maskedAccNumber"],
+                "encryptedFI": encrypt_fi_data(
+                    json.dumps(fi_account).encode(), fip_private_key, nonce, request.KeyMaterial
+                )
+            }
+
+        def body():
+            header = {"ver": "1.1.2", "txnid": str(uuid.uuid4()), "consentId": consent_id}
+            yield (json.dumps(header)[:-1] + ', "FI": [{"fipID": "STANDIN-FIP", "KeyMaterial": '
+                   + json.dumps(key_material(fip_public_key, nonce)) + ', "data": [').encode()
+            for i, account_number in enumerate(consent["accounts"]):
+                yield (("," if i else "") + json.dumps(encrypted_account(account_number))).encode()
+            yield b"]}]}"
+
+        return StreamingResponse(body(), media_type="application/json")
+
+    @app.get("/stats")
+    async def get_stats():
+        return {**stats, "consents": len(consents), "config": config}
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("AA_STANDIN_PORT", "8010")))
@@ -0,0 +1,85 @@
+import re
+import threading
+import uuid
+from typing import Dict, List, Optional
+import pandas as pd
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ARTIFACT_PREFIX = "artifact://"
+ARTIFACT_HANDLE_PATTERN = re.compile(r"artifact://[A-Za-z0-9_\-/]+")
+
+class ArtifactStore:
+    """In-process store for DataFrames exchanged between crew tools during a run.
+
+    Tools hand each other a short ``artifact://`` handle instead of serializing
+    whole tables into the agent conversation, so rows are never re-parsed and
+    the LLM only ever sees a compact summary.
+    """
+
+    def __init__(self):
+        self._artifacts: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def put(self, df: pd.DataFrame, kind: str = "table", handle: Optional[str] = None) -> str:
+        """Store a DataFrame and return its handle"""
+        handle = handle or f"{ARTIFACT_PREFIX}{kind}/{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._artifacts[handle] = df
+        logger.debug(f"Stored artifact {handle} with {len(df)} rows")
+        return handle
+
+    def get(self, handle: str) -> Optional[pd.DataFrame]:
+        """Return the DataFrame for a handle, or None if it is unknown"""
+        with self._lock:
+            return self._artifacts.get(handle)
+
+    def resolve(self, text: str) -> Optional[pd.DataFrame]:
+        """Find the first known artifact handle mentioned in free text"""
+        for handle in ARTIFACT_HANDLE_PATTERN.findall(text or ""):
+            df = self.get(handle)
+            if df is not None:
+                return df
+        return None
+
+    def summarize(self, handle: str, top_n: int = 5) -> Dict:
+        """Build a compact, LLM-friendly summary of a stored transaction table"""
+        df = self.get(handle)
+        if df is None:
+            return {"error": f"Unknown artifact {handle}"}
+
+        summary = {
+            "artifact": handle,
+            "rows": int(len(df)),
+            "columns": list(df.columns)
+        }
+        if df.empty:
+            return summary
+
+        if 'date' in df.columns:
+            summary["date_range"] = [str(df['date'].min()), str(df['date'].max())]
+        if {'type', 'amount'}.issubset(df.columns):
+            totals = df.groupby('type')['amount'].sum()
+            summary["totals_by_type"] = {k: float(v) for k, v in totals.items()}
+        if {'category', 'amount'}.issubset(df.columns):
+            by_category = df.groupby('category')['amount'].agg(['count', 'sum'])
+            by_category = by_category.sort_values('sum', ascending=False).head(top_n)
+            summary["top_categories"] = [
+                {"category": cat, "count": int(row['count']), "amount": float(row['sum'])}
+                for cat, row in by_category.iterrows()
+            ]
+        return summary
+
+    def handles(self) -> List[str]:
+        with self._lock:
+            return list(self._artifacts.keys())
+
+    def clear(self) -> None:
+        """Drop all artifacts, typically at the end of a crew run"""
+        with self._lock:
+            self._artifacts.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._artifacts)
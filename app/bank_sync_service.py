@@ -1,15 +1,74 @@
+import asyncio
+import hashlib
 import json
+import os
 import random
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from app.fiu_models import BankAccount, Transaction, SessionLocal
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.fiu_models import BankAccount, Transaction, User, SyncWatermark, SessionLocal
 import uuid
 
+SYNC_DESCRIPTION_SUFFIX = " - Synced from bank"
+INSERT_BATCH_SIZE = 1000
+SYNC_MODES = ("incremental", "full")
+# INSERT ... ON CONFLICT DO NOTHING constructs by dialect; others pre-filter existing fingerprints
+ON_CONFLICT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+def transaction_fingerprint(account_number: str, timestamp: datetime, amount: float, description: str) -> str:
+    """Deterministic identity of a bank transaction used for sync dedupe.
+    
+    `amount` is signed (credits positive, debits negative), so a debit and its
+    reversal at the same time are distinct transactions.
+    """
+    normalized = " ".join(description.upper().split())
+    payload = f"{account_number}|{timestamp.isoformat(timespec='seconds')}|{amount:.2f}|{normalized}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def normalize_bank_record(record: Dict, account_number: str, user_pk: int) -> Dict:
+    """Turn a raw bank record into a transactions table row"""
+    tx_type = record["type"]
+    signed_amount = abs(record["amount"]) if tx_type == "credit" else -abs(record["amount"])
+    return {
+        "transaction_id": str(uuid.uuid4()),
+        "user_id": user_pk,
+        "from_account": account_number if tx_type == "debit" else "EXTERNAL",
+        "to_account": "EXTERNAL" if tx_type == "debit" else account_number,
+        "amount": abs(record["amount"]),
+        "transaction_type": tx_type,
+        "category": "income" if tx_type == "credit" else "expense",
+        "description": f"{record['description']}{SYNC_DESCRIPTION_SUFFIX}",
+        "status": "completed",
+        "masumi_tx_hash": str(uuid.uuid4()),
+        "created_at": record["timestamp"],
+        "fingerprint": transaction_fingerprint(
+            account_number, record["timestamp"], signed_amount, record["description"]
+        )
+    }
+
 class BankSyncService:
     """Service to sync bank account data and transactions"""
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = None, per_bank_concurrency: int = None, data_source=None):
+        # Limits for concurrent multi-account syncs
+        self.max_concurrency = max_concurrency or int(os.getenv("SYNC_MAX_CONCURRENCY", "8"))
+        self.per_bank_concurrency = per_bank_concurrency or int(os.getenv("SYNC_PER_BANK_CONCURRENCY", "2"))
+        # Incremental sync re-reads this much history before the watermark for late-posted items
+        self.overlap_hours = int(os.getenv("SYNC_OVERLAP_HOURS", "24"))
+        # Chunks buffered between a streaming download and the inserter
+        self.stream_queue_size = int(os.getenv("SYNC_STREAM_QUEUE_SIZE", "4"))
+        # Anything with fetch_transactions(account_number, window_start, window_end), e.g. the synthetic generator
+        if data_source is None and os.getenv("SYNC_DATA_SOURCE", "mock") == "synthetic":
+            from app.synthetic_data import SyntheticBankDataGenerator
+            data_source = SyntheticBankDataGenerator(seed=int(os.getenv("SYNTHETIC_SEED", "42")),
+                                                     daily_rate=float(os.getenv("SYNTHETIC_DAILY_RATE", "3.0")))
+        self.data_source = data_source
+        self.source_name = getattr(data_source, "source_name", "mock_bank")
         self.mock_transactions = [
             {"desc": "SALARY CREDIT", "amount": 50000, "type": "credit", "category": "salary"},
             {"desc": "ATM WITHDRAWAL", "amount": -5000, "type": "debit", "category": "cash"},
@@ -36,24 +95,9 @@ class BankSyncService:
             if not account:
                 return {"error": "Account not found"}
             
-            # Simulate fetching balance from bank API
-            # In real implementation, this would call actual bank APIs
-            mock_balance = random.uniform(10000, 100000)
-            
-            old_balance = account.balance
-            account.balance = mock_balance
-            account.last_sync = datetime.utcnow()
-            account.is_synced = True
-            
+            result = self._reconcile_balance(account, self._fetch_bank_balance(account))
             db.commit()
-            
-            return {
-                "success": True,
-                "account_number": account.account_number,
-                "old_balance": old_balance,
-                "new_balance": mock_balance,
-                "sync_time": account.last_sync.isoformat()
-            }
+            return result
             
         except Exception as e:
             db.rollback()
@@ -61,63 +105,55 @@ class BankSyncService:
         finally:
             db.close()
     
-    def sync_transactions(self, account_id: int, days: int = 30) -> Dict:
-        """Sync transactions from bank for specified days"""
+    def _fetch_bank_balance(self, account: BankAccount) -> float:
+        """Fetch the balance the bank reports for an account"""
+        if hasattr(self.data_source, "fetch_balance"):
+            return self.data_source.fetch_balance(account.account_number)
+        # Simulate fetching balance from bank API
+        # In real implementation, this would call actual bank APIs
+        return random.uniform(10000, 100000)
+    
+    def _reconcile_balance(self, account: BankAccount, bank_balance: float, net_change: float = None) -> Dict:
+        """Apply the bank-reported balance to the account without committing"""
+        old_balance = account.balance
+        account.balance = bank_balance
+        account.last_sync = datetime.utcnow()
+        account.is_synced = True
+        
+        result = {
+            "success": True,
+            "account_number": account.account_number,
+            "old_balance": old_balance,
+            "new_balance": bank_balance,
+            "sync_time": account.last_sync.isoformat()
+        }
+        if net_change is not None:
+            # Difference between the bank's movement and what the new transactions explain
+            result["net_change"] = round(net_change, 2)
+            result["unexplained_change"] = round(bank_balance - (old_balance or 0.0) - net_change, 2)
+        return result
+    
+    def sync_transactions(self, account_id: int, days: int = 30, mode: str = "incremental") -> Dict:
+        """Sync transactions from bank.
+        
+        In incremental mode only data after the account's watermark for this
+        source is requested, re-reading a bounded overlap window to pick up
+        late-posted items; `days` only applies before the first sync. Full
+        mode re-requests the last `days` days.
+        """
+        if mode not in SYNC_MODES:
+            return {"error": f"Invalid sync mode '{mode}'. Use one of: {', '.join(SYNC_MODES)}"}
+        
         db = SessionLocal()
         try:
             account = db.query(BankAccount).filter(BankAccount.id == account_id).first()
             if not account:
                 return {"error": "Account not found"}
             
-            # Generate mock transactions for the specified period
-            synced_transactions = []
-            start_date = datetime.now() - timedelta(days=days)
-            
-            # Generate 5-15 random transactions
-            num_transactions = random.randint(5, 15)
-            
-            for i in range(num_transactions):
-                # Random date within the period
-                random_date = start_date + timedelta(
-                    days=random.randint(0, days),
-                    hours=random.randint(0, 23),
-                    minutes=random.randint(0, 59)
-                )
-                
-                # Random transaction from mock data
-                mock_tx = random.choice(self.mock_transactions)
-                
-                # Check if similar transaction already exists
-                existing_tx = db.query(Transaction).filter(
-                    Transaction.user_id == account.user_id,
-                    Transaction.description.contains(mock_tx["desc"][:10]),
-                    Transaction.created_at >= start_date
-                ).first()
-                
-                if existing_tx:
-                    continue  # Skip if similar transaction exists
-                
-                # Create transaction
-                transaction = Transaction(
-                    user_id=account.user_id,
-                    from_account=account.account_number if mock_tx["type"] == "debit" else "EXTERNAL",
-                    to_account="EXTERNAL" if mock_tx["type"] == "debit" else account.account_number,
-                    amount=abs(mock_tx["amount"]),
-                    transaction_type=mock_tx["type"],
-                    category="income" if mock_tx["type"] == "credit" else "expense",
-                    description=f"{mock_tx['desc']} - Synced from bank",
-                    status="completed",
-                    masumi_tx_hash=str(uuid.uuid4()),
-                    created_at=random_date
-                )
-                
-                db.add(transaction)
-                synced_transactions.append({
-                    "description": transaction.description,
-                    "amount": transaction.amount,
-                    "type": transaction.transaction_type,
-                    "date": transaction.created_at.isoformat()
-                })
+            window_start, window_end, watermark = self._sync_window(db, account, days, mode)
+            rows = self._fetch_bank_transactions(account, window_start, window_end)
+            synced_transactions = self._insert_new_transactions(db, rows)
+            self._advance_watermark(db, account, watermark, window_end)
             
             # Update account sync status
             account.last_sync = datetime.utcnow()
@@ -125,13 +161,7 @@ class BankSyncService:
             
             db.commit()
             
-            return {
-                "success": True,
-                "account_number": account.account_number,
-                "synced_count": len(synced_transactions),
-                "transactions": synced_transactions,
-                "sync_time": account.last_sync.isoformat()
-            }
+            return self._transactions_result(account, mode, window_start, window_end, rows, synced_transactions)
             
         except Exception as e:
             db.rollback()
@@ -139,11 +169,193 @@ class BankSyncService:
         finally:
             db.close()
     
+    def _sync_window(self, db: Session, account: BankAccount, days: int, mode: str):
+        """Work out the (start, end) window to request and the account's watermark row"""
+        window_end = datetime.utcnow()
+        # Full windows are anchored to midnight so replaying the same bank data yields the same timestamps
+        window_start = (window_end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        watermark = db.query(SyncWatermark).filter(
+            SyncWatermark.account_id == account.id,
+            SyncWatermark.source == self.source_name
+        ).first()
+        if mode == "incremental" and watermark and watermark.watermark:
+            # Not clamped to `days`: a stale watermark must still be read from, or the gap is skipped for good
+            window_start = watermark.watermark - timedelta(hours=self.overlap_hours)
+        return window_start, window_end, watermark
+    
+    def _advance_watermark(self, db: Session, account: BankAccount, watermark, window_end: datetime) -> None:
+        """Advance the watermark to the end of the window we just read"""
+        if watermark is None:
+            watermark = SyncWatermark(account_id=account.id, source=self.source_name)
+            db.add(watermark)
+        watermark.watermark = window_end
+        watermark.updated_at = datetime.utcnow()
+    
+    def _transactions_result(self, account: BankAccount, mode: str, window_start: datetime,
+                             window_end: datetime, rows: List[Dict], synced_transactions: List[Dict]) -> Dict:
+        return {
+            "success": True,
+            "account_number": account.account_number,
+            "mode": mode,
+            "window_start": window_start.isoformat(),
+            "watermark": window_end.isoformat(),
+            "fetched_count": len(rows),
+            "synced_count": len(synced_transactions),
+            "transactions": synced_transactions,
+            "sync_time": account.last_sync.isoformat()
+        }
+    
+    def _fetch_bank_transactions(self, account: BankAccount, window_start: datetime,
+                                 window_end: datetime) -> List[Dict]:
+        """Fetch and normalize the bank's transactions posted within a window"""
+        records = self._fetch_bank_records(account, window_start, window_end)
+        return [normalize_bank_record(r, account.account_number, account.user_id) for r in records]
+    
+    def _fetch_bank_records(self, account: BankAccount, window_start: datetime,
+                            window_end: datetime) -> List[Dict]:
+        """Raw bank records posted within a window"""
+        if self.data_source is not None:
+            return self.data_source.fetch_transactions(account.account_number, window_start, window_end)
+        return self._mock_bank_records(window_start, window_end)
+    
+    def _mock_bank_records(self, window_start: datetime, window_end: datetime) -> List[Dict]:
+        window_days = max(1, (window_end - window_start).days + 1)
+        
+        # Simulate the bank's posting rate: 5-15 transactions per 30 days
+        num_transactions = round(random.randint(5, 15) * window_days / 30)
+        
+        records = []
+        for i in range(num_transactions):
+            # Random date within the period
+            random_date = window_start + timedelta(
+                days=random.randint(0, window_days - 1),
+                hours=random.randint(0, 23),
+                minutes=random.randint(0, 59)
+            )
+            if random_date > window_end:
+                continue  # Not posted yet
+            
+            # Random transaction from mock data
+            mock_tx = random.choice(self.mock_transactions)
+            records.append({
+                "timestamp": random_date,
+                "description": mock_tx["desc"],
+                "type": mock_tx["type"],
+                "amount": mock_tx["amount"]
+            })
+        return records
+    
+    def _insert_new_transactions(self, db: Session, rows: List[Dict]) -> List[Dict]:
+        """Bulk insert rows, skipping any whose fingerprint already exists"""
+        # Collapse duplicates within the batch itself
+        rows = list({row["fingerprint"]: row for row in rows}.values())
+        inserted = set()
+        on_conflict_insert = ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+        
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(rows), INSERT_BATCH_SIZE):
+            chunk = rows[i:i + INSERT_BATCH_SIZE]
+            if on_conflict_insert is not None:
+                stmt = (
+                    on_conflict_insert(Transaction)
+                    .values(chunk)
+                    .on_conflict_do_nothing(index_elements=["fingerprint"])
+                    .returning(Transaction.fingerprint)
+                )
+                inserted.update(row[0] for row in db.execute(stmt))
+                continue
+            existing = {
+                row[0] for row in db.query(Transaction.fingerprint)
+                .filter(Transaction.fingerprint.in_([row["fingerprint"] for row in chunk]))
+            }
+            new_rows = [row for row in chunk if row["fingerprint"] not in existing]
+            if new_rows:
+                db.execute(insert(Transaction), new_rows)
+                inserted.update(row["fingerprint"] for row in new_rows)
+        
+        return [
+            {
+                "description": row["description"],
+                "amount": row["amount"],
+                "type": row["transaction_type"],
+                "date": row["created_at"].isoformat()
+            }
+            for row in rows if row["fingerprint"] in inserted
+        ]
+    
+    async def ingest_stream(self, account_id: int, chunks: AsyncIterator[List[Dict]]) -> Dict:
+        """Bulk insert chunks of raw bank records while they are still being downloaded.
+        
+        A bounded queue sits between the download and the inserter, so at most
+        a few chunks are held in memory and a slow DB throttles the download.
+        Each chunk commits on its own; fingerprint dedupe makes a retried
+        stream idempotent.
+        """
+        db = SessionLocal()
+        try:
+            account = db.query(BankAccount).filter(BankAccount.id == account_id).first()
+            if not account:
+                return {"error": "Account not found"}
+            account_number, user_pk = account.account_number, account.user_id
+        finally:
+            db.close()
+        
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.stream_queue_size)
+        download_error = None
+        
+        async def download():
+            nonlocal download_error
+            try:
+                async for chunk in chunks:
+                    await queue.put(chunk)
+            except Exception as e:
+                download_error = e
+            await queue.put(None)
+        
+        started = time.perf_counter()
+        downloader = asyncio.create_task(download())
+        fetched = synced = chunk_count = 0
+        try:
+            while (chunk := await queue.get()) is not None:
+                chunk_count += 1
+                fetched += len(chunk)
+                synced += await asyncio.to_thread(self._insert_record_chunk, account_id, account_number, user_pk, chunk)
+        except Exception as e:
+            downloader.cancel()
+            download_error = e
+        
+        result = {
+            "account_number": account_number,
+            "chunks": chunk_count,
+            "fetched_count": fetched,
+            "synced_count": synced,
+            "duration_seconds": round(time.perf_counter() - started, 4)
+        }
+        if download_error is not None:
+            return {"error": str(download_error), **result}
+        return {"success": True, **result}
+    
+    def _insert_record_chunk(self, account_id: int, account_number: str, user_pk: int, records: List[Dict]) -> int:
+        db = SessionLocal()
+        try:
+            rows = [normalize_bank_record(r, account_number, user_pk) for r in records]
+            synced = self._insert_new_transactions(db, rows)
+            db.query(BankAccount).filter(BankAccount.id == account_id).update(
+                {"last_sync": datetime.utcnow(), "is_synced": True}
+            )
+            db.commit()
+            return len(synced)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
     def get_sync_status(self, user_id: str) -> Dict:
         """Get sync status for all user accounts"""
         db = SessionLocal()
         try:
-            from app.fiu_models import User
             user = db.query(User).filter(User.user_id == user_id).first()
             if not user:
                 return {"error": "User not found"}
@@ -169,21 +381,139 @@ class BankSyncService:
         finally:
             db.close()
     
-    def full_account_sync(self, account_id: int) -> Dict:
-        """Perform full sync - balance and transactions"""
-        # Sync balance first
-        balance_result = self.sync_account_balance(account_id)
-        if not balance_result.get("success"):
-            return balance_result
+    def full_account_sync(self, account_id: int, mode: str = "incremental", days: int = 30) -> Dict:
+        """Perform full sync - balance and transactions.
+        
+        Runs as one pipeline in a single session and transaction: fetch,
+        normalize, dedupe and bulk insert, balance reconciliation, then the
+        last_sync update. A failure at any stage rolls back everything, so the
+        balance is never updated without its transactions. Per-stage timings
+        are reported in milliseconds.
+        """
+        if mode not in SYNC_MODES:
+            return {"error": f"Invalid sync mode '{mode}'. Use one of: {', '.join(SYNC_MODES)}"}
+        
+        timings = {}
+        started = stage_started = time.perf_counter()
+        
+        def mark(stage: str) -> None:
+            nonlocal stage_started
+            now = time.perf_counter()
+            timings[f"{stage}_ms"] = round((now - stage_started) * 1000, 3)
+            stage_started = now
         
-        # Then sync transactions
-        transactions_result = self.sync_transactions(account_id)
-        if not transactions_result.get("success"):
-            return transactions_result
+        db = SessionLocal()
+        try:
+            account = db.query(BankAccount).filter(BankAccount.id == account_id).first()
+            if not account:
+                return {"error": "Account not found"}
+            window_start, window_end, watermark = self._sync_window(db, account, days, mode)
+            mark("load")
+            
+            records = self._fetch_bank_records(account, window_start, window_end)
+            bank_balance = self._fetch_bank_balance(account)
+            mark("fetch")
+            
+            rows = [normalize_bank_record(r, account.account_number, account.user_id) for r in records]
+            mark("normalize")
+            
+            synced_transactions = self._insert_new_transactions(db, rows)
+            mark("insert")
+            
+            net_change = sum(
+                tx["amount"] if tx["type"] == "credit" else -tx["amount"] for tx in synced_transactions
+            )
+            balance_result = self._reconcile_balance(account, bank_balance, net_change)
+            mark("reconcile")
+            
+            # Watermark and last_sync land in the same commit as the data they describe
+            self._advance_watermark(db, account, watermark, window_end)
+            account.last_sync = datetime.utcnow()
+            account.is_synced = True
+            # Built before commit so reading the account does not trigger a refresh query
+            transactions_result = self._transactions_result(
+                account, mode, window_start, window_end, rows, synced_transactions
+            )
+            db.commit()
+            mark("commit")
+            
+        except Exception as e:
+            db.rollback()
+            return {"error": str(e)}
+        finally:
+            db.close()
         
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
         return {
             "success": True,
             "message": "Full account sync completed",
             "balance_sync": balance_result,
-            "transactions_sync": transactions_result
-        }
\ No newline at end of file
+            "transactions_sync": transactions_result,
+            "timings": timings
+        }
+    
+    async def sync_user_accounts(self, user_id: str) -> Dict:
+        """Sync all accounts of one user concurrently"""
+        result = await self.sync_users([user_id])
+        if result.get("missing_users"):
+            return {"error": "User not found"}
+        return result
+    
+    async def sync_users(self, user_ids: List[str]) -> Dict:
+        """Sync all accounts of a batch of users with bounded parallelism.
+        
+        Accounts run concurrently under a global semaphore plus a per-bank cap,
+        so wall time is bounded by the slowest account rather than the sum. The
+        per-bank slot is taken first, so accounts queued behind a throttled bank
+        never hold global slots that other banks could use.
+        """
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(User.user_id, BankAccount.id, BankAccount.bank_name)
+                .join(BankAccount, BankAccount.user_id == User.id)
+                .filter(User.user_id.in_(user_ids))
+                .all()
+            )
+            known_users = {
+                row[0] for row in db.query(User.user_id).filter(User.user_id.in_(user_ids)).all()
+            }
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            db.close()
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        bank_semaphores = defaultdict(lambda: asyncio.Semaphore(self.per_bank_concurrency))
+        
+        async def sync_one(user_id: str, account_id: int, bank_name: str) -> Dict:
+            async with bank_semaphores[bank_name], semaphore:
+                started = time.perf_counter()
+                try:
+                    result = await asyncio.to_thread(self.full_account_sync, account_id)
+                except Exception as e:
+                    result = {"error": str(e)}
+                result.update({
+                    "user_id": user_id,
+                    "account_id": account_id,
+                    "bank_name": bank_name,
+                    "duration_seconds": round(time.perf_counter() - started, 4)
+                })
+                return result
+        
+        started = time.perf_counter()
+        results = await asyncio.gather(*(sync_one(*row) for row in rows))
+        failed = [r for r in results if not r.get("success")]
+        
+        return {
+            "success": not failed,
+            "users": sorted(known_users),
+            "missing_users": [uid for uid in user_ids if uid not in known_users],
+            "accounts_synced": len(results) - len(failed),
+            "accounts_failed": len(failed),
+            "transactions_synced": sum(
+                r.get("transactions_sync", {}).get("synced_count", 0) for r in results if r.get("success")
+            ),
+            "wall_time_seconds": round(time.perf_counter() - started, 4),
+            "accounts": results
+        }
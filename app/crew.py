@@ -1,60 +1,143 @@
 from crewai import Agent, Crew, Task, Process
 from crewai.tools import BaseTool
 import pandas as pd
+import asyncio
 import json
+import os
 import re
-from typing import Dict, List
+import threading
+from typing import Dict, List, Optional
+from app.artifact_store import ArtifactStore, ARTIFACT_HANDLE_PATTERN, ARTIFACT_PREFIX
+from app.crew_cache import CrewCache, make_cache_key
 from logging_config import get_logger
 
 logger = get_logger(__name__)
 
+CATEGORY_RULES = {
+    'Income': ['salary', 'bonus', 'interest', 'dividend'],
+    'Groceries': ['grocery', 'supermarket', 'vegetables', 'fruits'],
+    'Utilities': ['electricity', 'water', 'gas', 'internet', 'phone'],
+    'Rent/Mortgage': ['rent', 'mortgage', 'housing'],
+    'EMI': ['emi', 'loan', 'credit card'],
+    'Transport': ['uber', 'ola', 'petrol', 'fuel', 'bus', 'metro'],
+    'Dining Out': ['zomato', 'swiggy', 'restaurant', 'food'],
+    'Shopping': ['shopping', 'mall', 'amazon', 'flipkart'],
+    'Entertainment': ['movie', 'cinema', 'netflix', 'spotify', 'games'],
+    'Subscriptions': ['subscription', 'netflix', 'spotify', 'prime'],
+    'Miscellaneous': []
+}
+
+def categorize_transactions(transactions: List[Dict]) -> pd.DataFrame:
+    """Categorize raw transactions into a DataFrame of budget categories"""
+    categorized = []
+    
+    for txn in transactions:
+        description = txn['description'].lower()
+        category = 'Miscellaneous'
+        
+        for cat, keywords in CATEGORY_RULES.items():
+            if any(keyword in description for keyword in keywords):
+                category = cat
+                break
+        
+        # Special handling for income
+        if txn['type'] == 'credit' and txn['amount'] > 10000:
+            category = 'Income'
+        
+        categorized.append({
+            'date': txn['date'],
+            'amount': abs(txn['amount']),
+            'description': txn['description'],
+            'category': category,
+            'type': txn['type']
+        })
+    
+    df = pd.DataFrame(categorized, columns=['date', 'amount', 'description', 'category', 'type'])
+    # An empty frame would otherwise default to object dtype and break the aggregations
+    return df.astype({'amount': float}) if df.empty else df
+
+def analyze_categorized_frame(df: pd.DataFrame) -> Dict:
+    """Calculate key financial metrics from categorized transactions"""
+    income = df[df['type'] == 'credit']['amount'].sum()
+    expenses = df[df['type'] == 'debit']['amount'].sum()
+    savings_rate = ((income - expenses) / income * 100) if income > 0 else 0
+    
+    # Category breakdown
+    expense_breakdown = df[df['type'] == 'debit'].groupby('category')['amount'].sum()
+    expense_percentages = (expense_breakdown / expenses * 100).round(2)
+    
+    # Recurring payments (simplified detection)
+    recurring = df[df['category'].isin(['Subscriptions', 'Utilities', 'Rent/Mortgage'])]
+    
+    # Top expenses
+    top_expenses = df[df['type'] == 'debit'].nlargest(5, 'amount')[['description', 'amount', 'category']]
+    
+    return {
+        'total_income': float(income),
+        'total_expenses': float(expenses),
+        'savings_rate': float(savings_rate),
+        'expense_breakdown': expense_breakdown.to_dict(),
+        'expense_percentages': expense_percentages.to_dict(),
+        'recurring_payments': recurring[['description', 'amount', 'category']].to_dict('records'),
+        'top_expenses': top_expenses.to_dict('records')
+    }
+
+def summarize_transactions(df: pd.DataFrame, top_n: int = 10) -> Dict:
+    """Build a bounded-size structured summary of categorized transactions.
+
+    Totals come from analyze_categorized_frame so the numbers match the
+    financial_analyzer tool exactly; list sections are capped at top_n so the
+    summary stays the same size however many transactions there are.
+    """
+    analysis = analyze_categorized_frame(df)
+    debits = df[df['type'] == 'debit']
+    
+    merchants = debits.groupby('description')['amount'].agg(['count', 'sum'])
+    merchants = merchants.sort_values('sum', ascending=False).head(top_n)
+    
+    recurring = df[df['category'].isin(['Subscriptions', 'Utilities', 'Rent/Mortgage'])]
+    recurring = recurring.groupby(['description', 'category'])['amount'].agg(['count', 'sum'])
+    recurring = recurring.sort_values('sum', ascending=False).head(top_n)
+    
+    return {
+        'transaction_count': int(len(df)),
+        'date_range': [str(df['date'].min()), str(df['date'].max())] if len(df) else [],
+        'total_income': analysis['total_income'],
+        'total_expenses': analysis['total_expenses'],
+        'savings_rate': analysis['savings_rate'],
+        'expense_breakdown': {k: float(v) for k, v in analysis['expense_breakdown'].items()},
+        'expense_percentages': {k: float(v) for k, v in analysis['expense_percentages'].items()},
+        'top_merchants': [
+            {'merchant': name, 'count': int(row['count']), 'amount': float(row['sum'])}
+            for name, row in merchants.iterrows()
+        ],
+        'recurring_items': [
+            {'description': name, 'category': category, 'count': int(row['count']), 'amount': float(row['sum'])}
+            for (name, category), row in recurring.iterrows()
+        ],
+        'top_expenses': analysis['top_expenses']
+    }
+
 class TransactionCategorizerTool(BaseTool):
     name: str = "transaction_categorizer"
-    description: str = "Categorizes financial transactions into predefined categories"
+    description: str = (
+        "Categorizes financial transactions into predefined categories. "
+        "Returns an artifact handle for the categorized table plus a compact summary."
+    )
+    artifact_store: Optional[ArtifactStore] = None
     
     def _run(self, transactions_json: str) -> str:
         """Categorize transactions into budget categories"""
         try:
             transactions = json.loads(transactions_json)
-            categorized = []
-            
-            category_rules = {
-                'Income': ['salary', 'bonus', 'interest', 'dividend'],
-                'Groceries': ['grocery', 'supermarket', 'vegetables', 'fruits'],
-                'Utilities': ['electricity', 'water', 'gas', 'internet', 'phone'],
-                'Rent/Mortgage': ['rent', 'mortgage', 'housing'],
-                'EMI': ['emi', 'loan', 'credit card'],
-                'Transport': ['uber', 'ola', 'petrol', 'fuel', 'bus', 'metro'],
-                'Dining Out': ['zomato', 'swiggy', 'restaurant', 'food'],
-                'Shopping': ['shopping', 'mall', 'amazon', 'flipkart'],
-                'Entertainment': ['movie', 'cinema', 'netflix', 'spotify', 'games'],
-                'Subscriptions': ['subscription', 'netflix', 'spotify', 'prime'],
-                'Miscellaneous': []
-            }
+            df = categorize_transactions(transactions.get('transactions', []))
             
-            for txn in transactions.get('transactions', []):
-                description = txn['description'].lower()
-                category = 'Miscellaneous'
-                
-                for cat, keywords in category_rules.items():
-                    if any(keyword in description for keyword in keywords):
-                        category = cat
-                        break
-                
-                # Special handling for income
-                if txn['type'] == 'credit' and txn['amount'] > 10000:
-                    category = 'Income'
-                
-                categorized.append({
-                    'date': txn['date'],
-                    'amount': abs(txn['amount']),
-                    'description': txn['description'],
-                    'category': category,
-                    'type': txn['type']
-                })
+            # Without a shared store fall back to handing the table over as CSV
+            if self.artifact_store is None:
+                return df.to_csv(index=False)
             
-            df = pd.DataFrame(categorized)
-            return df.to_csv(index=False)
+            handle = self.artifact_store.put(df, kind="categorized")
+            return json.dumps(self.artifact_store.summarize(handle), indent=2)
             
         except Exception as e:
             logger.error(f"Error categorizing transactions: {str(e)}")
@@ -62,50 +145,60 @@ class TransactionCategorizerTool(BaseTool):
 
 class FinancialAnalysisTool(BaseTool):
     name: str = "financial_analyzer"
-    description: str = "Analyzes categorized financial data for insights"
+    description: str = (
+        "Analyzes categorized financial data for insights. "
+        "Accepts the artifact handle returned by transaction_categorizer, or categorized CSV."
+    )
+    artifact_store: Optional[ArtifactStore] = None
     
-    def _run(self, categorized_csv: str) -> str:
+    def _run(self, categorized_data: str) -> str:
         """Analyze financial data and generate insights"""
         try:
-            from io import StringIO
-            df = pd.read_csv(StringIO(categorized_csv))
-            
-            # Calculate key metrics
-            income = df[df['type'] == 'credit']['amount'].sum()
-            expenses = df[df['type'] == 'debit']['amount'].sum()
-            savings_rate = ((income - expenses) / income * 100) if income > 0 else 0
-            
-            # Category breakdown
-            expense_breakdown = df[df['type'] == 'debit'].groupby('category')['amount'].sum()
-            expense_percentages = (expense_breakdown / expenses * 100).round(2)
-            
-            # Recurring payments (simplified detection)
-            recurring = df[df['category'].isin(['Subscriptions', 'Utilities', 'Rent/Mortgage'])]
-            
-            # Top expenses
-            top_expenses = df[df['type'] == 'debit'].nlargest(5, 'amount')[['description', 'amount', 'category']]
-            
-            analysis = {
-                'total_income': float(income),
-                'total_expenses': float(expenses),
-                'savings_rate': float(savings_rate),
-                'expense_breakdown': expense_breakdown.to_dict(),
-                'expense_percentages': expense_percentages.to_dict(),
-                'recurring_payments': recurring[['description', 'amount', 'category']].to_dict('records'),
-                'top_expenses': top_expenses.to_dict('records')
-            }
+            df = self.artifact_store.resolve(categorized_data) if self.artifact_store else None
+            if df is None:
+                handles = ARTIFACT_HANDLE_PATTERN.findall(categorized_data)
+                if handles:
+                    return f"Error: Unknown artifact {handles[0]}; pass the handle returned by transaction_categorizer"
+                from io import StringIO
+                df = pd.read_csv(StringIO(categorized_data))
             
+            analysis = analyze_categorized_frame(df)
             return json.dumps(analysis, indent=2)
             
         except Exception as e:
             logger.error(f"Error analyzing financial data: {str(e)}")
             return f"Error: {str(e)}"
 
+STAGE_NAMES = ['categorize', 'analyze', 'strategy', 'report']
+# Stages each stage reads from in DAG mode; the 50/30/20 split only needs income totals
+STAGE_INPUTS = {
+    'categorize': [],
+    'analyze': ['categorize'],
+    'strategy': ['categorize'],
+    'report': ['analyze', 'strategy']
+}
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+class CrewCancelled(Exception):
+    """Raised between stages when a run's cancel event has been set"""
+
 class BudgetPlannerCrew:
-    def __init__(self, verbose=True, logger=None):
+    def __init__(self, verbose=True, logger=None, llm=None, cache: Optional[CrewCache] = None,
+                 execution_mode: str = None, compact_prompts: Optional[bool] = None):
         self.verbose = verbose
         self.logger = logger or get_logger(__name__)
+        self.llm = llm
+        self.cache = cache
+        # "sequential" mirrors Process.sequential, "dag" runs independent stages concurrently
+        self.execution_mode = execution_mode or os.getenv("CREW_EXECUTION_MODE", "sequential")
+        # Replace the LLM categorize stage with a deterministic, bounded-size summary
+        if compact_prompts is None:
+            compact_prompts = os.getenv("CREW_COMPACT_PROMPTS", "true").lower() == "true"
+        self.compact_prompts = compact_prompts
+        # Shared per-run store so tools exchange DataFrames by handle
+        self.artifacts = ArtifactStore()
         self.crew = self.create_crew()
+        self.tasks = dict(zip(STAGE_NAMES, self.crew.tasks))
         self.logger.info("BudgetPlannerCrew initialized")
 
     def create_crew(self):
@@ -116,8 +209,9 @@ class BudgetPlannerCrew:
             role='Transaction Categorizer',
             goal='Transform raw transaction data into clean, categorized financial records',
             backstory='Expert at parsing and categorizing financial transactions using intelligent rules and patterns',
-            tools=[TransactionCategorizerTool()],
-            verbose=self.verbose
+            tools=[TransactionCategorizerTool(artifact_store=self.artifacts)],
+            verbose=self.verbose,
+            llm=self.llm
         )
 
         # Agent 2: Financial Analyst
@@ -125,8 +219,9 @@ class BudgetPlannerCrew:
             role='Financial Analyst',
             goal='Analyze categorized financial data to uncover spending patterns and key metrics',
             backstory='Skilled financial analyst who identifies trends, calculates ratios, and spots financial opportunities',
-            tools=[FinancialAnalysisTool()],
-            verbose=self.verbose
+            tools=[FinancialAnalysisTool(artifact_store=self.artifacts)],
+            verbose=self.verbose,
+            llm=self.llm
         )
 
         # Agent 3: Budget Strategist
@@ -134,7 +229,8 @@ class BudgetPlannerCrew:
             role='Budget Strategist',
             goal='Create actionable budget recommendations based on financial analysis',
             backstory='Expert budget planner who applies proven budgeting frameworks like 50/30/20 rule to create personalized financial strategies',
-            verbose=self.verbose
+            verbose=self.verbose,
+            llm=self.llm
         )
 
         # Agent 4: Report Generator
@@ -142,7 +238,8 @@ class BudgetPlannerCrew:
             role='Report Generator',
             goal='Create user-friendly, encouraging financial reports with actionable insights',
             backstory='Skilled communicator who transforms complex financial data into clear, motivating reports that empower users',
-            verbose=self.verbose
+            verbose=self.verbose,
+            llm=self.llm
         )
 
         self.logger.info("Created all budget planner agents")
@@ -150,18 +247,18 @@ class BudgetPlannerCrew:
         # Define tasks
         categorize_task = Task(
             description='Categorize the raw transaction data: {transactions_data}',
-            expected_output='Clean CSV data with transactions categorized into: Income, Groceries, Utilities, Rent/Mortgage, EMI, Transport, Dining Out, Shopping, Entertainment, Subscriptions, Miscellaneous',
+            expected_output='Artifact handle and compact summary of the transactions categorized into: Income, Groceries, Utilities, Rent/Mortgage, EMI, Transport, Dining Out, Shopping, Entertainment, Subscriptions, Miscellaneous',
             agent=categorizer
         )
 
         analyze_task = Task(
-            description='Analyze the categorized transaction data to calculate key financial metrics including income, expenses, savings rate, category breakdown, recurring payments, and top expenses',
+            description='Analyze the categorized transaction data (pass the artifact handle to the financial_analyzer tool) to calculate key financial metrics including income, expenses, savings rate, category breakdown, recurring payments, and top expenses',
             expected_output='Structured JSON analysis with total income, total expenses, savings rate, expense breakdown by category, recurring payments list, and top 5 expenses',
             agent=analyst
         )
 
         strategy_task = Task(
-            description='Create budget recommendations using the 50/30/20 rule (50% needs, 30% wants, 20% savings) and provide specific actionable insights based on the financial analysis',
+            description='Create budget recommendations using the 50/30/20 rule (50% needs, 30% wants, 20% savings) and provide specific actionable insights based on the income and spending totals',
             expected_output='Budget plan with recommended spending limits for each category and at least 3 specific, data-driven insights for improvement',
             agent=strategist
         )
@@ -180,4 +277,136 @@ class BudgetPlannerCrew:
         )
         
         self.logger.info("Budget planner crew setup completed")
-        return crew
\ No newline at end of file
+        return crew
+
+    def reset(self) -> None:
+        """Clear per-run state so the crew can be reused for another job"""
+        self.artifacts.clear()
+        for task in self.crew.tasks:
+            task.output = None
+
+    def kickoff(self, inputs: Dict):
+        """Run the crew and release the run's artifacts afterwards"""
+        try:
+            return self.crew.kickoff(inputs=inputs)
+        finally:
+            self.artifacts.clear()
+
+    def execute(self, inputs: Dict, cancel_event: Optional[threading.Event] = None) -> str:
+        """Run one job with the configured execution mode from synchronous code"""
+        if self.execution_mode == "dag":
+            return asyncio.run(self.arun(inputs, cancel_event))
+        return self.run(inputs, cancel_event)
+
+    def run(self, inputs: Dict, cancel_event: Optional[threading.Event] = None) -> str:
+        """Run the stages in order, reusing cached outputs when nothing upstream changed.
+
+        Each stage is keyed by its task template, its agent configuration, the
+        run inputs and the keys of the stages it reads from, so a cache hit on
+        the final stage means the whole crew is skipped. With compact_prompts the
+        categorize stage is computed deterministically and only its bounded
+        summary reaches the analyst, strategist and reporter. Setting
+        `cancel_event` stops the run before its next stage.
+        """
+        try:
+            outputs, keys = {}, {}
+            for index, name in enumerate(STAGE_NAMES):
+                self._check_cancelled(cancel_event, name)
+                keys[name], outputs[name] = self._run_stage(name, inputs, STAGE_NAMES[:index], outputs, keys)
+            return outputs[STAGE_NAMES[-1]]
+        finally:
+            self.artifacts.clear()
+
+    async def arun(self, inputs: Dict, cancel_event: Optional[threading.Event] = None) -> str:
+        """Run the stages as a DAG, executing stages whose inputs are ready concurrently.
+
+        Each stage only sees the outputs of the stages listed in STAGE_INPUTS, so
+        the strategist starts as soon as categorization is done and runs alongside
+        the analyst; the reporter merges both.
+        """
+        try:
+            outputs, keys = {}, {}
+            pending = list(STAGE_NAMES)
+            while pending:
+                ready = [name for name in pending if all(dep in outputs for dep in STAGE_INPUTS[name])]
+                if not ready:
+                    raise ValueError(f"Unsatisfiable stage inputs for {pending}")
+                self._check_cancelled(cancel_event, ready[0])
+                results = await asyncio.gather(*(
+                    asyncio.to_thread(self._run_stage, name, inputs, STAGE_INPUTS[name], outputs, keys)
+                    for name in ready
+                ))
+                for name, (key, output) in zip(ready, results):
+                    keys[name], outputs[name] = key, output
+                pending = [name for name in pending if name not in ready]
+            return outputs[STAGE_NAMES[-1]]
+        finally:
+            self.artifacts.clear()
+
+    def _check_cancelled(self, cancel_event: Optional[threading.Event], stage: str) -> None:
+        if cancel_event is not None and cancel_event.is_set():
+            self.logger.info(f"Run cancelled before stage '{stage}'")
+            raise CrewCancelled(f"Cancelled before stage '{stage}'")
+
+    def _run_stage(self, name: str, inputs: Dict, context_stages: List[str],
+                   outputs: Dict[str, str], keys: Dict[str, str]):
+        """Execute one stage, or reuse its cached output; returns (key, output)"""
+        if name == 'categorize' and self.compact_prompts:
+            return self._presummarize(inputs)
+
+        task = self.tasks[name]
+        key = self._stage_key(name, task, inputs, [keys[dep] for dep in context_stages])
+        output = self.cache.get(key) if self.cache else None
+        if output is not None:
+            self.logger.info(f"Reusing cached output for stage '{name}'")
+            return key, output
+
+        context = [outputs[dep] for dep in context_stages]
+        self._rehydrate_artifacts(context, inputs)
+        output = self._execute_task(task, inputs, CONTEXT_DIVIDER.join(context))
+        if self.cache:
+            self.cache.set(key, output, stage=name)
+        return key, output
+
+    def _presummarize(self, inputs: Dict):
+        """Categorize and aggregate the raw transactions without an LLM call"""
+        transactions = json.loads(inputs.get('transactions_data', '{}')).get('transactions', [])
+        df = categorize_transactions(transactions)
+        summary = summarize_transactions(df)
+        key = make_cache_key('categorize', 'presummary', summary)
+        # Keep the full table reachable for the financial_analyzer tool; a content-derived
+        # handle keeps downstream prompts identical for identical transactions
+        summary['artifact'] = self.artifacts.put(df, kind="categorized", handle=f"{ARTIFACT_PREFIX}categorized/{key[:12]}")
+        output = json.dumps(summary, indent=2, default=str)
+        return key, output
+
+    def _stage_key(self, name: str, task: Task, inputs: Dict, upstream_keys: List[str]) -> str:
+        agent = task.agent
+        agent_config = {
+            "role": agent.role,
+            "goal": agent.goal,
+            "backstory": agent.backstory,
+            "tools": [tool.name for tool in agent.tools or []],
+            "llm": getattr(agent.llm, "model", None)
+        }
+        template = getattr(task, "_original_description", None) or task.description
+        return make_cache_key(name, template, task.expected_output, agent_config, inputs, upstream_keys)
+
+    def _execute_task(self, task: Task, inputs: Dict, context: str) -> str:
+        task.interpolate_inputs_and_add_conversation_history(inputs)
+        return task.execute_sync(context=context or None).raw
+
+    def _rehydrate_artifacts(self, outputs: List[str], inputs: Dict) -> None:
+        """Restore artifacts referenced by cached outputs before a later stage runs"""
+        missing = [
+            handle for output in outputs
+            for handle in ARTIFACT_HANDLE_PATTERN.findall(output)
+            if self.artifacts.get(handle) is None
+        ]
+        if not missing:
+            return
+        # Categorization is deterministic, so the table can be rebuilt from the inputs
+        transactions = json.loads(inputs.get('transactions_data', '{}')).get('transactions', [])
+        df = categorize_transactions(transactions)
+        for handle in missing:
+            self.artifacts.put(df, handle=handle)
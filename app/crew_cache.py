@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+def make_cache_key(*parts: Any) -> str:
+    """Content-address an arbitrary set of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class CrewCache:
+    """SQLite-backed cache for crew task outputs with size and age eviction.
+
+    A limit of 0 disables it: no entry cap, no byte cap, or no age expiry.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = None,
+                 max_bytes: int = None, max_age_seconds: int = None):
+        self.db_path = db_path if db_path is not None else os.getenv("CREW_CACHE_PATH", "./crew_cache.db")
+        self.max_entries = (max_entries if max_entries is not None
+                            else int(os.getenv("CREW_CACHE_MAX_ENTRIES", "1000")))
+        self.max_bytes = (max_bytes if max_bytes is not None
+                          else int(os.getenv("CREW_CACHE_MAX_BYTES", str(50 * 1024 * 1024))))
+        self.max_age_seconds = (max_age_seconds if max_age_seconds is not None
+                                else int(os.getenv("CREW_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600))))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS task_outputs (
+                cache_key TEXT PRIMARY KEY,
+                stage TEXT,
+                output TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_task_outputs_last_accessed ON task_outputs (last_accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached output for a key, or None on a miss or expiry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, created_at FROM task_outputs WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or self._expired(row[1], now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM task_outputs WHERE cache_key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE task_outputs SET last_accessed = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, output: str, stage: str = None) -> None:
+        """Store a task output and evict entries over the size and age limits"""
+        now = time.time()
+        size = len(output.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_outputs (cache_key, stage, output, size_bytes, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, output, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.max_age_seconds > 0 and now - created_at > self.max_age_seconds
+
+    def _within_limits(self, count: int, total: int) -> bool:
+        return (not self.max_entries or count <= self.max_entries) and (not self.max_bytes or total <= self.max_bytes)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until within limits"""
+        if self.max_age_seconds > 0:
+            self._conn.execute("DELETE FROM task_outputs WHERE created_at < ?", (now - self.max_age_seconds,))
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM task_outputs"
+        ).fetchone()
+        if self._within_limits(count, total):
+            return
+
+        evicted = 0
+        for key, size in self._conn.execute(
+            "SELECT cache_key, size_bytes FROM task_outputs ORDER BY last_accessed ASC"
+        ).fetchall():
+            if self._within_limits(count, total):
+                break
+            self._conn.execute("DELETE FROM task_outputs WHERE cache_key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} crew cache entries")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM task_outputs")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Return hit rate and storage usage"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM task_outputs"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": count,
+            "size_bytes": total
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from app.crew import BudgetPlannerCrew
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class CrewPoolExhausted(Exception):
+    """Raised when no crew becomes available within the acquire timeout"""
+
+class CrewPool:
+    """Pool of prewarmed BudgetPlannerCrew instances handed out one job at a time.
+
+    Crews (agents, tasks, tools and LLM clients) are built once at startup and
+    reset between jobs, so per-job setup is reduced to a queue checkout.
+    """
+
+    def __init__(self, size: int = None, crew_factory: Callable[[], BudgetPlannerCrew] = None,
+                 acquire_timeout: float = None):
+        self.size = size if size is not None else int(os.getenv("CREW_POOL_SIZE", "0"))
+        self.acquire_timeout = acquire_timeout or float(os.getenv("CREW_POOL_ACQUIRE_TIMEOUT", "300"))
+        self._factory = crew_factory or (lambda: BudgetPlannerCrew(verbose=False))
+        self._available: "queue.Queue[BudgetPlannerCrew]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._total_wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def prewarm(self) -> None:
+        """Construct every crew up front"""
+        start = time.perf_counter()
+        while self._created < self.size:
+            self._available.put(self._factory())
+            self._created += 1
+        logger.info(f"Prewarmed {self._created} crews in {time.perf_counter() - start:.2f}s")
+
+    def _checkout(self, timeout: Optional[float] = None) -> BudgetPlannerCrew:
+        start = time.perf_counter()
+        try:
+            crew = self._available.get(timeout=timeout or self.acquire_timeout)
+        except queue.Empty:
+            raise CrewPoolExhausted(f"No crew available after {timeout or self.acquire_timeout}s")
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._total_wait_seconds += time.perf_counter() - start
+        return crew
+
+    def _checkin(self, crew: BudgetPlannerCrew) -> None:
+        crew.reset()
+        with self._lock:
+            self._in_use -= 1
+        self._available.put(crew)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a crew for the duration of one job"""
+        crew = self._checkout(timeout)
+        try:
+            yield crew
+        finally:
+            self._checkin(crew)
+
+    def run(self, inputs: Dict) -> str:
+        """Run one job on a pooled crew"""
+        with self.acquire() as crew:
+            return crew.execute(inputs)
+
+    async def arun(self, inputs: Dict) -> str:
+        """Run one job on a pooled crew without blocking the event loop.
+
+        Cancelling the caller stops the crew before its next stage; the crew
+        goes back to the pool only once its thread has actually finished.
+        """
+        checkout = asyncio.ensure_future(asyncio.to_thread(self._checkout))
+        try:
+            crew = await asyncio.shield(checkout)
+        except asyncio.CancelledError:
+            checkout.add_done_callback(self._checkin_late_checkout)
+            raise
+
+        cancel_event = threading.Event()
+        if crew.execution_mode == "dag":
+            run = asyncio.ensure_future(crew.arun(inputs, cancel_event))
+        else:
+            run = asyncio.ensure_future(asyncio.to_thread(crew.run, inputs, cancel_event))
+        try:
+            result = await asyncio.shield(run)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            run.add_done_callback(lambda _: self._finish_cancelled(crew, run))
+            raise
+        except BaseException:
+            self._checkin(crew)
+            raise
+        self._checkin(crew)
+        return result
+
+    def _checkin_late_checkout(self, checkout: asyncio.Future) -> None:
+        """Return a crew whose checkout finished after the job was cancelled"""
+        if not checkout.cancelled() and checkout.exception() is None:
+            self._checkin(checkout.result())
+
+    def _finish_cancelled(self, crew: BudgetPlannerCrew, run: asyncio.Future) -> None:
+        if not run.cancelled():
+            # Retrieve the CrewCancelled (or any late error) so it is not logged as unhandled
+            run.exception()
+        self._checkin(crew)
+
+    def stats(self) -> Dict:
+        """Report pool utilization"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "available": self._available.qsize(),
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "utilization": (self._in_use / self._created) if self._created else 0.0,
+                "checkouts": self._checkouts,
+                "avg_wait_ms": (self._total_wait_seconds / self._checkouts * 1000) if self._checkouts else 0.0
+            }
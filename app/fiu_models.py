@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy import create_engine
 import datetime
+import os
 import uuid
 
 Base = declarative_base()
@@ -63,11 +64,24 @@ class Transaction(Base):
     payment_method = Column(String)  # cash, card, upi, netbanking
     is_detailed = Column(Boolean, default=False)  # Flag for detailed expenses
     
+    # Deterministic hash of account, timestamp, amount and description for bank sync dedupe
+    fingerprint = Column(String, unique=True, index=True)
+    
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     # Relationships
     user = relationship("User", back_populates="transactions")
 
+class SyncWatermark(Base):
+    __tablename__ = "sync_watermarks"
+    __table_args__ = (UniqueConstraint("account_id", "source", name="uq_sync_watermarks_account_source"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("bank_accounts.id"), index=True)
+    source = Column(String, nullable=False)  # data source the cursor belongs to, e.g. mock_bank, aa
+    watermark = Column(DateTime)  # everything posted before this has been fetched
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 class BudgetAnalysis(Base):
     __tablename__ = "budget_analysis"
     
@@ -78,10 +92,11 @@ class BudgetAnalysis(Base):
     total_expenses = Column(Float)
     savings_rate = Column(Float)
     recommendations = Column(Text)
+    analysis_digest = Column(String, index=True)  # report text in the result store
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
 # Database setup
-DATABASE_URL = "sqlite:///./fiu_platform.db"
+DATABASE_URL = os.getenv("FIU_DATABASE_URL", "sqlite:///./fiu_platform.db")
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
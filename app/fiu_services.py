@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.fiu_models import User, BankAccount, Transaction, BudgetAnalysis, SessionLocal
 from app.demo_crew import DemoBudgetPlanner
+from app.result_store import ResultStore
 from app.bank_validator import BankValidator
 from typing import List, Dict, Optional
 
@@ -12,6 +13,7 @@ class FIUService:
     
     def __init__(self):
         self.budget_planner = DemoBudgetPlanner()
+        self.result_store = ResultStore()
     
     def create_user(self, name: str, email: str, phone: str) -> Dict:
         """Create a new user account"""
@@ -583,14 +585,13 @@ class FIUService:
             total_expenses = sum(tx.amount for tx in expense_txs)
             savings_rate = ((total_income - total_expenses) / total_income * 100) if total_income > 0 else 0
             
-            # Save analysis to database
+            # Save analysis to database; the report text goes to the result store once
             analysis = BudgetAnalysis(
                 user_id=user.id,
-                analysis_data=budget_report,
+                analysis_digest=self.result_store.put(budget_report)["digest"],
                 total_income=total_income,
                 total_expenses=total_expenses,
-                savings_rate=savings_rate,
-                recommendations=budget_report
+                savings_rate=savings_rate
             )
             
             db.add(analysis)
@@ -1,6 +1,8 @@
 from app.fiu_services import FIUService
 from app.bank_validator import BankValidator
 from app.bank_sync_service import BankSyncService
+from app.services.aa_client import AAClient
+from app.services.fi_decryption import FIDecryptor
 from typing import List, Dict
 
 class ExtendedFIUService(FIUService):
@@ -9,6 +11,8 @@ class ExtendedFIUService(FIUService):
     def __init__(self):
         super().__init__()
         self.sync_service = BankSyncService()
+        self.aa_client = AAClient()
+        self.fi_decryptor = FIDecryptor()
     
     def get_supported_banks(self) -> List[Dict]:
         """Get list of supported banks for validation"""
@@ -41,17 +45,28 @@ class ExtendedFIUService(FIUService):
         """Sync account balance from bank"""
         return self.sync_service.sync_account_balance(account_id)
     
-    def sync_account_transactions(self, account_id: int, days: int = 30) -> Dict:
+    def sync_account_transactions(self, account_id: int, days: int = 30, mode: str = "incremental") -> Dict:
         """Sync transactions from bank"""
-        return self.sync_service.sync_transactions(account_id, days)
+        return self.sync_service.sync_transactions(account_id, days, mode)
     
     def get_sync_status(self, user_id: str) -> Dict:
         """Get sync status for user accounts"""
         return self.sync_service.get_sync_status(user_id)
     
-    def full_account_sync(self, account_id: int) -> Dict:
+    def full_account_sync(self, account_id: int, mode: str = "incremental") -> Dict:
         """Perform full account sync"""
-        return self.sync_service.full_account_sync(account_id)
+        return self.sync_service.full_account_sync(account_id, mode)
+    
+    async def ingest_aa_data(self, account_id: int, consent_id: str, encrypted: bool = False) -> Dict:
+        """Stream an AA FI payload for a consent straight into an account's transactions"""
+        if encrypted:
+            # Fresh key material for every FI request
+            session = self.fi_decryptor.new_session()
+            entries = self.aa_client.fetch_encrypted_stream(consent_id, session.key_material())
+            chunks = self.fi_decryptor.decrypt_stream(entries, session)
+        else:
+            chunks = self.aa_client.fetch_data_stream(consent_id)
+        return await self.sync_service.ingest_stream(account_id, chunks)
     
     def get_detailed_expenses(self, user_id: str, limit: int = 50) -> Dict:
         """Get detailed expenses with purposes and spending reasons"""
@@ -140,3 +155,13 @@ class ExtendedFIUService(FIUService):
                 }
             }
             
+        except Exception as e:
+            return {"error": str(e)}
+    
+    async def sync_user_accounts(self, user_id: str) -> Dict:
+        """Sync every bank account of a user concurrently"""
+        return await self.sync_service.sync_user_accounts(user_id)
+    
+    async def sync_users(self, user_ids: List[str]) -> Dict:
+        """Sync every bank account of a batch of users concurrently"""
+        return await self.sync_service.sync_users(user_ids)
@@ -0,0 +1,61 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class JobEventBus:
+    """In-process fan-out of job status updates to SSE and WebSocket subscribers.
+
+    Each subscriber is a small bounded asyncio.Queue registered under its job
+    id, so an idle subscriber costs one queue and one set entry and publishing
+    only touches the subscribers of that job. A subscriber that falls behind
+    drops its oldest update, since only the latest status matters.
+    """
+
+    def __init__(self, queue_size: int = 8):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @contextmanager
+    def subscribe(self, job_id: str) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def publish(self, job_id: str, event: Dict) -> int:
+        """Deliver an update to every subscriber of the job; returns how many received it"""
+        self.published += 1
+        subscribers = self._subscribers.get(job_id, ())
+        for queue in subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+        self.delivered += len(subscribers)
+        return len(subscribers)
+
+    def subscriber_count(self, job_id: Optional[str] = None) -> int:
+        if job_id is not None:
+            return len(self._subscribers.get(job_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def stats(self) -> Dict:
+        return {
+            "jobs_watched": len(self._subscribers),
+            "subscribers": self.subscriber_count(),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped
+        }
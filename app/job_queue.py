@@ -0,0 +1,174 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class JobQueue:
+    """Bounded worker pool for paid jobs with per-purchaser fair scheduling.
+
+    Queued jobs are kept in one FIFO per identifier_from_purchaser and workers
+    take from the purchasers round-robin, so one purchaser paying for a burst
+    of jobs cannot push everyone else to the back. At most `workers` jobs run
+    at once; `overloaded()` tells the API when the backlog of paid jobs
+    (across all workers when given) is too long to admit new ones.
+    Each job runs as its own task so cancel() can stop it without touching
+    the worker.
+    """
+
+    def __init__(self, handler: Callable[[str], Awaitable[None]], workers: int = None, max_queued: int = None):
+        self._handler = handler
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "4"))
+        self.max_queued = max_queued or int(os.getenv("JOB_QUEUE_MAX_SIZE", "100"))
+
+        # purchaser -> FIFO of (job_id, enqueued_at); order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[Tuple[str, float]]]" = OrderedDict()
+        self._queued_ids: set = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.shed = 0
+        self.started = 0
+        self._total_wait_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._queued_ids)
+
+    def overloaded(self, backlog: Optional[int] = None) -> bool:
+        """Whether `backlog` queued jobs (this queue's own by default) reach max_queued"""
+        return (len(self) if backlog is None else backlog) >= self.max_queued
+
+    def free_slots(self) -> int:
+        """How many more jobs this queue can take without any of them waiting"""
+        return max(self.workers - len(self) - len(self._running), 0)
+
+    def record_shed(self) -> None:
+        self.shed += 1
+
+    def submit(self, job_id: str, purchaser: str) -> bool:
+        """Queue a paid job; returns False if it is already queued or running"""
+        if job_id in self._queued_ids or job_id in self._running:
+            return False
+        self._queues.setdefault(purchaser, deque()).append((job_id, time.monotonic()))
+        self._queued_ids.add(job_id)
+        self.submitted += 1
+        if self._ready is not None:
+            self._ready.release()
+        return True
+
+    def _next(self) -> Optional[Tuple[str, float]]:
+        """Pop the oldest job of the next purchaser in round-robin order"""
+        if not self._queues:
+            return None
+        purchaser, jobs = next(iter(self._queues.items()))
+        job = jobs.popleft()
+        if jobs:
+            self._queues.move_to_end(purchaser)
+        else:
+            del self._queues[purchaser]
+        self._queued_ids.discard(job[0])
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a queued job or cancel a running one; returns False if this queue does not hold it"""
+        if job_id in self._queued_ids:
+            for purchaser, jobs in list(self._queues.items()):
+                remaining = deque(job for job in jobs if job[0] != job_id)
+                if len(remaining) == len(jobs):
+                    continue
+                if remaining:
+                    self._queues[purchaser] = remaining
+                else:
+                    del self._queues[purchaser]
+            self._queued_ids.discard(job_id)
+            self.cancelled += 1
+            return True
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            return True
+        return False
+
+    def job_ids(self) -> List[str]:
+        """Jobs this queue holds, queued or running"""
+        return list(self._queued_ids) + list(self._running)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position in which the job will be started, or None if it is not queued"""
+        if job_id not in self._queued_ids:
+            return None
+        purchasers = list(self._queues.values())
+        for order, jobs in enumerate(purchasers):
+            for index, (queued_id, _) in enumerate(jobs):
+                if queued_id != job_id:
+                    continue
+                # `index` full rounds go first, then the purchasers ahead in this round
+                ahead = sum(min(len(other), index) for other in purchasers)
+                ahead += sum(1 for other in purchasers[:order] if len(other) > index)
+                return ahead + 1
+        return None
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            await self._ready.acquire()
+            job = self._next()
+            if job is None:
+                continue
+            job_id, enqueued_at = job
+            self._total_wait_seconds += time.monotonic() - enqueued_at
+            self.started += 1
+            task = asyncio.create_task(self._handler(job_id))
+            self._running[job_id] = task
+            try:
+                await asyncio.wait([task])
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._running.pop(job_id, None)
+
+            if task.cancelled():
+                self.cancelled += 1
+                logger.info(f"Worker {number} cancelled job {job_id}")
+            elif task.exception() is not None:
+                self.failed += 1
+                logger.error(f"Worker {number} failed job {job_id}: {str(task.exception())}",
+                             exc_info=task.exception())
+            else:
+                self.completed += 1
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._ready = asyncio.Semaphore(len(self))
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers (max {self.max_queued} queued)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": len(self),
+            "running": len(self._running),
+            "purchasers_waiting": len(self._queues),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "shed": self.shed,
+            "avg_wait_seconds": round(self._total_wait_seconds / self.started, 3) if self.started else 0.0
+        }
@@ -0,0 +1,345 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, delete, func, or_, select, update
+from app.models import Job, SessionLocal
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+JOB_STATUSES = ("awaiting_payment", "queued", "running", "completed", "failed", "cancelled")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# Paid jobs that a worker may hold a claim on
+CLAIMABLE_STATUSES = ("queued", "running")
+
+class JobStore(ABC):
+    """Storage for MIP-003 jobs.
+
+    Status changes go through transition(), which only succeeds when the job
+    is still in one of the expected states, so two workers can never both
+    move the same job forward. Paid jobs are executed by whichever worker
+    claims them; a claim is a lease that its worker keeps renewing, and jobs
+    whose lease lapsed are handed back for another worker to claim.
+    """
+
+    @abstractmethod
+    def create(self, job_id: str, input_data: Dict, identifier_from_purchaser: str,
+               payment_id: Optional[str] = None, status: str = "awaiting_payment",
+               payment_status: str = "pending") -> Dict:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def transition(self, job_id: str, from_statuses: Iterable[str], to_status: str,
+                   expected_owner: Optional[str] = None, **fields) -> bool:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> bool:
+        ...
+
+    @abstractmethod
+    def list_by_status(self, status: str, limit: Optional[int] = None) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def expire(self, from_statuses: Iterable[str], idle_seconds: float, to_status: str, **fields) -> List[str]:
+        ...
+
+    @abstractmethod
+    def claim(self, owner: str, limit: int, lease_seconds: float) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def queue_position(self, job_id: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def renew_claims(self, owner: str, lease_seconds: float) -> int:
+        ...
+
+    @abstractmethod
+    def release_expired_claims(self, max_attempts: int) -> Tuple[List[str], List[str]]:
+        ...
+
+    @abstractmethod
+    def purge_finished(self, ttl_seconds: Optional[float] = None) -> int:
+        ...
+
+    @abstractmethod
+    def count_by_status(self) -> Dict[str, int]:
+        ...
+
+class SQLJobStore(JobStore):
+    """JobStore on the app database, shared by every worker process"""
+
+    def __init__(self, session_factory=SessionLocal, ttl_seconds: float = None):
+        self._session_factory = session_factory
+        self.ttl_seconds = ttl_seconds or float(os.getenv("JOB_TTL_SECONDS", str(7 * 24 * 3600)))
+
+    @staticmethod
+    def _to_dict(job: Job) -> Dict:
+        return {
+            "job_id": job.job_id,
+            "status": job.status,
+            "payment_status": job.payment_status,
+            "payment_id": job.payment_id,
+            "identifier_from_purchaser": job.identifier_from_purchaser,
+            "input_data": json.loads(job.input_data) if job.input_data else None,
+            "result": job.result,
+            "result_digest": job.result_digest,
+            "result_size": job.result_size,
+            "error": job.error,
+            "owner": job.owner,
+            "lease_expires_at": job.lease_expires_at,
+            "attempts": job.attempts,
+            "created_at": job.created_at,
+            "updated_at": job.updated_at,
+            "finished_at": job.finished_at
+        }
+
+    @staticmethod
+    def _columns(to_status: Optional[str], fields: Dict) -> Dict:
+        values = dict(fields, updated_at=datetime.utcnow())
+        if "input_data" in values:
+            values["input_data"] = json.dumps(values["input_data"])
+        if to_status is not None:
+            values["status"] = to_status
+            if to_status in FINISHED_STATUSES:
+                values.setdefault("finished_at", values["updated_at"])
+        return values
+
+    def create(self, job_id: str, input_data: Dict, identifier_from_purchaser: str,
+               payment_id: Optional[str] = None, status: str = "awaiting_payment",
+               payment_status: str = "pending") -> Dict:
+        db = self._session_factory()
+        try:
+            job = Job(
+                job_id=job_id,
+                status=status,
+                payment_status=payment_status,
+                payment_id=payment_id,
+                identifier_from_purchaser=identifier_from_purchaser,
+                input_data=json.dumps(input_data)
+            )
+            db.add(job)
+            db.commit()
+            return self._to_dict(job)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        db = self._session_factory()
+        try:
+            job = db.get(Job, job_id)
+            return self._to_dict(job) if job else None
+        finally:
+            db.close()
+
+    def transition(self, job_id: str, from_statuses: Iterable[str], to_status: str,
+                   expected_owner: Optional[str] = None, **fields) -> bool:
+        """Atomically move a job to `to_status` if it is currently in one of `from_statuses`
+        (and, with `expected_owner`, still claimed by that worker)"""
+        conditions = [Job.job_id == job_id, Job.status.in_(list(from_statuses))]
+        if expected_owner is not None:
+            conditions.append(Job.owner == expected_owner)
+        db = self._session_factory()
+        try:
+            updated = db.execute(
+                update(Job).where(*conditions).values(**self._columns(to_status, fields))
+            ).rowcount
+            db.commit()
+            return updated == 1
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def update(self, job_id: str, **fields) -> bool:
+        """Update non-status fields such as payment_status"""
+        db = self._session_factory()
+        try:
+            updated = db.execute(
+                update(Job).where(Job.job_id == job_id).values(**self._columns(None, fields))
+            ).rowcount
+            db.commit()
+            return updated == 1
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def list_by_status(self, status: str, limit: Optional[int] = None) -> List[Dict]:
+        """Jobs in one status, oldest first"""
+        db = self._session_factory()
+        try:
+            query = db.query(Job).filter(Job.status == status).order_by(Job.created_at)
+            if limit:
+                query = query.limit(limit)
+            return [self._to_dict(job) for job in query]
+        finally:
+            db.close()
+
+    def expire(self, from_statuses: Iterable[str], idle_seconds: float, to_status: str, **fields) -> List[str]:
+        """Move jobs untouched for `idle_seconds` to `to_status`; returns the ids that moved"""
+        cutoff = datetime.utcnow() - timedelta(seconds=idle_seconds)
+        from_statuses = list(from_statuses)
+        db = self._session_factory()
+        try:
+            candidates = db.execute(
+                select(Job.job_id).where(Job.status.in_(from_statuses), Job.updated_at < cutoff)
+            ).scalars().all()
+        finally:
+            db.close()
+        # Transition one by one so a job that moved meanwhile is left alone
+        return [job_id for job_id in candidates if self.transition(job_id, from_statuses, to_status, **fields)]
+
+    @staticmethod
+    def _claim_order():
+        """Unclaimed queued jobs ranked by their place among their purchaser's paid jobs.
+
+        Jobs already claimed or running count towards the rank, so claiming in
+        (rank, created_at) order takes every purchaser's next job before anyone
+        gets a second one in flight, however long a purchaser's backlog is.
+        """
+        rank = func.row_number().over(partition_by=Job.identifier_from_purchaser, order_by=Job.created_at)
+        paid = select(Job.job_id, Job.status, Job.owner, Job.created_at, rank.label("rank")) \
+            .where(Job.status.in_(CLAIMABLE_STATUSES)).subquery()
+        return select(paid.c.job_id, paid.c.created_at, paid.c.rank) \
+            .where(paid.c.status == "queued", paid.c.owner.is_(None)).subquery()
+
+    def claim(self, owner: str, limit: int, lease_seconds: float) -> List[Dict]:
+        """Atomically claim up to `limit` unowned queued jobs for `owner`, fair across purchasers"""
+        if limit <= 0:
+            return []
+        db = self._session_factory()
+        try:
+            ranked = self._claim_order()
+            # Extra candidates cover jobs that racing workers claim first
+            candidates = db.execute(
+                select(ranked.c.job_id).order_by(ranked.c.rank, ranked.c.created_at).limit(max(limit * 4, 20))
+            ).scalars().all()
+            claimed = []
+            for job_id in candidates:
+                now = datetime.utcnow()
+                # Only one worker's UPDATE can match while the job is still unowned
+                won = db.execute(
+                    update(Job)
+                    .where(Job.job_id == job_id, Job.status == "queued", Job.owner.is_(None))
+                    .values(owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds),
+                            attempts=Job.attempts + 1, updated_at=now)
+                ).rowcount == 1
+                db.commit()
+                if won:
+                    claimed.append(self._to_dict(db.get(Job, job_id)))
+                    if len(claimed) >= limit:
+                        break
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based place of an unclaimed queued job in claim order, across all workers"""
+        ranked = self._claim_order()
+        db = self._session_factory()
+        try:
+            own = db.execute(select(ranked.c.rank, ranked.c.created_at).where(ranked.c.job_id == job_id)).first()
+            if own is None:
+                return None
+            ahead = db.execute(
+                select(func.count()).select_from(ranked).where(or_(
+                    ranked.c.rank < own.rank,
+                    and_(ranked.c.rank == own.rank, ranked.c.created_at < own.created_at)
+                ))
+            ).scalar()
+            return ahead + 1
+        finally:
+            db.close()
+
+    def renew_claims(self, owner: str, lease_seconds: float) -> int:
+        """Extend the lease on every unfinished job `owner` holds"""
+        db = self._session_factory()
+        try:
+            renewed = db.execute(
+                update(Job)
+                .where(Job.owner == owner, Job.status.in_(CLAIMABLE_STATUSES))
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+            ).rowcount
+            db.commit()
+            return renewed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def release_expired_claims(self, max_attempts: int) -> Tuple[List[str], List[str]]:
+        """Hand back jobs whose owner stopped renewing; returns (requeued, failed) job ids.
+
+        Jobs that already used `max_attempts` claims are failed instead, so a
+        job that keeps taking its worker down is not retried forever.
+        """
+        now = datetime.utcnow()
+        expired = and_(Job.status.in_(CLAIMABLE_STATUSES), Job.owner.isnot(None), Job.lease_expires_at < now)
+        db = self._session_factory()
+        try:
+            candidates = db.execute(select(Job.job_id, Job.attempts).where(expired)).all()
+            requeued, failed = [], []
+            for job_id, attempts in candidates:
+                values = dict(owner=None, lease_expires_at=None, updated_at=now)
+                if attempts >= max_attempts:
+                    values.update(status="failed", finished_at=now,
+                                  error=f"Job was abandoned by its worker {attempts} times")
+                else:
+                    values.update(status="queued")
+                # The lease may have been renewed since the select
+                moved = db.execute(update(Job).where(Job.job_id == job_id, expired).values(**values)).rowcount
+                db.commit()
+                if moved:
+                    (failed if attempts >= max_attempts else requeued).append(job_id)
+            if requeued or failed:
+                logger.info(f"Released {len(requeued)} expired job claims, failed {len(failed)}")
+            return requeued, failed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def purge_finished(self, ttl_seconds: Optional[float] = None) -> int:
+        """Delete finished jobs older than the TTL"""
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        db = self._session_factory()
+        try:
+            purged = db.execute(
+                delete(Job).where(Job.status.in_(FINISHED_STATUSES), Job.finished_at < cutoff)
+            ).rowcount
+            db.commit()
+            if purged:
+                logger.info(f"Purged {purged} finished jobs")
+            return purged
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def count_by_status(self) -> Dict[str, int]:
+        db = self._session_factory()
+        try:
+            return dict(db.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+        finally:
+            db.close()
@@ -0,0 +1,122 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from app.models import Lease, SessionLocal
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class LeaderElection:
+    """Elects one leader among API workers with a lease row in the shared database.
+
+    The leader renews its lease every third of the lease time; if it stops
+    (crash, network partition, shutdown) the lease lapses and the next
+    worker to try takes over. A worker that fails to renew steps down at
+    once, well before its lease can lapse and let another worker in.
+    """
+
+    def __init__(self, name: str, owner: str, lease_seconds: float = None, session_factory=SessionLocal):
+        self.name = name
+        self.owner = owner
+        self.lease_seconds = lease_seconds or float(os.getenv("LEADER_LEASE_SECONDS", "15"))
+        self._session_factory = session_factory
+        self.is_leader = False
+        self.elections_won = 0
+        self.renewal_errors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; returns whether this worker now holds it"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        db = self._session_factory()
+        try:
+            renewed = db.execute(
+                update(Lease)
+                .where(Lease.name == self.name, or_(Lease.owner == self.owner, Lease.expires_at < now))
+                .values(owner=self.owner, expires_at=expires_at)
+            ).rowcount
+            if renewed:
+                db.commit()
+                return True
+            if db.get(Lease, self.name) is not None:
+                db.rollback()
+                return False
+            db.add(Lease(name=self.name, owner=self.owner, expires_at=expires_at))
+            db.commit()
+            return True
+        except IntegrityError:
+            # Another worker created the lease first
+            db.rollback()
+            return False
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def release(self) -> None:
+        """Give the lease up so another worker can take over without waiting for it to lapse"""
+        db = self._session_factory()
+        try:
+            db.execute(
+                update(Lease)
+                .where(Lease.name == self.name, Lease.owner == self.owner)
+                .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.is_leader = False
+
+    async def run(self, on_elected: Callable[[], Awaitable[None]], on_demoted: Callable[[], Awaitable[None]]) -> None:
+        """Keep campaigning, calling on_elected/on_demoted whenever leadership changes"""
+        try:
+            while True:
+                try:
+                    leader = await asyncio.to_thread(self.try_acquire)
+                except Exception as e:
+                    self.renewal_errors += 1
+                    logger.warning(f"Lease '{self.name}' renewal failed: {str(e)}")
+                    leader = False
+
+                if leader and not self.is_leader:
+                    self.is_leader = True
+                    self.elections_won += 1
+                    logger.info(f"{self.owner} is now the '{self.name}' leader")
+                    await on_elected()
+                elif not leader and self.is_leader:
+                    self.is_leader = False
+                    logger.warning(f"{self.owner} lost the '{self.name}' lease")
+                    await on_demoted()
+                await asyncio.sleep(self.lease_seconds / 3)
+        finally:
+            if self.is_leader:
+                await on_demoted()
+                await asyncio.to_thread(self.release)
+
+    def start(self, on_elected: Callable[[], Awaitable[None]], on_demoted: Callable[[], Awaitable[None]]) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(on_elected, on_demoted))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "owner": self.owner,
+            "is_leader": self.is_leader,
+            "lease_seconds": self.lease_seconds,
+            "elections_won": self.elections_won,
+            "renewal_errors": self.renewal_errors
+        }
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 import datetime
+import os
 
 Base = declarative_base()
 
@@ -18,16 +20,66 @@ class BudgetReport(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
-    report_data = Column(Text)
+    report_data = Column(Text)  # legacy inline copy; new reports live in the result store
+    report_digest = Column(String, index=True)
     total_income = Column(Float)
     total_expenses = Column(Float)
     savings_rate = Column(Float)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+class Job(Base):
+    """MIP-003 job, shared by every API worker"""
+    __tablename__ = "jobs"
+    
+    job_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, index=True)
+    payment_status = Column(String)
+    payment_id = Column(String, index=True)
+    identifier_from_purchaser = Column(String)
+    input_data = Column(Text)
+    result = Column(Text)  # legacy inline result; new results live in the result store
+    result_digest = Column(String)
+    result_size = Column(Integer)
+    error = Column(Text)
+    # Worker that claimed the job for execution, and until when its claim holds
+    owner = Column(String)
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_jobs_status_finished_at", "status", "finished_at"),
+        Index("ix_jobs_status_owner", "status", "owner"),
+    )
+
+class Lease(Base):
+    """Named lease held by one worker at a time, e.g. the payment monitor leader"""
+    __tablename__ = "leases"
+    
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
 # Database setup
-DATABASE_URL = "sqlite:///./budget_planner.db"
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = os.getenv("BUDGET_DATABASE_URL", "sqlite:///./budget_planner.db")
+# Several API workers share the file, so wait on locks instead of failing
+engine = create_engine(DATABASE_URL, connect_args={"timeout": 30} if DATABASE_URL.startswith("sqlite") else {})
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # WAL lets readers in other workers proceed while one worker writes
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    try:
+        Base.metadata.create_all(bind=engine)
+    except OperationalError:
+        # Another worker starting at the same moment created a table first; the rest are checked again
+        Base.metadata.create_all(bind=engine)
\ No newline at end of file
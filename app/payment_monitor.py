@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.services.single_flight import SingleFlight
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FUNDS_LOCKED = "FundsLocked"
+
+class PaymentMonitor:
+    """One polling loop for the payments of every pending job.
+
+    Each tick loads the pending (job_id, blockchainIdentifier) pairs, checks
+    the next batch of them round-robin with bounded concurrency, and
+    dispatches `on_funds_locked` for payments whose funds are locked. Calls
+    to the payment service per tick are capped by the batch size, so load
+    follows the tick rate rather than the number of pending jobs.
+
+    current_status() serves /status from the last result seen for a payment
+    while it is younger than `status_ttl`, and otherwise refreshes it with one
+    coalesced call, so client polling costs at most one call per payment per
+    TTL. A failed refresh is remembered for `error_ttl` and serves the last
+    known state meanwhile, so an outage does not send every poll upstream.
+    """
+
+    def __init__(self, check_status: Callable[[str], Awaitable[Dict]],
+                 load_pending: Callable[[], List[Tuple[str, str]]],
+                 on_funds_locked: Callable[[str, str], Awaitable[None]],
+                 on_status: Optional[Callable[[str, str], None]] = None,
+                 interval: float = None, batch_size: int = None, max_concurrency: int = None,
+                 status_ttl: float = None, error_ttl: float = None):
+        self._check_status = check_status
+        self._load_pending = load_pending
+        self._on_funds_locked = on_funds_locked
+        self._on_status = on_status
+        self.interval = interval or float(os.getenv("PAYMENT_MONITOR_INTERVAL_SECONDS", "10"))
+        self.batch_size = batch_size or int(os.getenv("PAYMENT_MONITOR_BATCH_SIZE", "50"))
+        self.max_concurrency = max_concurrency or int(os.getenv("PAYMENT_MONITOR_CONCURRENCY", "8"))
+        self.status_ttl = status_ttl or float(os.getenv("PAYMENT_STATUS_CACHE_TTL_SECONDS", "5"))
+        self.error_ttl = error_ttl or float(os.getenv("PAYMENT_STATUS_ERROR_TTL_SECONDS", "2"))
+
+        self._cursor = 0
+        self._last_pruned = 0.0
+        self._last_status: Dict[str, Dict] = {}
+        self._dispatched: set = set()
+        self._handler_tasks: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._lookups = SingleFlight()
+        self.status_hits = 0
+        self.status_misses = 0
+        self.ticks = 0
+        self.checks = 0
+        self.check_errors = 0
+        self.dispatches = 0
+        self.dispatch_errors = 0
+        self.pending = 0
+
+    def last_status(self, payment_id: str) -> Optional[Dict]:
+        """Most recent on-chain state seen for a payment, with when it was checked"""
+        return self._last_status.get(payment_id)
+
+    async def current_status(self, job_id: str, payment_id: str) -> Optional[str]:
+        """On-chain state of a payment, at most `status_ttl` seconds old"""
+        self._prune_stale()
+        cached = self._last_status.get(payment_id)
+        if cached and time.time() - cached["checked_at"] < cached.get("ttl", self.status_ttl):
+            self.status_hits += 1
+            return cached["state"]
+        self.status_misses += 1
+
+        async def refresh() -> Optional[str]:
+            self.checks += 1
+            try:
+                result = await self._check_status(payment_id)
+            except Exception as e:
+                self.check_errors += 1
+                logger.warning(f"Payment status check failed for job {job_id}: {str(e)}")
+                # Keep serving the last known state until the shorter error TTL runs out
+                state = cached["state"] if cached else None
+                self._last_status[payment_id] = {"state": state, "checked_at": time.time(), "ttl": self.error_ttl}
+                return state
+            state = (result.get("data") or {}).get("onChainState")
+            self._record(job_id, payment_id, state)
+            return state
+
+        return await self._lookups.do(payment_id, refresh)
+
+    def _prune_stale(self) -> None:
+        """Forget expired lookups while this worker is not polling.
+
+        tick() prunes against the pending jobs, but only the leader ticks; on
+        the other workers /status lookups would otherwise pile up forever.
+        A payment still being polled is refreshed every TTL, so one not
+        refreshed for ten TTLs is no longer of interest.
+        """
+        now = time.time()
+        if self._task is not None or now - self._last_pruned < self.status_ttl:
+            return
+        self._last_pruned = now
+        for payment_id, entry in list(self._last_status.items()):
+            if now - entry["checked_at"] >= self.status_ttl * 10:
+                del self._last_status[payment_id]
+        self._dispatched &= set(self._last_status)
+
+    def _next_batch(self, pending: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        if len(pending) <= self.batch_size:
+            self._cursor = 0
+            return pending
+        start = self._cursor % len(pending)
+        batch = (pending[start:] + pending[:start])[:self.batch_size]
+        self._cursor = start + self.batch_size
+        return batch
+
+    async def tick(self) -> Dict:
+        """Check one batch of pending payments"""
+        pending = await asyncio.to_thread(self._load_pending)
+        self.pending = len(pending)
+        # Forget payments that are no longer pending
+        pending_ids = {payment_id for _, payment_id in pending}
+        self._dispatched &= pending_ids
+        for payment_id in list(self._last_status):
+            if payment_id not in pending_ids:
+                del self._last_status[payment_id]
+
+        batch = self._next_batch(pending)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def check(job_id: str, payment_id: str) -> None:
+            async with semaphore:
+                self.checks += 1
+                try:
+                    result = await self._check_status(payment_id)
+                except Exception as e:
+                    self.check_errors += 1
+                    logger.warning(f"Payment status check failed for job {job_id}: {str(e)}")
+                    return
+            self._record(job_id, payment_id, (result.get("data") or {}).get("onChainState"))
+
+        await asyncio.gather(*(check(job_id, payment_id) for job_id, payment_id in batch))
+        self.ticks += 1
+        return {"pending": len(pending), "checked": len(batch)}
+
+    def _record(self, job_id: str, payment_id: str, state: Optional[str]) -> None:
+        previous = self._last_status.get(payment_id, {}).get("state")
+        self._last_status[payment_id] = {"state": state, "checked_at": time.time()}
+        if state and state != previous and self._on_status:
+            self._on_status(job_id, state)
+
+        if state == FUNDS_LOCKED and payment_id not in self._dispatched:
+            self._dispatched.add(payment_id)
+            self.dispatches += 1
+            logger.info(f"Payment {payment_id[:8]}... funds locked, dispatching job {job_id}")
+            task = asyncio.create_task(self._on_funds_locked(job_id, payment_id))
+            self._handler_tasks.add(task)
+            task.add_done_callback(lambda t: self._handler_done(job_id, payment_id, t))
+
+    def _handler_done(self, job_id: str, payment_id: str, task: asyncio.Task) -> None:
+        self._handler_tasks.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        # Let the next check dispatch the payment again instead of leaving the job unpaid
+        self._dispatched.discard(payment_id)
+        self.dispatch_errors += 1
+        logger.error(f"Handling locked funds for job {job_id} failed: {str(task.exception())}",
+                     exc_info=task.exception())
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Payment monitor started ({self.interval}s interval, batch {self.batch_size})")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Payment monitor stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Payment monitor tick failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def metrics(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "pending": self.pending,
+            "ticks": self.ticks,
+            "checks": self.checks,
+            "check_errors": self.check_errors,
+            "dispatches": self.dispatches,
+            "dispatch_errors": self.dispatch_errors,
+            "status_cache_hits": self.status_hits,
+            "status_cache_misses": self.status_misses,
+            "status_cache_size": len(self._last_status),
+            "status_lookups_shared": self._lookups.shared,
+            "handlers_running": len(self._handler_tasks)
+        }
@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import importlib.util
+import os
+import tempfile
+from typing import Dict, Optional, Tuple, Union
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Stored encoding -> file suffix; the names double as HTTP Content-Encoding values
+ENCODINGS = {"zstd": ".zst", "gzip": ".gz"}
+
+def zstd_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    # mtime=0 keeps the output identical for identical content
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+class ResultStore:
+    """Content-addressed, compressed store for job results and reports.
+
+    Each result is written once under the SHA-256 of its text, so the same
+    report saved for a job, a BudgetReport and a BudgetAnalysis takes one
+    blob. Blobs are zstd-compressed when the optional zstandard package is
+    installed and gzip-compressed otherwise; both remain readable.
+    """
+
+    def __init__(self, root: str = None, encoding: str = None):
+        self.root = root or os.getenv("RESULT_STORE_DIR", "./results")
+        encoding = encoding or os.getenv("RESULT_STORE_ENCODING") or ("zstd" if zstd_available() else "gzip")
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported result encoding: {encoding}")
+        self.encoding = encoding
+        self.writes = 0
+        self.deduplicated = 0
+
+    def _path(self, digest: str, encoding: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + ENCODINGS[encoding])
+
+    def locate(self, digest: str) -> Optional[Tuple[str, str]]:
+        """(path, encoding) of a stored blob, or None"""
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        for encoding in ENCODINGS:
+            path = self._path(digest, encoding)
+            if os.path.exists(path):
+                return path, encoding
+        return None
+
+    def put(self, content: Union[str, bytes]) -> Dict:
+        """Store a result and return its reference (digest, size, encoding)"""
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self.locate(digest)
+        if existing:
+            self.deduplicated += 1
+            return {"digest": digest, "size": len(data), "encoding": existing[1]}
+
+        path = self._path(digest, self.encoding)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compress(data, self.encoding))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.writes += 1
+        return {"digest": digest, "size": len(data), "encoding": self.encoding}
+
+    def read_encoded(self, digest: str) -> Optional[Tuple[bytes, str]]:
+        """Compressed blob bytes and their encoding, for passing straight to clients"""
+        located = self.locate(digest)
+        if located is None:
+            return None
+        path, encoding = located
+        with open(path, "rb") as f:
+            return f.read(), encoding
+
+    def read(self, digest: str) -> Optional[bytes]:
+        encoded = self.read_encoded(digest)
+        if encoded is None:
+            return None
+        return decompress(*encoded)
+
+    def read_text(self, digest: str) -> Optional[str]:
+        data = self.read(digest)
+        return data.decode("utf-8") if data is not None else None
+
+    def stats(self) -> Dict:
+        return {"encoding": self.encoding, "writes": self.writes, "deduplicated": self.deduplicated}
@@ -1,70 +1,269 @@
+import asyncio
 import httpx
+import ijson
+import importlib.util
 import json
 import os
-from typing import Dict, List, Optional
+import random
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
+from app.services.resilience import CircuitBreaker, LatencyTracker
+from app.services.single_flight import SingleFlight, TTLCache
 from logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Consent states that will not change on their own
+TERMINAL_CONSENT_STATES = ("ACTIVE", "REJECTED", "EXPIRED")
+
 class AAClient:
-    """Account Aggregator client for fetching financial data"""
+    """Account Aggregator client for fetching financial data.
+    
+    Holds one long-lived httpx.AsyncClient so calls reuse pooled keep-alive
+    connections instead of paying a TCP/TLS handshake each time. Call start()
+    and aclose() from the app lifespan; the client is also created lazily on
+    first use. `transport` replaces the network transport, e.g. in tests.
+    """
     
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.transport = transport
         self.base_url = os.getenv("AA_BASE_URL", "https://sandbox.setu.co/api")
         self.api_key = os.getenv("AA_API_KEY")
         self.client_id = os.getenv("AA_CLIENT_ID")
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("AA_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("AA_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("AA_KEEPALIVE_EXPIRY_SECONDS", "30"))
+        )
+        self.timeout = httpx.Timeout(
+            float(os.getenv("AA_TIMEOUT_SECONDS", "30")),
+            connect=float(os.getenv("AA_CONNECT_TIMEOUT_SECONDS", "5"))
+        )
+        # HTTP/2 needs the optional h2 package
+        self.http2 = (
+            os.getenv("AA_HTTP2", "true").lower() == "true"
+            and importlib.util.find_spec("h2") is not None
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        # Concurrent status checks for one consent share a request; terminal states are cached
+        self._status_flight = SingleFlight()
+        self._status_cache = TTLCache(float(os.getenv("AA_STATUS_CACHE_TTL_SECONDS", "60")))
+        self.poll_initial_delay = float(os.getenv("AA_POLL_INITIAL_DELAY_SECONDS", "1"))
+        self.poll_max_delay = float(os.getenv("AA_POLL_MAX_DELAY_SECONDS", "30"))
+        self.poll_timeout = float(os.getenv("AA_POLL_TIMEOUT_SECONDS", "300"))
+        # Streaming FI fetch: JSON path of the transaction items and records per yielded chunk
+        self.fi_items_prefix = os.getenv("AA_FI_ITEMS_PREFIX", "transactions.item")
+        self.stream_chunk_size = int(os.getenv("AA_STREAM_CHUNK_SIZE", "1000"))
+        # Serve the built-in demo transactions instead of calling the AA (e.g. the local stand-in server)
+        self.use_mock_data = os.getenv("AA_USE_MOCK_DATA", "true").lower() == "true"
+        # Per-endpoint latency and circuit breakers so an unhealthy AA fails fast
+        self.breaker_failure_threshold = int(os.getenv("AA_BREAKER_FAILURE_THRESHOLD", "5"))
+        self.breaker_recovery_seconds = float(os.getenv("AA_BREAKER_RECOVERY_SECONDS", "30"))
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Hedged GETs: retry in parallel once the first attempt passes the endpoint's p95
+        self.hedge_requests = os.getenv("AA_HEDGE_REQUESTS", "false").lower() == "true"
+        self.hedge_min_samples = int(os.getenv("AA_HEDGE_MIN_SAMPLES", "20"))
+        self.hedges_fired = 0
+        self.hedges_won = 0
+    
+    async def start(self) -> None:
+        """Create the shared connection pool"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                transport=self.transport
+            )
+            logger.info(f"AA client started (http2={self.http2}, max_connections={self.limits.max_connections})")
+    
+    async def aclose(self) -> None:
+        """Close the shared connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("AA client closed")
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        return self._client
+    
+    def _endpoint(self, name: str):
+        if name not in self._latency:
+            self._latency[name] = LatencyTracker()
+            self._breakers[name] = CircuitBreaker(
+                name, self.breaker_failure_threshold, self.breaker_recovery_seconds
+            )
+        return self._latency[name], self._breakers[name]
+    
+    async def _send(self, endpoint: str, method: str, url: str, timeout: Optional[float] = None,
+                    hedge: bool = False, stream: bool = False, **kwargs) -> httpx.Response:
+        """Send a request through the endpoint's circuit breaker, recording its latency.
+        
+        With stream=True the latency covers the response headers and the
+        caller must close the response.
+        """
+        tracker, breaker = self._endpoint(endpoint)
+        breaker.check()
+        client = await self._get_client()
+        timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        
+        def send():
+            return client.send(client.build_request(method, url, timeout=timeout, **kwargs), stream=stream)
+        
+        started = time.perf_counter()
+        try:
+            if hedge and self.hedge_requests:
+                response = await self._hedged(tracker, send)
+            else:
+                response = await send()
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            tracker.record(time.perf_counter() - started, ok=False)
+            breaker.record_failure()
+            raise
+        
+        ok = response.status_code < 500
+        tracker.record(time.perf_counter() - started, ok)
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        return response
+    
+    async def _hedged(self, tracker: LatencyTracker, send) -> httpx.Response:
+        """Fire a second attempt if the first runs past p95, and take whichever answers first"""
+        first = asyncio.ensure_future(send())
+        if len(tracker) < self.hedge_min_samples:
+            return await first
         
-    async def initiate_consent(self, user_id: str, accounts: List[str]) -> Dict:
+        done, _ = await asyncio.wait({first}, timeout=tracker.percentile(95))
+        if done:
+            return first.result()
+        
+        self.hedges_fired += 1
+        second = asyncio.ensure_future(send())
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedges_won += 1
+                        return task.result()
+            # Both attempts failed
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def metrics(self) -> Dict:
+        """Per-endpoint latency, breaker state and hedging counters"""
+        return {
+            "endpoints": {
+                name: {**tracker.stats(), "breaker": self._breakers[name].stats()}
+                for name, tracker in self._latency.items()
+            },
+            "hedging": {
+                "enabled": self.hedge_requests,
+                "fired": self.hedges_fired,
+                "won": self.hedges_won
+            },
+            "status_checks": self.status_stats()
+        }
+    
+    async def initiate_consent(self, user_id: str, accounts: List[str], timeout: Optional[float] = None) -> Dict:
         """Initiate consent request for account data"""
         try:
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "userId": user_id,
-                    "accounts": accounts,
-                    "dataRange": {
-                        "from": "2024-01-01",
-                        "to": "2024-12-31"
-                    }
+            payload = {
+                "userId": user_id,
+                "accounts": accounts,
+                "dataRange": {
+                    "from": "2024-01-01",
+                    "to": "2024-12-31"
                 }
-                
-                response = await client.post(
-                    f"{self.base_url}/consent",
-                    json=payload,
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
-                
-                if response.status_code == 200:
-                    logger.info("Consent initiated successfully")
-                    return response.json()
-                else:
-                    logger.error(f"Consent initiation failed: {response.text}")
-                    return {"error": "Consent initiation failed"}
+            }
+            
+            response = await self._send("consent", "POST", "/consent", timeout, json=payload)
+            
+            if response.status_code == 200:
+                logger.info("Consent initiated successfully")
+                return response.json()
+            else:
+                logger.error(f"Consent initiation failed: {response.text}")
+                return {"error": "Consent initiation failed"}
                     
         except Exception as e:
             logger.error(f"Error initiating consent: {str(e)}")
             return {"error": str(e)}
     
-    async def check_status(self, consent_id: str) -> Dict:
-        """Check consent status"""
+    async def check_status(self, consent_id: str, timeout: Optional[float] = None) -> Dict:
+        """Check consent status.
+        
+        Terminal states are served from a short TTL cache, and concurrent calls
+        for the same consent share one upstream request.
+        """
+        cached = self._status_cache.get(consent_id)
+        if cached is not None:
+            return cached
+        
+        result = await self._status_flight.do(consent_id, lambda: self._fetch_status(consent_id, timeout))
+        if consent_state(result) in TERMINAL_CONSENT_STATES:
+            self._status_cache.set(consent_id, result)
+        return result
+    
+    async def _fetch_status(self, consent_id: str, timeout: Optional[float] = None) -> Dict:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/consent/{consent_id}/status",
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Status check failed: {response.text}")
-                    return {"error": "Status check failed"}
+            # Status checks are idempotent, so they may be hedged
+            response = await self._send("status", "GET", f"/consent/{consent_id}/status", timeout, hedge=True)
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Status check failed: {response.text}")
+                return {"error": "Status check failed"}
                     
         except Exception as e:
             logger.error(f"Error checking status: {str(e)}")
             return {"error": str(e)}
     
-    async def fetch_data(self, consent_id: str) -> Dict:
+    async def poll_until_terminal(self, consent_id: str, timeout: Optional[float] = None) -> Dict:
+        """Poll consent status with exponential backoff and jitter until a terminal state"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.poll_timeout)
+        delay = self.poll_initial_delay
+        while True:
+            result = await self.check_status(consent_id)
+            if consent_state(result) in TERMINAL_CONSENT_STATES:
+                return result
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {"error": f"Consent {consent_id} not resolved in time", "last_status": result}
+            # Jitter spreads out pollers that started together
+            await asyncio.sleep(min(remaining, delay * random.uniform(0.5, 1.0)))
+            delay = min(delay * 2, self.poll_max_delay)
+    
+    def status_stats(self) -> Dict:
+        """Upstream call volume versus calls saved by coalescing and caching"""
+        return {
+            "upstream_calls": self._status_flight.calls,
+            "coalesced_calls": self._status_flight.shared,
+            "cache_hits": self._status_cache.hits,
+            "cached_consents": len(self._status_cache)
+        }
+    
+    async def fetch_data(self, consent_id: str, timeout: Optional[float] = None) -> Dict:
         """Fetch transaction data using consent"""
+        if not self.use_mock_data:
+            return await self._fetch_fi_data(consent_id, timeout)
         try:
             # For demo purposes, return mock transaction data
             # In production, this would make actual API calls to AA
@@ -88,4 +287,109 @@ class AAClient:
             
         except Exception as e:
             logger.error(f"Error fetching data: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+    async def _fetch_fi_data(self, consent_id: str, timeout: Optional[float] = None) -> Dict:
+        try:
+            response = await self._send("fi_fetch", "GET", f"/fi/fetch/{consent_id}", timeout)
+            
+            if response.status_code == 200:
+                data = response.json()
+                logger.info(f"Fetched {len(data.get('transactions', []))} transactions")
+                return data
+            else:
+                logger.error(f"FI fetch failed: {response.text}")
+                return {"error": "FI fetch failed"}
+                    
+        except Exception as e:
+            logger.error(f"Error fetching data: {str(e)}")
+            return {"error": str(e)}
+    
+    async def fetch_data_stream(self, consent_id: str, chunk_size: Optional[int] = None,
+                                timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Stream FI transactions in chunks of normalized bank records.
+        
+        The body is parsed incrementally as bytes arrive, so memory use depends
+        on the chunk size rather than the payload size and the caller can
+        start ingesting before the download finishes.
+        """
+        chunk_size = chunk_size or self.stream_chunk_size
+        items = ijson.sendable_list()
+        parser = ijson.items_coro(items, self.fi_items_prefix, use_float=True)
+        batch = []
+        
+        response = await self._send("fi_fetch", "GET", f"/fi/fetch/{consent_id}", timeout, stream=True)
+        try:
+            if response.status_code != 200:
+                await response.aread()
+                logger.error(f"FI fetch failed: {response.text}")
+                response.raise_for_status()
+            
+            async for data in response.aiter_bytes():
+                parser.send(data)
+                for item in items:
+                    batch.append(normalize_fi_transaction(item))
+                    if len(batch) >= chunk_size:
+                        yield batch
+                        batch = []
+                del items[:]
+        finally:
+            await response.aclose()
+        parser.close()
+        
+        if batch:
+            yield batch
+
+    async def fetch_encrypted_stream(self, consent_id: str, key_material: Dict,
+                                     timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        """Stream encrypted FI entries (one per FIP, holding per-account blobs).
+        
+        Send this FIU's key material with the request; decrypt the entries with
+        an FIDecryptor.
+        """
+        items = ijson.sendable_list()
+        parser = ijson.items_coro(items, "FI.item")
+        
+        response = await self._send(
+            "fi_fetch", "POST", f"/fi/fetch/{consent_id}", timeout, stream=True,
+            json={"KeyMaterial": key_material}
+        )
+        try:
+            if response.status_code != 200:
+                await response.aread()
+                logger.error(f"Encrypted FI fetch failed: {response.text}")
+                response.raise_for_status()
+            
+            async for data in response.aiter_bytes():
+                parser.send(data)
+                for item in items:
+                    yield item
+                del items[:]
+        finally:
+            await response.aclose()
+        parser.close()
+
+def normalize_fi_transaction(item: Dict) -> Dict:
+    """Turn an AA FI transaction into a raw bank record (timestamp, description, type, signed amount)"""
+    amount = float(item["amount"])
+    tx_type = str(item.get("type", "")).lower()
+    if tx_type not in ("debit", "credit"):
+        tx_type = "debit" if amount < 0 else "credit"
+    
+    timestamp = datetime.fromisoformat(
+        item.get("transactionTimestamp") or item.get("valueDate") or item["date"]
+    )
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return {
+        "timestamp": timestamp,
+        "description": item.get("narration") or item.get("description") or "",
+        "type": tx_type,
+        "amount": -abs(amount) if tx_type == "debit" else abs(amount)
+    }
+
+def consent_state(status: Dict) -> Optional[str]:
+    """Normalized consent state from a status response"""
+    state = status.get("status") or status.get("consentStatus")
+    return state.upper() if isinstance(state, str) else None
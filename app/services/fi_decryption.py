@@ -0,0 +1,165 @@
+import asyncio
+import base64
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+NONCE_SIZE = 32
+
+class FIDecryptionError(Exception):
+    """Raised when an encrypted FI blob cannot be decrypted or parsed"""
+
+def public_key_for(private_key: bytes) -> bytes:
+    """Raw Curve25519 public key of a raw private key"""
+    return X25519PrivateKey.from_private_bytes(private_key).public_key().public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw
+    )
+
+def generate_key_pair() -> Tuple[bytes, bytes]:
+    """New Curve25519 key pair as raw (private, public) bytes"""
+    private_key = X25519PrivateKey.generate()
+    private_bytes = private_key.private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+    )
+    return private_bytes, public_key_for(private_bytes)
+
+def key_material(public_key: bytes, nonce: bytes) -> Dict:
+    """KeyMaterial block (ECDH over Curve25519) as exchanged in FI requests and responses"""
+    return {
+        "cryptoAlg": "ECDH",
+        "curve": "Curve25519",
+        "params": "",
+        "DHPublicKey": {"KeyValue": base64.b64encode(public_key).decode()},
+        "Nonce": base64.b64encode(nonce).decode()
+    }
+
+def _session_cipher(private_key: bytes, nonce: bytes, remote_material: Dict) -> Tuple[AESGCM, bytes]:
+    """AES-GCM cipher and IV agreed from our key and nonce plus the other side's key material.
+
+    The ECDH shared secret goes through HKDF salted with the XOR of both
+    nonces; the IV is the last 12 bytes of that XOR.
+    """
+    remote_key = base64.b64decode(remote_material["DHPublicKey"]["KeyValue"])
+    remote_nonce = base64.b64decode(remote_material["Nonce"])
+    shared = X25519PrivateKey.from_private_bytes(private_key).exchange(X25519PublicKey.from_public_bytes(remote_key))
+    xored = bytes(a ^ b for a, b in zip(nonce, remote_nonce))
+    session_key = HKDF(algorithm=hashes.SHA256(), length=32, salt=xored[:20], info=None).derive(shared)
+    return AESGCM(session_key), xored[-12:]
+
+def encrypt_fi_data(plaintext: bytes, private_key: bytes, nonce: bytes, remote_material: Dict) -> str:
+    """Encrypt one account's FI data as the sending side does (base64 ciphertext)"""
+    cipher, iv = _session_cipher(private_key, nonce, remote_material)
+    return base64.b64encode(cipher.encrypt(iv, plaintext, None)).decode()
+
+def decrypt_fi_data(encrypted: str, private_key: bytes, nonce: bytes, remote_material: Dict) -> bytes:
+    """Decrypt one account's base64 FI ciphertext"""
+    cipher, iv = _session_cipher(private_key, nonce, remote_material)
+    return cipher.decrypt(iv, base64.b64decode(encrypted), None)
+
+def decrypt_account(private_key: bytes, nonce: bytes, remote_material: Dict, account: Dict) -> List[Dict]:
+    """Decrypt and normalize one account blob into raw bank records.
+
+    Runs in a worker process, so only the normalized rows travel back.
+    """
+    from app.services.aa_client import normalize_fi_transaction
+
+    reference = account.get("maskedAccNumber") or account.get("linkRefNumber")
+    try:
+        plaintext = decrypt_fi_data(account["encryptedFI"], private_key, nonce, remote_material)
+        fi_account = json.loads(plaintext)
+    except Exception as e:
+        raise FIDecryptionError(f"Could not decrypt FI data for account {reference}: {e!r}")
+
+    transactions = fi_account.get("Transactions", {}).get("Transaction", [])
+    return [normalize_fi_transaction(tx) for tx in transactions]
+
+class FISession:
+    """Key pair and nonce for one FI request.
+
+    Send key_material() with the request and decrypt its response with the
+    same session; every request gets a new one.
+    """
+
+    def __init__(self, private_key: bytes, nonce: Optional[bytes] = None):
+        self.private_key = private_key
+        self.public_key = public_key_for(private_key)
+        self.nonce = nonce or os.urandom(NONCE_SIZE)
+
+    def key_material(self) -> Dict:
+        return key_material(self.public_key, self.nonce)
+
+class FIDecryptor:
+    """Decrypts encrypted FI responses across a process pool.
+
+    new_session() draws a fresh nonce for each FI request, and a fresh
+    ephemeral key pair too unless this FIU's key is configured. decrypt_stream()
+    fans account blobs out to worker processes with a bounded number in flight
+    and yields normalized rows as each account finishes, so the decrypted set
+    never has to fit in memory at once.
+    """
+
+    def __init__(self, private_key: Optional[bytes] = None, max_workers: Optional[int] = None):
+        configured_key = os.getenv("AA_FIU_PRIVATE_KEY")
+        if private_key is None and configured_key:
+            private_key = base64.b64decode(configured_key)
+        # None means an ephemeral key pair per request
+        self.private_key = private_key
+        self.max_workers = max_workers or int(os.getenv("AA_DECRYPT_WORKERS", str(os.cpu_count() or 2)))
+        self.max_in_flight = self.max_workers * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.accounts_decrypted = 0
+        self.sessions = 0
+
+    def new_session(self) -> FISession:
+        """Key material for one FI request"""
+        self.sessions += 1
+        return FISession(self.private_key or generate_key_pair()[0])
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def decrypt_stream(self, fi_entries: AsyncIterator[Dict], session: FISession,
+                             chunk_size: int = 1000) -> AsyncIterator[List[Dict]]:
+        """Yield chunks of raw bank records decrypted from a stream of per-FIP FI entries,
+        the response to an FI request sent with `session`'s key material"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        in_flight = set()
+
+        async def completed():
+            nonlocal in_flight
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                rows = future.result()
+                self.accounts_decrypted += 1
+                for i in range(0, len(rows), chunk_size):
+                    yield rows[i:i + chunk_size]
+
+        try:
+            async for entry in fi_entries:
+                remote_material = entry["KeyMaterial"]
+                for account in entry.get("data", []):
+                    in_flight.add(loop.run_in_executor(
+                        pool, decrypt_account, session.private_key, session.nonce, remote_material, account
+                    ))
+                    if len(in_flight) >= self.max_in_flight:
+                        async for chunk in completed():
+                            yield chunk
+            while in_flight:
+                async for chunk in completed():
+                    yield chunk
+        finally:
+            for future in in_flight:
+                future.cancel()
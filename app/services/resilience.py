@@ -0,0 +1,97 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its circuit breaker is open"""
+
+class LatencyTracker:
+    """Rolling window of call latencies for one endpoint"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+        if not ok:
+            self.errors += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def stats(self) -> Dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None
+        }
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls
+    fail fast. Once `recovery_timeout` has passed a single trial call is let
+    through; its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead"""
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(f"AA circuit open for {self.name}")
+
+    def release(self) -> None:
+        """Give up a trial call without an outcome, e.g. when it was cancelled"""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_in_flight = False
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
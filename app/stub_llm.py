@@ -0,0 +1,31 @@
+import hashlib
+import time
+from typing import Any
+from crewai import BaseLLM
+
+class StubLLM(BaseLLM):
+    """Deterministic offline LLM for exercising crews without an API key.
+
+    Every call answers immediately with a final answer derived from a hash of
+    the prompt, optionally after a fixed delay to simulate network latency.
+    """
+
+    latency_seconds: float = 0.0
+    call_count: int = 0
+
+    def __init__(self, latency_seconds: float = 0.0, **kwargs):
+        super().__init__(model=kwargs.pop("model", "stub"), **kwargs)
+        self.latency_seconds = latency_seconds
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None) -> Any:
+        self.call_count += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        prompt = messages if isinstance(messages, str) else "\n".join(
+            str(message.get("content", "")) for message in messages
+        )
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        role = from_agent.role if from_agent is not None else "agent"
+        return f"Thought: I now know the final answer\nFinal Answer: [{role}] stub response {digest}"
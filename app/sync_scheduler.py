@@ -0,0 +1,197 @@
+import asyncio
+import heapq
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.bank_sync_service import BankSyncService
+from app.fiu_models import BankAccount, Transaction, SessionLocal
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class SyncScheduler:
+    """Background scheduler that keeps bank accounts synced without user clicks.
+
+    Accounts sit in a priority queue ordered by due time. Accounts of recently
+    active users come due more often, every due time is jittered to spread load,
+    concurrent syncs are capped, and dispatching pauses while DB write latency is
+    above a threshold. Accounts deleted from the DB drop out of the schedule.
+    """
+
+    def __init__(self, sync_service: BankSyncService = None, max_concurrency: int = None):
+        self.sync_service = sync_service or BankSyncService()
+        self.active_interval = int(os.getenv("SYNC_ACTIVE_INTERVAL_SECONDS", "900"))
+        self.idle_interval = int(os.getenv("SYNC_IDLE_INTERVAL_SECONDS", "21600"))
+        self.active_window_days = int(os.getenv("SYNC_ACTIVE_WINDOW_DAYS", "7"))
+        self.jitter_ratio = float(os.getenv("SYNC_JITTER_RATIO", "0.1"))
+        self.max_concurrency = max_concurrency or int(os.getenv("SYNC_SCHEDULER_CONCURRENCY", "4"))
+        self.latency_threshold_ms = float(os.getenv("SYNC_WRITE_LATENCY_THRESHOLD_MS", "500"))
+        self.refresh_interval = int(os.getenv("SYNC_REFRESH_INTERVAL_SECONDS", "300"))
+
+        self._queue: List[Tuple[float, int]] = []
+        self._queued: set = set()
+        self._in_flight: set = set()
+        self._intervals: Dict[int, int] = {}
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._task: Optional[asyncio.Task] = None
+        self._sync_tasks: set = set()
+        self._last_refresh = 0.0
+        self._write_latency_ms = 0.0
+        self._paused = False
+        self._completed = 0
+        self._failed = 0
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * (1 + random.uniform(-self.jitter_ratio, self.jitter_ratio))
+
+    def _schedule(self, account_id: int, due: float) -> None:
+        if account_id in self._queued or account_id in self._in_flight:
+            return
+        heapq.heappush(self._queue, (due, account_id))
+        self._queued.add(account_id)
+
+    def _forget(self, account_ids: set) -> None:
+        """Stop scheduling accounts; one being synced right now is not requeued when it finishes"""
+        for account_id in account_ids:
+            self._intervals.pop(account_id, None)
+        if self._queued & account_ids:
+            self._queue = [(due, account_id) for due, account_id in self._queue if account_id not in account_ids]
+            heapq.heapify(self._queue)
+            self._queued -= account_ids
+
+    def refresh_accounts(self) -> int:
+        """Load accounts from the DB and queue any that are not yet scheduled"""
+        db = SessionLocal()
+        try:
+            active_since = datetime.utcnow() - timedelta(days=self.active_window_days)
+            # Only transactions the user made in the app count; synced bank rows carry a fingerprint
+            # and the bank's own timestamp, so they say nothing about whether the user is around
+            active_users = {
+                row[0] for row in db.query(Transaction.user_id)
+                .filter(Transaction.created_at >= active_since, Transaction.fingerprint.is_(None))
+                .distinct()
+            }
+            accounts = db.query(BankAccount.id, BankAccount.user_id, BankAccount.last_sync).all()
+        finally:
+            db.close()
+
+        # Accounts deleted since the last refresh
+        removed = (set(self._intervals) | self._queued) - {account_id for account_id, _, _ in accounts}
+        self._forget(removed)
+
+        now = time.time()
+        added = 0
+        for account_id, user_id, last_sync in accounts:
+            interval = self.active_interval if user_id in active_users else self.idle_interval
+            self._intervals[account_id] = interval
+            if account_id in self._queued or account_id in self._in_flight:
+                continue
+            if last_sync:
+                # last_sync is stored in UTC
+                age = (datetime.utcnow() - last_sync).total_seconds()
+                due = now + max(0.0, self._jittered(interval) - age)
+            else:
+                due = now + random.uniform(0, self.jitter_ratio * interval)
+            self._schedule(account_id, due)
+            added += 1
+        self._last_refresh = now
+        logger.info(f"Sync scheduler refreshed {len(accounts)} accounts, {added} newly queued, "
+                    f"{len(removed)} removed")
+        return added
+
+    async def start(self) -> None:
+        if self._task is None:
+            await asyncio.to_thread(self.refresh_accounts)
+            self._task = asyncio.create_task(self._run())
+            logger.info("Sync scheduler started")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._sync_tasks):
+            task.cancel()
+        logger.info("Sync scheduler stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if time.time() - self._last_refresh > self.refresh_interval:
+                    await asyncio.to_thread(self.refresh_accounts)
+
+                # Backpressure: hold off while DB writes are slow
+                self._paused = self._write_latency_ms > self.latency_threshold_ms
+                if self._paused:
+                    logger.warning(f"Sync scheduler paused, write latency {self._write_latency_ms:.0f}ms")
+                    # Decay the estimate so dispatching resumes once the DB has had a break
+                    self._write_latency_ms *= 0.5
+                    await asyncio.sleep(1)
+                    continue
+
+                if not self._queue or self._queue[0][0] > time.time():
+                    wait = self._queue[0][0] - time.time() if self._queue else self.refresh_interval
+                    await asyncio.sleep(max(0.05, min(wait, 1.0)))
+                    continue
+
+                await self._semaphore.acquire()
+                due, account_id = heapq.heappop(self._queue)
+                self._queued.discard(account_id)
+                self._in_flight.add(account_id)
+                task = asyncio.create_task(self._sync_account(account_id))
+                self._sync_tasks.add(task)
+                task.add_done_callback(self._sync_tasks.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Sync scheduler loop error: {str(e)}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _sync_account(self, account_id: int) -> None:
+        try:
+            started = time.perf_counter()
+            result = await asyncio.to_thread(self.sync_service.full_account_sync, account_id)
+            timings = result.get("timings", {})
+            if timings:
+                # Only the DB write stages, not the time spent waiting on the bank
+                elapsed_ms = timings["insert_ms"] + timings["commit_ms"]
+            else:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            # Exponentially weighted estimate of DB write latency
+            self._write_latency_ms = 0.8 * self._write_latency_ms + 0.2 * elapsed_ms
+            if result.get("success"):
+                self._completed += 1
+            elif result.get("error") == "Account not found":
+                logger.info(f"Account {account_id} no longer exists, dropping it from the sync schedule")
+                self._forget({account_id})
+            else:
+                self._failed += 1
+                logger.warning(f"Scheduled sync of account {account_id} failed: {result.get('error')}")
+        finally:
+            self._in_flight.discard(account_id)
+            self._semaphore.release()
+            if account_id in self._intervals:
+                self._schedule(account_id, time.time() + self._jittered(self._intervals[account_id]))
+
+    def metrics(self) -> Dict:
+        """Queue depth, lag and throughput counters"""
+        now = time.time()
+        overdue = [due for due, _ in self._queue if due <= now]
+        return {
+            "running": self._task is not None,
+            "paused": self._paused,
+            "queue_depth": len(self._queue),
+            "overdue": len(overdue),
+            "lag_seconds": round(now - min(overdue), 3) if overdue else 0.0,
+            "in_flight": len(self._in_flight),
+            "max_concurrency": self.max_concurrency,
+            "write_latency_ms": round(self._write_latency_ms, 2),
+            "syncs_completed": self._completed,
+            "syncs_failed": self._failed,
+            "next_due_in_seconds": round(self._queue[0][0] - now, 3) if self._queue else None
+        }
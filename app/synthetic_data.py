@@ -0,0 +1,284 @@
+import json
+import math
+import random
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Dict, IO, Iterator, List, Optional
+
+# (category, description, type, typical amount, relative weight, weekend factor)
+DISCRETIONARY_CATALOG = [
+    ("groceries", "BIGBASKET GROCERY", "debit", 1800, 10, 1.2),
+    ("groceries", "DMART SUPERMARKET", "debit", 2400, 8, 1.4),
+    ("groceries", "LOCAL VEGETABLES AND FRUITS", "debit", 350, 12, 1.1),
+    ("food", "ZOMATO ONLINE ORDER", "debit", 550, 12, 1.5),
+    ("food", "SWIGGY ORDER", "debit", 480, 12, 1.5),
+    ("food", "RESTAURANT DINING", "debit", 1600, 5, 1.8),
+    ("transport", "UBER RIDE", "debit", 320, 10, 1.2),
+    ("transport", "OLA CABS", "debit", 290, 8, 1.2),
+    ("transport", "METRO CARD RECHARGE", "debit", 500, 4, 0.6),
+    ("fuel", "HP PETROL PUMP", "debit", 1500, 5, 1.1),
+    ("shopping", "AMAZON SHOPPING", "debit", 1900, 6, 1.3),
+    ("shopping", "FLIPKART ORDER", "debit", 1700, 5, 1.3),
+    ("shopping", "SHOPPING MALL", "debit", 3200, 3, 2.0),
+    ("entertainment", "PVR CINEMA MOVIE TICKETS", "debit", 800, 3, 2.2),
+    ("entertainment", "STEAM GAMES", "debit", 600, 1, 1.6),
+    ("healthcare", "APOLLO PHARMACY MEDICAL STORE", "debit", 650, 3, 1.0),
+    ("bills", "MOBILE RECHARGE", "debit", 399, 2, 1.0),
+    ("cash", "ATM WITHDRAWAL", "debit", 3000, 3, 1.2),
+    ("freelance", "FREELANCE PAYMENT", "credit", 8000, 1, 0.8),
+]
+
+# (category, description, type, share of monthly salary, day of month)
+RECURRING_CATALOG = [
+    ("salary", "SALARY CREDIT", "credit", 1.0, 1),
+    ("rent", "RENT PAYMENT", "debit", 0.3, 5),
+    ("bills", "ELECTRICITY BILL", "debit", 0.035, 10),
+    ("bills", "INTERNET BROADBAND BILL", "debit", 0.012, 12),
+    ("entertainment", "NETFLIX SUBSCRIPTION", "debit", 0.008, 15),
+    ("entertainment", "SPOTIFY SUBSCRIPTION", "debit", 0.002, 18),
+    ("insurance", "INSURANCE PREMIUM", "debit", 0.04, 20),
+    ("loan_emi", "HOME LOAN EMI", "debit", 0.15, 7),
+]
+
+# Festival season (Oct-Dec) spends more, January and post-holiday months less
+MONTH_FACTORS = {1: 0.85, 2: 0.9, 3: 1.0, 4: 0.95, 5: 1.0, 6: 0.95,
+                 7: 0.95, 8: 1.05, 9: 1.0, 10: 1.25, 11: 1.35, 12: 1.2}
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Ishaan", "Kavya", "Meera",
+               "Rohan", "Saanvi", "Arjun", "Priya", "Rahul", "Neha", "Vikram", "Sneha"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Patel", "Nair", "Gupta", "Singh",
+              "Mehta", "Das", "Kulkarni", "Menon", "Joshi", "Rao", "Bose", "Khan"]
+BANKS = [("HDFC Bank", "HDFC"), ("State Bank of India", "SBIN"), ("ICICI Bank", "ICIC"),
+         ("Axis Bank", "UTIB"), ("Kotak Mahindra Bank", "KKBK")]
+
+class SyntheticBankDataGenerator:
+    """Seeded generator of realistic users, accounts and bank transactions.
+
+    Every account's ledger is a pure function of (seed, daily rate, account
+    number, day), so any window can be regenerated independently and
+    overlapping syncs, bulk loads and exports see exactly the same transactions.
+    """
+
+    source_name = "synthetic"
+
+    def __init__(self, seed: int = 42, daily_rate: float = 3.0):
+        self.seed = seed
+        self.daily_rate = daily_rate
+        self._weights = [entry[4] for entry in DISCRETIONARY_CATALOG]
+        self._profiles: Dict[str, Dict] = {}
+
+    def _rng(self, *parts) -> random.Random:
+        return random.Random(":".join(str(p) for p in (self.seed,) + parts))
+
+    def profile(self, account_number: str) -> Dict:
+        """Stable spending profile for an account"""
+        if account_number not in self._profiles:
+            rng = self._rng("profile", account_number)
+            salary = round(rng.lognormvariate(math.log(60000), 0.45), -3)
+            self._profiles[account_number] = {
+                "salary": salary,
+                "spend_scale": salary / 60000,
+                "activity": rng.uniform(0.6, 1.4)
+            }
+        return self._profiles[account_number]
+
+    def users(self, count: int, start_index: int = 0) -> Iterator[Dict]:
+        for i in range(start_index, start_index + count):
+            rng = self._rng("user", i)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield {
+                "index": i,
+                "user_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "name": f"{first} {last}",
+                "email": f"{first.lower()}.{last.lower()}.{i}@example.com",
+                "phone": f"9{self.seed % 10}{i:08d}"[:10]
+            }
+
+    def accounts(self, user: Dict, count: int) -> Iterator[Dict]:
+        for j in range(count):
+            rng = self._rng("account", user["index"], j)
+            bank_name, ifsc_prefix = rng.choice(BANKS)
+            yield {
+                "account_number": f"{self.seed % 100:02d}{user['index']:08d}{j:02d}{rng.randint(0, 99):02d}",
+                "account_holder_name": user["name"],
+                "bank_name": bank_name,
+                "account_type": "savings" if j == 0 else rng.choice(["savings", "current"]),
+                "ifsc_code": f"{ifsc_prefix}0{rng.randint(0, 999999):06d}",
+                "is_primary": j == 0
+            }
+
+    def day_transactions(self, account_number: str, day: date, count: Optional[int] = None) -> List[Dict]:
+        """Raw bank records for one account on one day.
+
+        The day's count, recurring items and discretionary items each draw from
+        their own RNG, so recurring items never depend on the count and a day
+        with an explicit `count` is a prefix of the same day with a larger one.
+        """
+        profile = self.profile(account_number)
+        weekend = day.weekday() >= 5
+        season = MONTH_FACTORS[day.month]
+
+        if count is None:
+            expected = self.daily_rate * profile["activity"] * season * (1.2 if weekend else 1.0)
+            count = _poisson(self._rng("count", account_number, day.isoformat(), self.daily_rate), expected)
+
+        records = []
+        rng = self._rng("recurring", account_number, day.isoformat())
+        for category, desc, tx_type, share, dom in RECURRING_CATALOG:
+            if day.day == dom:
+                amount = round(profile["salary"] * share * (1 if tx_type == "credit" else rng.uniform(0.95, 1.05)), 2)
+                records.append(_record(day, rng, desc, category, tx_type, amount, hour=9))
+
+        rng = self._rng("discretionary", account_number, day.isoformat())
+        for _ in range(count):
+            category, desc, tx_type, typical, _, weekend_factor = rng.choices(DISCRETIONARY_CATALOG, self._weights)[0]
+            scale = profile["spend_scale"] * season * (weekend_factor if weekend else 1.0)
+            amount = round(typical * scale * rng.lognormvariate(0, 0.35), 2)
+            records.append(_record(day, rng, desc, category, tx_type, amount))
+        return records
+
+    def fetch_transactions(self, account_number: str, window_start: datetime, window_end: datetime) -> List[Dict]:
+        """Raw bank records posted within a window, for use as a sync data source"""
+        records = []
+        day = window_start.date()
+        while day <= window_end.date():
+            records.extend(
+                r for r in self.day_transactions(account_number, day)
+                if window_start <= r["timestamp"] <= window_end
+            )
+            day += timedelta(days=1)
+        return records
+
+    def ledger(self, account_number: str, end_date: date, days: int) -> List[Dict]:
+        """The account's full ledger for the `days` days ending on `end_date`, as a sync would fetch it"""
+        start = end_date - timedelta(days=days - 1)
+        return self.fetch_transactions(account_number, datetime.combine(start, time.min),
+                                       datetime.combine(end_date, time.max))
+
+    def account_transactions(self, account_number: str, count: int, end_date: date, days: int) -> Iterator[Dict]:
+        """Exactly `count` discretionary transactions spread over `days` days, plus recurring items.
+
+        For callers that need a fixed payload size; the per-day counts differ
+        from `ledger`, so these records are not what a sync of the account sees.
+        """
+        rng = self._rng("spread", account_number, count, end_date.isoformat(), days)
+        start = end_date - timedelta(days=days - 1)
+        day_list = [start + timedelta(days=d) for d in range(days)]
+        weights = [MONTH_FACTORS[d.month] * (1.2 if d.weekday() >= 5 else 1.0) for d in day_list]
+        per_day = [0] * days
+        for index in rng.choices(range(days), weights, k=count):
+            per_day[index] += 1
+        for day, day_count in zip(day_list, per_day):
+            yield from self.day_transactions(account_number, day, day_count)
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    threshold, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= threshold:
+            return k
+        k += 1
+
+def _record(day: date, rng: random.Random, desc: str, category: str, tx_type: str,
+            amount: float, hour: Optional[int] = None) -> Dict:
+    timestamp = datetime.combine(day, time(
+        hour if hour is not None else rng.randint(7, 22), rng.randint(0, 59), rng.randint(0, 59)
+    ))
+    return {
+        "timestamp": timestamp,
+        "description": desc,
+        "category": category,
+        "type": tx_type,
+        "amount": amount if tx_type == "credit" else -amount
+    }
+
+def write_ndjson(generator: SyntheticBankDataGenerator, out: IO[str], users: int, accounts_per_user: int,
+                 end_date: date, days: int) -> Dict:
+    """Stream users, accounts and transactions as newline-delimited JSON"""
+    counts = {"users": 0, "accounts": 0, "transactions": 0}
+    for user in generator.users(users):
+        out.write(json.dumps({"kind": "user", **user}) + "\n")
+        counts["users"] += 1
+        for account in generator.accounts(user, accounts_per_user):
+            out.write(json.dumps({"kind": "account", "user_id": user["user_id"], **account}) + "\n")
+            counts["accounts"] += 1
+            for record in generator.ledger(account["account_number"], end_date, days):
+                out.write(json.dumps({
+                    "kind": "transaction",
+                    "account_number": account["account_number"],
+                    **record,
+                    "timestamp": record["timestamp"].isoformat()
+                }) + "\n")
+                counts["transactions"] += 1
+    return counts
+
+def load_into_database(generator: SyntheticBankDataGenerator, engine, users: int, accounts_per_user: int,
+                       end_date: date, days: int, batch_size: int = 50000) -> Dict:
+    """Bulk insert users, accounts and transactions straight into the FIU database.
+
+    Each account gets its `ledger`, so a later sync against the same generator
+    finds every transaction already stored. Rows that already exist are
+    skipped, so loading the same seed again only adds what is missing; the
+    counts are of rows actually inserted.
+    """
+    # Imported here so generating data does not pull in the FIU database setup
+    from app.bank_sync_service import normalize_bank_record
+    counts = {"users": 0, "accounts": 0, "transactions": 0}
+    raw = engine.raw_connection()
+    cursor = raw.cursor()
+    # The connection goes back to the shared pool, so its journal and durability settings are restored afterwards
+    previous_journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+    previous_synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is safe under WAL and only syncs at checkpoints
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        now = datetime.utcnow().isoformat(sep=" ")
+
+        tx_columns = ("transaction_id", "user_id", "from_account", "to_account", "amount", "transaction_type",
+                      "category", "description", "status", "masumi_tx_hash", "created_at", "fingerprint")
+        tx_sql = (f"INSERT OR IGNORE INTO transactions ({', '.join(tx_columns)}) "
+                  f"VALUES ({', '.join('?' for _ in tx_columns)})")
+        batch = []
+
+        def flush() -> None:
+            cursor.executemany(tx_sql, batch)
+            # executemany sums the rows changed, which leaves out duplicates ignored by their fingerprint
+            counts["transactions"] += cursor.rowcount
+            batch.clear()
+
+        for user in generator.users(users):
+            cursor.execute(
+                "INSERT OR IGNORE INTO users (user_id, name, email, phone, created_at, is_verified) "
+                "VALUES (?, ?, ?, ?, ?, 1)",
+                (user["user_id"], user["name"], user["email"], user["phone"], now)
+            )
+            counts["users"] += cursor.rowcount
+            existing = cursor.execute("SELECT id FROM users WHERE user_id = ?", (user["user_id"],)).fetchone()
+            if existing is None:
+                # Another user already has this email or phone
+                continue
+            user_pk = existing[0]
+            for account in generator.accounts(user, accounts_per_user):
+                cursor.execute(
+                    "INSERT OR IGNORE INTO bank_accounts (user_id, account_number, account_holder_name, bank_name, "
+                    "account_type, balance, ifsc_code, is_primary, is_synced, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, 0, ?, ?, 1, ?)",
+                    (user_pk, account["account_number"], account["account_holder_name"], account["bank_name"],
+                     account["account_type"], account["ifsc_code"], account["is_primary"], now)
+                )
+                counts["accounts"] += cursor.rowcount
+                for record in generator.ledger(account["account_number"], end_date, days):
+                    row = normalize_bank_record(record, account["account_number"], user_pk)
+                    row["created_at"] = row["created_at"].isoformat(sep=" ")
+                    batch.append(tuple(row[c] for c in tx_columns))
+                    if len(batch) >= batch_size:
+                        flush()
+        if batch:
+            flush()
+        raw.commit()
+    finally:
+        cursor.execute(f"PRAGMA journal_mode={previous_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={int(previous_synchronous)}")
+        raw.close()
+    return counts
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark AAClient connection reuse against a local stand-in AA server
+
+Compares a new httpx.AsyncClient per call (the old behaviour) with the
+shared pooled client, then times a full FI fetch against the streaming fetch.
+The stand-in (aa_stand_in_server.py) runs on plain HTTP over loopback, so
+the connection difference shown is TCP setup and pool construction only;
+against a real TLS endpoint the handshake makes the gap larger.
+
+    python benchmark_aa_client.py --requests 500 --concurrency 10 --latency-ms 0
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+import httpx
+import uvicorn
+from aa_stand_in_server import create_app
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(latency_ms: float, fi_transactions: int) -> str:
+    """Run the stand-in server in a background thread and return its base URL"""
+    port = _free_port()
+    # Consents stay PENDING so status checks always reach the server
+    app = create_app(latency_ms=latency_ms, latency_jitter_ms=0, error_rate=0,
+                     transactions_per_account=fi_transactions, approval_seconds=3600)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+async def _timed(call) -> float:
+    started = time.perf_counter()
+    await call()
+    return (time.perf_counter() - started) * 1000
+
+async def run_scenario(call, requests: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await _timed(call)
+
+    return await asyncio.gather(*(one() for _ in range(requests)))
+
+def report(name: str, latencies: list, wall_seconds: float) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<22} p50 {statistics.median(latencies):7.2f}ms  p95 {p95:7.2f}ms  "
+          f"{len(latencies) / wall_seconds:8.0f} req/s")
+
+async def main(requests: int, concurrency: int, latency_ms: float, fi_transactions: int) -> None:
+    base_url = start_server(latency_ms, fi_transactions)
+    os.environ["AA_BASE_URL"] = base_url
+    os.environ["AA_USE_MOCK_DATA"] = "false"
+    from app.services.aa_client import AAClient
+
+    aa_client = AAClient()
+    await aa_client.start()
+
+    # Distinct consents so coalescing does not skew the comparison
+    consents = [(await aa_client.initiate_consent(f"bench-{i}", []))["id"] for i in range(requests)]
+    per_call_ids = iter(consents)
+    shared_ids = iter(consents)
+
+    async def per_call_client():
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{base_url}/consent/{next(per_call_ids)}/status")
+            response.json()
+
+    async def shared_client():
+        result = await aa_client.check_status(next(shared_ids))
+        assert "error" not in result, result
+
+    for name, call in [("new client per call", per_call_client), ("shared pooled client", shared_client)]:
+        started = time.perf_counter()
+        latencies = await run_scenario(call, requests, concurrency)
+        report(name, latencies, time.perf_counter() - started)
+
+    # FI fetch of one consent: whole body versus incremental parse
+    consent_id = (await aa_client.initiate_consent("bench-fi", []))["id"]
+    async with httpx.AsyncClient() as client:
+        await client.post(f"{base_url}/consent/{consent_id}/approve")
+
+    started = time.perf_counter()
+    data = await aa_client.fetch_data(consent_id)
+    print(f"{'full FI fetch':<22} {len(data['transactions'])} transactions in "
+          f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+    started = time.perf_counter()
+    first_chunk_ms, count = None, 0
+    async for chunk in aa_client.fetch_data_stream(consent_id):
+        first_chunk_ms = first_chunk_ms or (time.perf_counter() - started) * 1000
+        count += len(chunk)
+    print(f"{'streamed FI fetch':<22} {count} transactions in {(time.perf_counter() - started) * 1000:.0f}ms, "
+          f"first chunk after {first_chunk_ms:.0f}ms")
+
+    await aa_client.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AAClient connection reuse")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Stand-in server latency per request")
+    parser.add_argument("--fi-transactions", type=int, default=50000, help="Transactions in the FI payload")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency_ms, args.fi_transactions))
@@ -0,0 +1,15 @@
+"""
+Shared pytest setup
+Points every test run at temporary databases, crew cache and result store
+before any app module is imported, so tests never write to the checked-in
+./budget_planner.db or ./fiu_platform.db
+"""
+
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ["BUDGET_DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'budget_test.db')}"
+os.environ["FIU_DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'fiu_test.db')}"
+os.environ["CREW_CACHE_PATH"] = os.path.join(_tmp_dir, "crew_cache.db")
+os.environ["RESULT_STORE_DIR"] = os.path.join(_tmp_dir, "results")
@@ -3,11 +3,11 @@ from logging_config import get_logger
 
 # Keep the original ResearchCrew for backward compatibility
 class ResearchCrew:
-    def __init__(self, verbose=True, logger=None):
+    def __init__(self, verbose=True, logger=None, budget_crew=None):
         self.verbose = verbose
         self.logger = logger or get_logger(__name__)
-        # Use the new BudgetPlannerCrew instead
-        budget_crew = BudgetPlannerCrew(verbose=verbose, logger=logger)
+        # Use the new BudgetPlannerCrew instead, reusing a prebuilt one (e.g. from CrewPool) if given
+        budget_crew = budget_crew or BudgetPlannerCrew(verbose=verbose, logger=logger)
         self.crew = budget_crew.crew
         self.logger.info("BudgetPlannerCrew initialized via ResearchCrew")
 
@@ -1,5 +1,6 @@
 import os
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
@@ -7,16 +8,35 @@ from pydantic import BaseModel
 from typing import Optional, List
 from app.fiu_models import create_tables
 from app.fiu_services_extended import ExtendedFIUService
+from app.sync_scheduler import SyncScheduler
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Background sync scheduler (enabled with SYNC_SCHEDULER_ENABLED=true)
+sync_scheduler = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the app"""
+    global sync_scheduler
+    if os.getenv("SYNC_SCHEDULER_ENABLED", "false").lower() == "true":
+        sync_scheduler = SyncScheduler(fiu_service.sync_service)
+        await sync_scheduler.start()
+    await fiu_service.aa_client.start()
+    yield
+    if sync_scheduler:
+        await sync_scheduler.stop()
+    await fiu_service.aa_client.aclose()
+    fiu_service.fi_decryptor.close()
+
 # Initialize FastAPI
 app = FastAPI(
     title="FIU Platform - AI-Powered Financial Management",
     description="Complete Financial Information User platform with Masumi integration and AI budget analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -82,6 +102,9 @@ class DetailedExpenseRequest(BaseModel):
 class BudgetAnalysisRequest(BaseModel):
     user_id: str
 
+class BatchSyncRequest(BaseModel):
+    user_ids: List[str]
+
 # API Endpoints
 
 @app.get("/", response_class=HTMLResponse)
@@ -240,17 +263,41 @@ async def sync_account_balance(account_id: int):
     return result
 
 @app.post("/api/accounts/{account_id}/sync/transactions")
-async def sync_account_transactions(account_id: int, days: int = 30):
-    """Sync transactions from bank"""
-    result = fiu_service.sync_account_transactions(account_id, days)
+async def sync_account_transactions(account_id: int, days: int = 30, mode: str = "incremental"):
+    """Sync transactions from bank (mode: incremental or full)"""
+    result = fiu_service.sync_account_transactions(account_id, days, mode)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
 
 @app.post("/api/accounts/{account_id}/sync/full")
-async def full_account_sync(account_id: int):
-    """Perform full account sync"""
-    result = fiu_service.full_account_sync(account_id)
+async def full_account_sync(account_id: int, mode: str = "incremental"):
+    """Perform full account sync (mode: incremental or full)"""
+    result = fiu_service.full_account_sync(account_id, mode)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@app.post("/api/accounts/{account_id}/sync/aa")
+async def ingest_aa_data(account_id: int, consent_id: str, encrypted: bool = False):
+    """Stream an Account Aggregator FI payload into the account's transactions"""
+    result = await fiu_service.ingest_aa_data(account_id, consent_id, encrypted)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@app.post("/api/sync/user/{user_id}")
+async def sync_user_accounts(user_id: str):
+    """Sync all accounts of a user concurrently"""
+    result = await fiu_service.sync_user_accounts(user_id)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+@app.post("/api/sync/users")
+async def sync_users(request: BatchSyncRequest):
+    """Sync all accounts of a batch of users concurrently"""
+    result = await fiu_service.sync_users(request.user_ids)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
@@ -263,6 +310,13 @@ async def get_sync_status(user_id: str):
         raise HTTPException(status_code=404, detail=result["error"])
     return result
 
+@app.get("/api/sync/scheduler/metrics")
+async def get_sync_scheduler_metrics():
+    """Get background sync queue depth and lag"""
+    if sync_scheduler is None:
+        return {"running": False}
+    return sync_scheduler.metrics()
+
 @app.get("/api/expenses/detailed/{user_id}")
 async def get_detailed_expenses(user_id: str, limit: int = 50):
     """Get detailed expenses with purposes and reasons"""
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Generate deterministic synthetic bank data for load and scale testing
+
+Examples:
+    python generate_synthetic_data.py --users 1000 --accounts 2 --daily-rate 1.5
+    python generate_synthetic_data.py --users 10 --format ndjson --output sample.ndjson
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from app.synthetic_data import SyntheticBankDataGenerator, load_into_database, write_ndjson
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic users, accounts and transactions")
+    parser.add_argument("--users", type=int, default=100, help="Number of users (N)")
+    parser.add_argument("--accounts", type=int, default=2, help="Accounts per user (M)")
+    parser.add_argument("--daily-rate", type=float, default=3.0,
+                        help="Average discretionary transactions per account per day; match SYNTHETIC_DAILY_RATE to sync against the data")
+    parser.add_argument("--days", type=int, default=365, help="Days of history to generate")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(), help="Last day of history (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--format", choices=["db", "ndjson"], default="db", help="Write to the FIU database or stream NDJSON")
+    parser.add_argument("--output", default="-", help="NDJSON output file ('-' for stdout)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    generator = SyntheticBankDataGenerator(seed=args.seed, daily_rate=args.daily_rate)
+    started = time.perf_counter()
+
+    if args.format == "ndjson":
+        out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            counts = write_ndjson(generator, out, args.users, args.accounts, args.end_date, args.days)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    else:
+        from app.fiu_models import create_tables, engine
+        create_tables()
+        counts = load_into_database(generator, engine, args.users, args.accounts, args.end_date, args.days)
+
+    elapsed = time.perf_counter() - started
+    rate = counts["transactions"] / elapsed if elapsed else 0
+    print(f"Generated {counts['users']} users, {counts['accounts']} accounts, "
+          f"{counts['transactions']} transactions in {elapsed:.2f}s ({rate:,.0f} transactions/s)",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
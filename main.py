@@ -1,16 +1,31 @@
 import os
+import asyncio
 import uvicorn
 import uuid
+import socket
+import time
 import json
+from contextlib import asynccontextmanager
+from typing import Optional
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, field_validator
 from masumi.config import Config
 from masumi.payment import Payment, Amount
 from crew_definition import ResearchCrew
+from app.crew import BudgetPlannerCrew
+from app.crew_cache import CrewCache
+from app.crew_pool import CrewPool
 from app.services.aa_client import AAClient
 from app.models import create_tables, SessionLocal, BudgetReport
+from app.job_store import SQLJobStore, FINISHED_STATUSES
+from app.leader_election import LeaderElection
+from app.job_events import JobEventBus
+from app.result_store import ResultStore, decompress
+from app.payment_monitor import PaymentMonitor
+from app.job_queue import JobQueue
 from app.demo_crew import DemoBudgetPlanner
 from logging_config import setup_logging
 
@@ -29,11 +44,85 @@ NETWORK = os.getenv("NETWORK")
 logger.info("Starting application with configuration:")
 logger.info(f"PAYMENT_SERVICE_URL: {PAYMENT_SERVICE_URL}")
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Prewarmed crew pool (enabled when CREW_POOL_SIZE > 0)
+# ─────────────────────────────────────────────────────────────────────────────
+# Opened in the lifespan, so tests and workers can configure it (or set their own) first
+crew_cache: Optional[CrewCache] = None
+crew_pool = CrewPool(crew_factory=lambda: BudgetPlannerCrew(verbose=False, cache=crew_cache))
+
+async def purge_finished_jobs():
+    """ Periodically drop finished jobs past their TTL (leader only) """
+    interval = float(os.getenv("JOB_PURGE_INTERVAL_SECONDS", "3600"))
+    while True:
+        try:
+            if leader.is_leader:
+                await asyncio.to_thread(job_store.purge_finished)
+        except Exception as e:
+            logger.error(f"Job purge failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(interval)
+
+async def reap_jobs():
+    """ Periodically fail abandoned or overdue jobs and stop local work for jobs that ended elsewhere """
+    interval = float(os.getenv("JOB_REAPER_INTERVAL_SECONDS", "60"))
+    while True:
+        try:
+            await reap_once()
+        except Exception as e:
+            logger.error(f"Job reaper failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(interval)
+
+async def claim_jobs():
+    """ Claim paid jobs from the shared store whenever this worker has free capacity """
+    interval = float(os.getenv("JOB_CLAIM_INTERVAL_SECONDS", "1"))
+    last_renewal = 0.0
+    while True:
+        try:
+            for job in await asyncio.to_thread(job_store.claim, WORKER_ID, job_queue.free_slots(), JOB_LEASE_SECONDS):
+                job_queue.submit(job["job_id"], job["identifier_from_purchaser"])
+            # Keep the claims on queued and running jobs alive
+            if job_queue.job_ids() and time.monotonic() - last_renewal > JOB_LEASE_SECONDS / 3:
+                await asyncio.to_thread(job_store.renew_claims, WORKER_ID, JOB_LEASE_SECONDS)
+                last_renewal = time.monotonic()
+        except Exception as e:
+            logger.error(f"Job claim failed: {str(e)}", exc_info=True)
+        try:
+            await asyncio.wait_for(jobs_available.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        jobs_available.clear()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """ Build long-lived resources once per worker process """
+    global crew_cache
+    await aa_client.start()
+    if crew_cache is None:
+        crew_cache = CrewCache()
+    if crew_pool.enabled:
+        await asyncio.to_thread(crew_pool.prewarm)
+    purge_task = asyncio.create_task(purge_finished_jobs())
+    reaper_task = asyncio.create_task(reap_jobs())
+    await job_queue.start()
+    # Every worker claims and runs paid jobs; only the elected leader monitors payments
+    claim_task = asyncio.create_task(claim_jobs())
+    leader.start(on_elected=payment_monitor.start, on_demoted=payment_monitor.stop)
+    try:
+        yield
+    finally:
+        await leader.stop()
+        claim_task.cancel()
+        await job_queue.stop()
+        purge_task.cancel()
+        reaper_task.cancel()
+        await aa_client.aclose()
+
 # Initialize FastAPI
 app = FastAPI(
     title="AI Automated Budget Planner",
     description="AI-powered budget planning service with Masumi payment integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for frontend
@@ -52,10 +141,23 @@ create_tables()
 aa_client = AAClient()
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Temporary in-memory job store (DO NOT USE IN PRODUCTION)
+# Job store shared by all API workers
 # ─────────────────────────────────────────────────────────────────────────────
-jobs = {}
-payment_instances = {}
+job_store = SQLJobStore()
+# Identifies this process in job claims and the leader lease, across hosts
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Set when a job is queued here so the claim loop does not wait for its next poll
+jobs_available = asyncio.Event()
+leader = LeaderElection("payment_monitor", WORKER_ID)
+JOB_EXECUTION_TIMEOUT_SECONDS = float(os.getenv("JOB_EXECUTION_TIMEOUT_SECONDS", "900"))
+JOB_PAYMENT_TIMEOUT_SECONDS = float(os.getenv("JOB_PAYMENT_TIMEOUT_SECONDS", "3600"))
+# Status updates pushed to /status/stream and /status/ws subscribers in this worker
+job_events = JobEventBus()
+# Compressed, content-addressed job results and reports, served from /results/{digest}
+result_store = ResultStore()
+RESULT_INLINE_MAX_BYTES = int(os.getenv("RESULT_INLINE_MAX_BYTES", "2048"))
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Initialize Masumi Payment Config
@@ -65,6 +167,34 @@ config = Config(
     payment_api_key=PAYMENT_API_KEY
 )
 
+def payment_for_job(job: dict) -> Payment:
+    """ Rebuild the Masumi payment of a stored job, in whichever worker needs it """
+    return Payment(
+        agent_identifier=os.getenv("AGENT_IDENTIFIER"),
+        config=config,
+        identifier_from_purchaser=job["identifier_from_purchaser"],
+        input_data=job["input_data"],
+        network=NETWORK
+    )
+
+# ─────────────────────────────────────────────────────────────────────────────
+# One payment monitor polls for every pending job
+# ─────────────────────────────────────────────────────────────────────────────
+payment_checker = Payment(agent_identifier=os.getenv("AGENT_IDENTIFIER"), config=config, network=NETWORK)
+payment_monitor = PaymentMonitor(
+    check_status=payment_checker.check_payment_status_by_identifier,
+    load_pending=lambda: [
+        (job["job_id"], job["payment_id"]) for job in job_store.list_by_status("awaiting_payment")
+    ],
+    on_funds_locked=lambda job_id, payment_id: handle_payment_status(job_id, payment_id),
+    on_status=lambda job_id, state: record_payment_status(job_id, state)
+)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Paid jobs run on a bounded worker pool, fair across purchasers
+# ─────────────────────────────────────────────────────────────────────────────
+job_queue = JobQueue(handler=lambda job_id: run_paid_job(job_id))
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Pydantic Models
 # ─────────────────────────────────────────────────────────────────────────────
@@ -85,6 +215,7 @@ class StartJobRequest(BaseModel):
 
 class BudgetPlanRequest(BaseModel):
     user_id: str = Field(..., description="User identifier for budget planning")
+    consent_id: Optional[str] = Field(None, description="Approved Account Aggregator consent to fetch data under")
     
     class Config:
         json_schema_extra = {
@@ -96,6 +227,9 @@ class BudgetPlanRequest(BaseModel):
 class ProvideInputRequest(BaseModel):
     job_id: str
 
+class CancelJobRequest(BaseModel):
+    job_id: str
+
 # ─────────────────────────────────────────────────────────────────────────────
 # CrewAI Task Execution
 # ─────────────────────────────────────────────────────────────────────────────
@@ -103,20 +237,30 @@ async def execute_crew_task(input_data: dict) -> str:
     """ Execute a budget planning task using demo planner """
     logger.info(f"Starting budget planning task for user: {input_data.get('user_id')}")
     
-    # Fetch financial data via AA framework
+    # Fetch financial data via AA framework, under the consent the user approved
     user_id = input_data.get('user_id', 'demo_user')
-    transactions_data = await aa_client.fetch_data(user_id)
+    consent_id = input_data.get('consent_id')
+    if not consent_id and not aa_client.use_mock_data:
+        raise ValueError("input_data.consent_id is required to fetch bank data from the Account Aggregator")
+    transactions_data = await aa_client.fetch_data(consent_id or user_id)
+    if "error" in transactions_data:
+        # Never plan (and get paid) on an empty report
+        raise RuntimeError(f"Could not fetch bank data: {transactions_data['error']}")
     
-    # Execute the demo budget planner
-    demo_planner = DemoBudgetPlanner(logger=logger)
-    result = demo_planner.process_transactions(json.dumps(transactions_data))
+    if crew_pool.enabled:
+        # Run the AI crew on a prewarmed instance
+        result = await crew_pool.arun({"transactions_data": json.dumps(transactions_data)})
+    else:
+        # Execute the demo budget planner
+        demo_planner = DemoBudgetPlanner()
+        result = await asyncio.to_thread(demo_planner.process_transactions, json.dumps(transactions_data))
     
     # Store result in database
     db = SessionLocal()
     try:
         budget_report = BudgetReport(
             user_id=user_id,
-            report_data=result,
+            report_digest=result_store.put(str(result))["digest"],
             total_income=50000.0,  # Demo values
             total_expenses=33000.0,
             savings_rate=34.0
@@ -141,6 +285,16 @@ async def start_job(data: StartJobRequest):
     """ Initiates a job and creates a payment request """
     print(f"Received data: {data}")
     print(f"Received data.input_data: {data.input_data}")
+    # Shed load before taking payment for work we cannot start soon
+    backlog = job_store.count_by_status().get("queued", 0)
+    if job_queue.overloaded(backlog):
+        job_queue.record_shed()
+        logger.warning(f"Job queue full ({backlog} queued), rejecting new job")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity, please retry later.",
+            headers={"Retry-After": os.getenv("JOB_QUEUE_RETRY_AFTER_SECONDS", "30")}
+        )
     try:
         job_id = str(uuid.uuid4())
         agent_identifier = os.getenv("AGENT_IDENTIFIER")
@@ -171,26 +325,16 @@ async def start_job(data: StartJobRequest):
         logger.info("Creating payment request...")
         payment_request = await payment.create_payment_request()
         payment_id = payment_request["data"]["blockchainIdentifier"]
-        payment.payment_ids.add(payment_id)
         logger.info(f"Created payment request with ID: {payment_id}")
 
         # Store job info (Awaiting payment)
-        jobs[job_id] = {
-            "status": "awaiting_payment",
-            "payment_status": "pending",
-            "payment_id": payment_id,
-            "input_data": data.input_data,
-            "result": None,
-            "identifier_from_purchaser": data.identifier_from_purchaser
-        }
-
-        async def payment_callback(payment_id: str):
-            await handle_payment_status(job_id, payment_id)
-
-        # Start monitoring the payment status
-        payment_instances[job_id] = payment
-        logger.info(f"Starting payment status monitoring for job {job_id}")
-        await payment.start_status_monitoring(payment_callback)
+        job_store.create(
+            job_id,
+            input_data=data.input_data,
+            identifier_from_purchaser=data.identifier_from_purchaser,
+            payment_id=payment_id
+        )
+        logger.info(f"Job {job_id} queued for payment monitoring")
 
         # Return the response in the required format
         return {
@@ -220,46 +364,155 @@ async def start_job(data: StartJobRequest):
             detail="Input_data or identifier_from_purchaser is missing, invalid, or does not adhere to the schema."
         )
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Job status updates
+# ─────────────────────────────────────────────────────────────────────────────
+def status_payload(job: dict) -> dict:
+    """ MIP-003 status body for a stored job.
+
+    Large results are returned as a reference to /results/{digest} instead of
+    inline, so polling does not resend the whole report every time.
+    """
+    result_data = job.get("result")
+    result = result_data if isinstance(result_data, str) else str(result_data) if result_data else None
+
+    payload = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "payment_status": job["payment_status"],
+        "result": result
+    }
+    if job.get("result_digest"):
+        payload["result_ref"] = {
+            "digest": job["result_digest"],
+            "size": job["result_size"],
+            "url": f"/results/{job['result_digest']}"
+        }
+        if job["result_size"] <= RESULT_INLINE_MAX_BYTES:
+            payload["result"] = result_store.read_text(job["result_digest"])
+    if job["status"] == "queued":
+        # Jobs this worker claimed wait in its queue, the rest in the shared store;
+        # None once another API worker has claimed the job
+        position = job_queue.position(job["job_id"])
+        payload["queue_position"] = position if position is not None else job_store.queue_position(job["job_id"])
+    return payload
+
+def publish_job_update(job_id: str) -> None:
+    """ Push the job's current status to its stream subscribers, if any """
+    if not job_events.subscriber_count(job_id):
+        return
+    job = job_store.get(job_id)
+    if job is not None:
+        job_events.publish(job_id, status_payload(job))
+
+def record_payment_status(job_id: str, state: str) -> None:
+    job_store.update(job_id, payment_status=state)
+    publish_job_update(job_id)
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 2) Process Payment and Execute AI Task
 # ─────────────────────────────────────────────────────────────────────────────
 async def handle_payment_status(job_id: str, payment_id: str) -> None:
-    """ Executes CrewAI task after payment confirmation """
+    """ Queues the job for execution after payment confirmation """
+    logger.info(f"Payment {payment_id} completed for job {job_id}, queueing task...")
+
+    # Only one worker process wins this transition and queues the job
+    if not job_store.transition(job_id, ["awaiting_payment"], "queued"):
+        logger.info(f"Job {job_id} is no longer awaiting payment, skipping")
+        return
+    jobs_available.set()
+    publish_job_update(job_id)
+    logger.info(f"Job {job_id} queued for the next worker with free capacity")
+
+async def run_paid_job(job_id: str) -> None:
+    """ Executes CrewAI task for a paid job on a queue worker """
+    # Update job status to running; only one worker wins this transition
+    if not job_store.transition(job_id, ["queued"], "running", expected_owner=WORKER_ID):
+        logger.info(f"Job {job_id} is no longer queued for this worker, skipping")
+        return
+    publish_job_update(job_id)
+    job = job_store.get(job_id)
+    payment_id = job["payment_id"]
     try:
-        logger.info(f"Payment {payment_id} completed for job {job_id}, executing task...")
-        
-        # Update job status to running
-        jobs[job_id]["status"] = "running"
-        logger.info(f"Input data: {jobs[job_id]["input_data"]}")
+        logger.info(f"Input data: {job['input_data']}")
 
-        # Execute the AI task
-        result = await execute_crew_task(jobs[job_id]["input_data"])
-        result_dict = {"result": str(result)}
+        # Execute the AI task; cancelling it stops the AA fetch and the crew before its next stage
+        result = await asyncio.wait_for(execute_crew_task(job["input_data"]), timeout=JOB_EXECUTION_TIMEOUT_SECONDS)
         logger.info(f"Crew task completed for job {job_id}")
         
-        # Mark payment as completed on Masumi
-        # Use a shorter string for the result hash
-        await payment_instances[job_id].complete_payment(payment_id, result_dict)
+        # Mark payment as completed on Masumi (the result hash is computed from the raw output)
+        await payment_for_job(job).complete_payment(payment_id, str(result))
         logger.info(f"Payment completed for job {job_id}")
 
-        # Update job status
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["payment_status"] = "completed"
-        jobs[job_id]["result"] = result
-
-        # Stop monitoring payment status
-        if job_id in payment_instances:
-            payment_instances[job_id].stop_status_monitoring()
-            del payment_instances[job_id]
+        # Update job status; the result itself goes to the result store
+        result_ref = result_store.put(str(result))
+        job_store.transition(job_id, ["running"], "completed", expected_owner=WORKER_ID, payment_status="completed",
+                             result_digest=result_ref["digest"], result_size=result_ref["size"])
+    except asyncio.TimeoutError:
+        logger.error(f"Job {job_id} exceeded its {JOB_EXECUTION_TIMEOUT_SECONDS:g}s execution deadline")
+        job_store.transition(job_id, ["running"], "failed", expected_owner=WORKER_ID,
+                             error=f"Job exceeded its {JOB_EXECUTION_TIMEOUT_SECONDS:g}s execution deadline")
+    except asyncio.CancelledError:
+        # The job was cancelled or reaped and its status is already set
+        logger.info(f"Job {job_id} stopped")
+        raise
     except Exception as e:
         logger.error(f"Error processing payment {payment_id} for job {job_id}: {str(e)}", exc_info=True)
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
-        
-        # Still stop monitoring to prevent repeated failures
-        if job_id in payment_instances:
-            payment_instances[job_id].stop_status_monitoring()
-            del payment_instances[job_id]
+        job_store.transition(job_id, ["running"], "failed", expected_owner=WORKER_ID, error=str(e))
+    publish_job_update(job_id)
+
+async def reap_once() -> dict:
+    """ One reaper pass over the job store (leader only) and this worker's queue """
+    expired, overdue, requeued, abandoned = [], [], [], []
+    if leader.is_leader:
+        # Unpaid jobs past the payment window no longer need monitoring
+        expired = await asyncio.to_thread(job_store.expire, ["awaiting_payment"], JOB_PAYMENT_TIMEOUT_SECONDS,
+                                          "failed", error="Payment was not received in time")
+        # Running jobs that outlived their deadline by far are stuck for good
+        overdue = await asyncio.to_thread(job_store.expire, ["running"], JOB_EXECUTION_TIMEOUT_SECONDS * 1.5,
+                                          "failed", error="Job exceeded its execution deadline")
+        # Claims of workers that stopped renewing go back to the pool for another worker
+        requeued, abandoned = await asyncio.to_thread(job_store.release_expired_claims, JOB_MAX_ATTEMPTS)
+        if requeued:
+            jobs_available.set()
+    # Stop local work for jobs that were cancelled, reaped or reclaimed by another worker
+    local_ids = job_queue.job_ids()
+    local_jobs = await asyncio.to_thread(lambda: {job_id: job_store.get(job_id) for job_id in local_ids})
+    stopped = [job_id for job_id, job in local_jobs.items()
+               if job is None or job["status"] not in ("queued", "running") or job["owner"] != WORKER_ID]
+    for job_id in stopped:
+        job_queue.cancel(job_id)
+    for job_id in expired + overdue + requeued + abandoned:
+        publish_job_update(job_id)
+    if expired or overdue or requeued or abandoned or stopped:
+        logger.info(f"Reaper expired {len(expired)} unpaid and {len(overdue)} overdue jobs, requeued "
+                    f"{len(requeued)} and failed {len(abandoned)} abandoned claims, stopped {len(stopped)} local jobs")
+    return {"expired": len(expired), "overdue": len(overdue), "requeued": len(requeued),
+            "abandoned": len(abandoned), "stopped": len(stopped)}
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cancel a job
+# ─────────────────────────────────────────────────────────────────────────────
+@app.post("/cancel_job")
+async def cancel_job(data: CancelJobRequest):
+    """ Cancels a job that has not finished yet.
+
+    A cancelled paid job never has its result submitted, so Masumi refunds
+    the purchaser once the submit window passes.
+    """
+    job = job_store.get(data.job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job_store.transition(data.job_id, ["awaiting_payment", "queued", "running"], "cancelled",
+                                error="Cancelled by request"):
+        current = job_store.get(data.job_id)
+        raise HTTPException(status_code=409, detail=f"Job is already {current['status'] if current else 'gone'}")
+
+    # Another API worker holding the job stops it on its next reaper pass
+    stopped_here = job_queue.cancel(data.job_id)
+    publish_job_update(data.job_id)
+    logger.info(f"Job {data.job_id} cancelled (was {job['status']})")
+    return {"status": "success", "job_id": data.job_id, "previous_status": job["status"], "stopped": stopped_here}
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 3) Check Job and Payment Status (MIP-003: /status)
@@ -268,35 +521,154 @@ async def handle_payment_status(job_id: str, payment_id: str) -> None:
 async def get_status(job_id: str):
     """ Retrieves the current status of a specific job """
     logger.info(f"Checking status for job {job_id}")
-    if job_id not in jobs:
+    job = job_store.get(job_id)
+    if job is None:
         logger.warning(f"Job {job_id} not found")
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
-    # Check latest payment status if payment instance exists
-    if job_id in payment_instances:
+    # Payments still pending come from the monitor's cache, refreshed at most once per TTL
+    if job["status"] == "awaiting_payment" and job["payment_id"]:
         try:
-            status = await payment_instances[job_id].check_payment_status()
-            job["payment_status"] = status.get("data", {}).get("status")
-            logger.info(f"Updated payment status for job {job_id}: {job['payment_status']}")
-        except ValueError as e:
-            logger.warning(f"Error checking payment status: {str(e)}")
-            job["payment_status"] = "unknown"
+            state = await payment_monitor.current_status(job_id, job["payment_id"])
+            if state:
+                job["payment_status"] = state
         except Exception as e:
-            logger.error(f"Error checking payment status: {str(e)}", exc_info=True)
-            job["payment_status"] = "error"
+            logger.warning(f"Error checking payment status for job {job_id}: {str(e)}")
 
+    return status_payload(job)
 
-    result_data = job.get("result")
-    result = result_data if isinstance(result_data, str) else str(result_data) if result_data else None
+def job_not_found(job_id: str) -> dict:
+    """ Final update for a job that no longer exists """
+    return {"job_id": job_id, "status": "not_found", "error": "Job not found"}
 
-    return {
-        "job_id": job_id,
-        "status": job["status"],
-        "payment_status": job["payment_status"],
-        "result": result
+async def job_updates(job_id: str):
+    """ Yield the job's status now and on every change until it finishes.
+
+    Updates from this worker arrive through the event bus and keepalives are
+    served from the last snapshot; the store is only re-read every resync
+    interval to catch jobs run by another worker. None is yielded when there
+    was nothing new, so callers can send a keepalive. A job that disappears,
+    e.g. purged mid-stream, ends the stream with a "not_found" update.
+    """
+    keepalive = float(os.getenv("STATUS_STREAM_KEEPALIVE_SECONDS", "15"))
+    resync = float(os.getenv("STATUS_STREAM_RESYNC_SECONDS", "60"))
+    with job_events.subscribe(job_id) as updates:
+        job = job_store.get(job_id)
+        if job is None:
+            yield job_not_found(job_id)
+            return
+        last = status_payload(job)
+        yield last
+        next_resync = time.monotonic() + resync
+        while last["status"] not in FINISHED_STATUSES:
+            try:
+                update = await asyncio.wait_for(updates.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                update = None
+                if time.monotonic() >= next_resync:
+                    next_resync = time.monotonic() + resync
+                    job = await asyncio.to_thread(job_store.get, job_id)
+                    if job is None:
+                        yield job_not_found(job_id)
+                        return
+                    update = status_payload(job)
+            if update is None or update == last:
+                yield None
+                continue
+            last = update
+            yield last
+
+@app.get("/status/stream")
+async def stream_status(job_id: str):
+    """ Server-Sent Events stream of a job's status until it completes or fails """
+    if job_store.get(job_id) is None:
+        logger.warning(f"Job {job_id} not found")
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for update in job_updates(job_id):
+            yield ": keepalive\n\n" if update is None else f"event: status\ndata: {json.dumps(update)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/status/ws")
+async def websocket_status(websocket: WebSocket, job_id: str):
+    """ WebSocket variant of /status/stream; the server closes it once the job finishes """
+    await websocket.accept()
+    if job_store.get(job_id) is None:
+        await websocket.send_json({"error": "Job not found"})
+        await websocket.close(code=1008)
+        return
+    try:
+        last = None
+        async for update in job_updates(job_id):
+            if update is not None:
+                await websocket.send_json(update)
+                last = update
+        await websocket.close(code=1008 if last is not None and last["status"] == "not_found" else 1000)
+    except WebSocketDisconnect:
+        logger.info(f"Status subscriber for job {job_id} disconnected")
+
+def parse_range(header: str, size: int):
+    """ (start, end) inclusive for a single "bytes=" range, None to ignore it, or "invalid" """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        # Only single byte ranges are served; anything else gets the full body
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return "invalid"
+    return start, end
+
+@app.get("/results/{digest}")
+async def get_result(digest: str, request: Request):
+    """ Stored job result by digest, with Range and compressed (Accept-Encoding) responses """
+    encoded = await asyncio.to_thread(result_store.read_encoded, digest)
+    if encoded is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    blob, encoding = encoded
+
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+        "Accept-Ranges": "bytes"
     }
+    media_type = "text/markdown; charset=utf-8"
+    range_header = request.headers.get("range")
+    accepted = {value.split(";")[0].strip() for value in request.headers.get("accept-encoding", "").split(",")}
+
+    # Ranges apply to the plain text; whole bodies are passed through still compressed when the client accepts it
+    if not range_header and encoding in accepted:
+        etag = f'"{digest}-{encoding}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=dict(headers, ETag=etag))
+        return Response(blob, media_type=media_type,
+                        headers=dict(headers, ETag=etag, **{"Content-Encoding": encoding}))
+
+    body = await asyncio.to_thread(decompress, blob, encoding)
+    etag = f'"{digest}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=dict(headers, ETag=etag))
+    byte_range = parse_range(range_header, len(body)) if range_header else None
+    if byte_range == "invalid":
+        return Response(status_code=416, headers=dict(headers, **{"Content-Range": f"bytes */{len(body)}"}))
+    if byte_range:
+        start, end = byte_range
+        return Response(body[start:end + 1], status_code=206, media_type=media_type,
+                        headers=dict(headers, ETag=etag, **{"Content-Range": f"bytes {start}-{end}/{len(body)}"}))
+    return Response(body, media_type=media_type, headers=dict(headers, ETag=etag))
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 4) Check Server Availability (MIP-003: /availability)
@@ -323,6 +695,8 @@ async def generate_budget_plan(request: BudgetPlanRequest):
             "user_id": request.user_id,
             "action": "generate_budget_plan"
         }
+        if request.consent_id:
+            input_data["consent_id"] = request.consent_id
         
         result = await execute_crew_task(input_data)
         
@@ -353,6 +727,15 @@ async def input_schema():
                     "placeholder": "Enter your user ID"
                 }
             },
+            {
+                "id": "consent_id",
+                "type": "string",
+                "name": "Consent ID",
+                "data": {
+                    "description": "Approved Account Aggregator consent to fetch bank data under",
+                    "placeholder": "Enter your consent ID"
+                }
+            },
             {
                 "id": "action",
                 "type": "string",
@@ -373,9 +756,20 @@ async def health():
     """
     Returns the health of the server.
     """
-    return {
+    health_data = {
         "status": "healthy"
     }
+    if crew_pool.enabled:
+        health_data["crew_pool"] = crew_pool.stats()
+    health_data["aa_client"] = aa_client.metrics()
+    health_data["worker_id"] = WORKER_ID
+    health_data["leader"] = leader.stats()
+    health_data["jobs"] = job_store.count_by_status()
+    health_data["payment_monitor"] = payment_monitor.metrics()
+    health_data["job_queue"] = job_queue.stats()
+    health_data["job_events"] = job_events.stats()
+    health_data["result_store"] = result_store.stats()
+    return health_data
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Main Logic if Called as a Script
@@ -401,6 +795,8 @@ if __name__ == "__main__":
         print(f"Starting FastAPI server with Masumi integration on port {port}...")
         print(f"Backend API: http://localhost:{port}")
         print(f"API Documentation: http://localhost:{port}/docs")
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        # Jobs live in the shared job store, so several workers can serve one port
+        workers = int(os.getenv("API_WORKERS", "1"))
+        uvicorn.run("main:app" if workers > 1 else app, host="0.0.0.0", port=port, workers=workers)
     else:
         main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add job claim columns to an existing jobs table,
+so several API workers can share it and the leases table can be created
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+
+NEW_COLUMNS = [
+    ("owner", "TEXT"),
+    ("lease_expires_at", "DATETIME"),
+    ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+def migrate_database():
+    """Add claim columns and the status/owner index to the jobs table"""
+
+    db_path = "./budget_planner.db"
+
+    if not os.path.exists(db_path):
+        print("❌ Database file not found. Creating new database with updated schema...")
+        from app.models import create_tables
+        create_tables()
+        print("✅ New database created with job claims and leases")
+        return
+
+    print("🔄 Migrating existing database to support job claims...")
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if columns:
+            for column_name, column_type in NEW_COLUMNS:
+                if column_name not in columns:
+                    cursor.execute(f"ALTER TABLE jobs ADD COLUMN {column_name} {column_type}")
+                    print(f"✅ Added column: {column_name}")
+                else:
+                    print(f"ℹ️  Column {column_name} already exists")
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_owner ON jobs (status, owner)")
+            conn.commit()
+            print("✅ Index ix_jobs_status_owner is in place")
+        else:
+            print("ℹ️  No jobs table yet, it will be created with the new schema")
+
+        conn.close()
+
+        # The leases table is new, so create_all can add it
+        from app.models import create_tables
+        create_tables()
+        print("✅ Leases table is in place")
+
+    except sqlite3.Error as e:
+        print(f"❌ Database migration error: {e}")
+    except Exception as e:
+        print(f"❌ Migration error: {e}")
+
+def verify_migration():
+    """Verify that the migration was successful"""
+
+    db_path = "./budget_planner.db"
+
+    if not os.path.exists(db_path):
+        print("❌ Database file not found")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = [column[1] for column in cursor.fetchall()]
+        missing = [name for name, _ in NEW_COLUMNS if name not in columns]
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'leases'")
+
+        if missing or cursor.fetchone() is None:
+            print(f"❌ Migration incomplete. Missing: {', '.join(missing) or 'leases table'}")
+            return False
+        else:
+            print("✅ Migration verification successful - job claims and leases present")
+            return True
+
+    except Exception as e:
+        print(f"❌ Verification error: {e}")
+        return False
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    print("⚙️  Budget Planner - Database Migration for Job Claims")
+    print("=" * 65)
+    print(f"Migration started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+
+    # Run migration
+    migrate_database()
+
+    print()
+
+    # Verify migration
+    verify_migration()
+
+    print()
+    print("=" * 65)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Database migration script to move stored reports and job results into the
+compressed result store, replacing the inline text columns with digests
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+from app.result_store import ResultStore
+
+# (database, table, key column, text columns offloaded, digest column, extra columns to add)
+MIGRATIONS = [
+    ("./budget_planner.db", "budget_reports", "id", ["report_data"], "report_digest", []),
+    ("./budget_planner.db", "jobs", "job_id", ["result"], "result_digest", [("result_size", "INTEGER")]),
+    ("./fiu_platform.db", "budget_analysis", "id", ["analysis_data", "recommendations"], "analysis_digest", []),
+]
+
+def migrate_table(cursor, store, table, key, text_columns, digest_column, extra_columns):
+    """Add the digest column and offload inline text for one table"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [column[1] for column in cursor.fetchall()]
+    if not columns:
+        print(f"ℹ️  Table {table} does not exist yet, it will be created with the new schema")
+        return 0
+
+    for column_name, column_type in [(digest_column, "TEXT")] + extra_columns:
+        if column_name not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column_name} {column_type}")
+            print(f"✅ Added column: {table}.{column_name}")
+
+    # The first text column is the report; the others held copies of it
+    main_column = text_columns[0]
+    cursor.execute(
+        f"SELECT {key}, {main_column} FROM {table} WHERE {main_column} IS NOT NULL AND {digest_column} IS NULL"
+    )
+    rows = cursor.fetchall()
+    for row_key, text in rows:
+        ref = store.put(text)
+        assignments = ", ".join(f"{column} = NULL" for column in text_columns)
+        values = [ref["digest"]]
+        if extra_columns:
+            assignments += ", result_size = ?"
+            values.append(ref["size"])
+        cursor.execute(f"UPDATE {table} SET {digest_column} = ?, {assignments} WHERE {key} = ?", values + [row_key])
+    print(f"✅ Offloaded {len(rows)} rows of {table} to the result store")
+    return len(rows)
+
+def migrate_database():
+    """Offload report and result text from every database that has it"""
+    store = ResultStore()
+    print(f"🔄 Moving reports into the result store at {store.root} ({store.encoding})...")
+
+    for db_path in sorted({migration[0] for migration in MIGRATIONS}):
+        if not os.path.exists(db_path):
+            print(f"ℹ️  {db_path} not found, new databases are created with the updated schema")
+            continue
+        try:
+            size_before = os.path.getsize(db_path)
+            conn = sqlite3.connect(db_path)
+            cursor = conn.cursor()
+            for path, table, key, text_columns, digest_column, extra_columns in MIGRATIONS:
+                if path == db_path:
+                    migrate_table(cursor, store, table, key, text_columns, digest_column, extra_columns)
+            conn.commit()
+            # Give the freed pages back to the filesystem
+            conn.execute("VACUUM")
+            conn.close()
+            print(f"✅ {db_path}: {size_before} -> {os.path.getsize(db_path)} bytes")
+        except sqlite3.Error as e:
+            print(f"❌ Database migration error in {db_path}: {e}")
+        except Exception as e:
+            print(f"❌ Migration error in {db_path}: {e}")
+
+    stats = store.stats()
+    print(f"✅ Wrote {stats['writes']} blobs, {stats['deduplicated']} duplicates shared an existing blob")
+
+def verify_migration():
+    """Verify that no inline report text is left behind"""
+    ok = True
+    for db_path, table, _, text_columns, digest_column, _ in MIGRATIONS:
+        if not os.path.exists(db_path):
+            continue
+        try:
+            conn = sqlite3.connect(db_path)
+            cursor = conn.cursor()
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [column[1] for column in cursor.fetchall()]
+            if not columns:
+                continue
+            if digest_column not in columns:
+                print(f"❌ Migration incomplete. {table}.{digest_column} is missing")
+                ok = False
+                continue
+            cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {text_columns[0]} IS NOT NULL")
+            remaining = cursor.fetchone()[0]
+            if remaining:
+                print(f"❌ {remaining} rows of {table} still store their text inline")
+                ok = False
+        except Exception as e:
+            print(f"❌ Verification error: {e}")
+            ok = False
+        finally:
+            if 'conn' in locals():
+                conn.close()
+    if ok:
+        print("✅ Migration verification successful - reports are stored by digest")
+    return ok
+
+if __name__ == "__main__":
+    print("💾 Budget Planner - Database Migration for the Result Store")
+    print("=" * 65)
+    print(f"Migration started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+
+    # Run migration
+    migrate_database()
+
+    print()
+
+    # Verify migration
+    verify_migration()
+
+    print()
+    print("=" * 65)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the bank sync fingerprint column and unique index
+to the existing Transaction table, backfilling fingerprints for already synced rows
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+from app.bank_sync_service import transaction_fingerprint, SYNC_DESCRIPTION_SUFFIX
+
+def migrate_database():
+    """Add fingerprint column and unique index to existing database"""
+    
+    db_path = "./fiu_platform.db"
+    
+    if not os.path.exists(db_path):
+        print("❌ Database file not found. Creating new database with updated schema...")
+        from app.fiu_models import create_tables
+        create_tables()
+        print("✅ New database created with transaction fingerprints")
+        return
+    
+    print("🔄 Migrating existing database to support fingerprint deduplication...")
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Check if the column already exists
+        cursor.execute("PRAGMA table_info(transactions)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if "fingerprint" not in columns:
+            cursor.execute("ALTER TABLE transactions ADD COLUMN fingerprint TEXT")
+            print("✅ Added column: fingerprint")
+        else:
+            print("ℹ️  Database already has the fingerprint column")
+        
+        # Backfill previously synced transactions so future syncs dedupe against them, and
+        # recompute older fingerprints that hashed the unsigned amount
+        cursor.execute(
+            "SELECT id, from_account, to_account, transaction_type, amount, description, created_at, fingerprint "
+            "FROM transactions WHERE description LIKE ? ORDER BY id",
+            (f"%{SYNC_DESCRIPTION_SUFFIX}",)
+        )
+        seen = set()
+        updates = []
+        for tx_id, from_account, to_account, tx_type, amount, description, created_at, current in cursor.fetchall():
+            account_number = from_account if tx_type == "debit" else to_account
+            raw_description = description[:-len(SYNC_DESCRIPTION_SUFFIX)]
+            signed_amount = abs(amount) if tx_type == "credit" else -abs(amount)
+            fingerprint = transaction_fingerprint(
+                account_number, datetime.fromisoformat(created_at), signed_amount, raw_description
+            )
+            # Leave exact duplicates from the old LIKE-based sync without a fingerprint
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            if fingerprint != current:
+                updates.append((fingerprint, tx_id))
+        
+        cursor.executemany("UPDATE transactions SET fingerprint = ? WHERE id = ?", updates)
+        print(f"✅ Backfilled fingerprints for {len(updates)} synced transactions")
+        
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_transactions_fingerprint ON transactions (fingerprint)"
+        )
+        conn.commit()
+        print("✅ Unique index ix_transactions_fingerprint is in place")
+        
+        conn.close()
+        
+    except sqlite3.Error as e:
+        print(f"❌ Database migration error: {e}")
+    except Exception as e:
+        print(f"❌ Migration error: {e}")
+
+def verify_migration():
+    """Verify that the migration was successful"""
+    
+    db_path = "./fiu_platform.db"
+    
+    if not os.path.exists(db_path):
+        print("❌ Database file not found")
+        return False
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("PRAGMA index_list(transactions)")
+        indexes = {row[1]: row[2] for row in cursor.fetchall()}
+        
+        if not indexes.get("ix_transactions_fingerprint"):
+            print("❌ Migration incomplete. Unique fingerprint index is missing")
+            return False
+        else:
+            print("✅ Migration verification successful - fingerprint index present")
+            return True
+        
+    except Exception as e:
+        print(f"❌ Verification error: {e}")
+        return False
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    print("🏦 FIU Platform - Database Migration for Sync Fingerprints")
+    print("=" * 65)
+    print(f"Migration started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+    
+    # Run migration
+    migrate_database()
+    
+    print()
+    
+    # Verify migration
+    verify_migration()
+    
+    print()
+    print("=" * 65)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled Account Aggregator HTTP client
+Runs the app lifespan against an in-process mock transport
+"""
+
+import asyncio
+import os
+import tempfile
+import httpx
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("BUDGET_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'budget_test.db')}")
+os.environ.setdefault("RESULT_STORE_DIR", os.path.join(_tmp_dir, "results"))
+os.environ.setdefault("CREW_CACHE_PATH", os.path.join(_tmp_dir, "crew_cache.db"))
+# Masumi needs a config to import; the payment service itself is never reached
+os.environ.setdefault("PAYMENT_SERVICE_URL", "http://localhost:9/api/v1")
+os.environ.setdefault("PAYMENT_API_KEY", "test-key")
+os.environ.setdefault("AGENT_IDENTIFIER", "test-agent")
+os.environ.setdefault("NETWORK", "Preprod")
+
+from fastapi.testclient import TestClient
+import main
+from app.services.aa_client import AAClient
+
+class CountingTransport(httpx.MockTransport):
+    """Answers every FI fetch with one transaction and counts requests and closes"""
+
+    def __init__(self):
+        super().__init__(self.handle)
+        self.requests = 0
+        self.closes = 0
+
+    def handle(self, request):
+        self.requests += 1
+        return httpx.Response(200, json={"transactions": [
+            {"date": "2024-03-01", "amount": 50000, "description": "SALARY CREDIT", "type": "credit"}
+        ]})
+
+    async def aclose(self):
+        self.closes += 1
+
+def test_lifespan_owns_one_shared_client():
+    """Startup creates the client, every request reuses it and shutdown closes it"""
+    transport = CountingTransport()
+    original = (main.aa_client.transport, main.aa_client.use_mock_data)
+    main.aa_client.transport, main.aa_client.use_mock_data = transport, False
+    # The claim loop waits on this event, which binds to the loop of the first lifespan
+    main.jobs_available = asyncio.Event()
+    try:
+        with TestClient(main.app) as client:
+            shared = main.aa_client._client
+            assert shared is not None and not shared.is_closed
+            for consent_id in ("consent-1", "consent-2", "consent-3"):
+                data = client.portal.call(main.aa_client.fetch_data, consent_id)
+                assert data["transactions"][0]["description"] == "SALARY CREDIT"
+                assert main.aa_client._client is shared
+            assert client.get("/health").json()["aa_client"]["endpoints"]["fi_fetch"]["count"] == 3
+        assert shared.is_closed and main.aa_client._client is None
+    finally:
+        main.aa_client.transport, main.aa_client.use_mock_data = original
+
+    assert transport.requests == 3
+    assert transport.closes == 1
+
+def test_aclose_is_idempotent():
+    """Closing twice, or before the client was ever started, is safe"""
+    transport = CountingTransport()
+    aa_client = AAClient(transport=transport)
+
+    async def scenario():
+        await aa_client.aclose()
+        await aa_client.start()
+        await aa_client.aclose()
+        await aa_client.aclose()
+        # A closed client is recreated lazily on the next call
+        aa_client.use_mock_data = False
+        data = await aa_client.fetch_data("consent-1")
+        await aa_client.aclose()
+        return data
+
+    assert asyncio.run(scenario())["transactions"]
+    assert transport.closes == 2
+
+if __name__ == "__main__":
+    print("Testing pooled AA client...")
+    test_lifespan_owns_one_shared_client()
+    test_aclose_is_idempotent()
+    print("All pooled AA client tests passed")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the AAClient circuit breaker and hedged status checks
+Uses an in-process mock transport instead of a real AA
+"""
+
+import asyncio
+import time
+import httpx
+from app.services.aa_client import AAClient
+
+def _client(handler, **settings):
+    aa_client = AAClient()
+    aa_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://aa.test")
+    for name, value in settings.items():
+        setattr(aa_client, name, value)
+    return aa_client
+
+def test_breaker_opens_and_recovers():
+    """Repeated 5xx responses open the breaker, calls then fail fast until recovery"""
+    calls = []
+    healthy = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200 if healthy else 503, json={"status": "PENDING"})
+
+    async def scenario():
+        aa_client = _client(handler, breaker_failure_threshold=3, breaker_recovery_seconds=0.1)
+        for i in range(3):
+            await aa_client.check_status(f"c-{i}")
+        rejected = await aa_client.check_status("c-3")
+        open_metrics = aa_client.metrics()["endpoints"]["status"]
+
+        await asyncio.sleep(0.15)
+        healthy.append(True)
+        recovered = await aa_client.check_status("c-4")
+        closed_metrics = aa_client.metrics()["endpoints"]["status"]
+        await aa_client.aclose()
+        return rejected, open_metrics, recovered, closed_metrics
+
+    rejected, open_metrics, recovered, closed_metrics = asyncio.run(scenario())
+    assert rejected == {"error": "AA circuit open for status"}
+    assert len(calls) == 4
+    assert open_metrics["breaker"]["state"] == "open"
+    assert open_metrics["errors"] == 3
+    assert recovered == {"status": "PENDING"}
+    assert closed_metrics["breaker"]["state"] == "closed"
+
+def test_slow_status_check_is_hedged():
+    """A check stuck past p95 fires a second attempt and returns the faster answer"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        # The first attempt after warm-up stalls; its hedge answers quickly
+        await asyncio.sleep(2.0 if len(calls) == 21 else 0.01)
+        return httpx.Response(200, json={"status": "PENDING"})
+
+    async def scenario():
+        aa_client = _client(handler, hedge_requests=True, hedge_min_samples=20)
+        for i in range(20):
+            await aa_client.check_status(f"warm-{i}")
+        started = time.perf_counter()
+        result = await aa_client.check_status("slow")
+        elapsed = time.perf_counter() - started
+        hedging = aa_client.metrics()["hedging"]
+        await aa_client.aclose()
+        return result, elapsed, hedging
+
+    result, elapsed, hedging = asyncio.run(scenario())
+    assert result == {"status": "PENDING"}
+    assert elapsed < 1.0
+    assert hedging["fired"] == 1 and hedging["won"] == 1
+
+if __name__ == "__main__":
+    print("Testing AA client resilience...")
+    test_breaker_opens_and_recovers()
+    test_slow_status_check_is_hedged()
+    print("All AA client resilience tests passed")
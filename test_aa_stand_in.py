@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the consent and FI fetch flow against the local AA stand-in
+Runs in-process over an ASGI transport, no network needed
+"""
+
+import asyncio
+import os
+import tempfile
+import uuid
+import httpx
+import pytest
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("BUDGET_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'budget_test.db')}")
+os.environ.setdefault("RESULT_STORE_DIR", os.path.join(_tmp_dir, "results"))
+os.environ.setdefault("CREW_CACHE_PATH", os.path.join(_tmp_dir, "crew_cache.db"))
+# Masumi needs a config to import; the payment service itself is never reached
+os.environ.setdefault("PAYMENT_SERVICE_URL", "http://localhost:9/api/v1")
+os.environ.setdefault("PAYMENT_API_KEY", "test-key")
+os.environ.setdefault("AGENT_IDENTIFIER", "test-agent")
+os.environ.setdefault("NETWORK", "Preprod")
+
+import main
+from aa_stand_in_server import create_app
+from app.services.aa_client import AAClient
+
+def _client_for(app):
+    aa_client = AAClient()
+    aa_client.use_mock_data = False
+    aa_client.poll_initial_delay = 0.02
+    aa_client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://aa.test")
+    return aa_client
+
+def test_consent_to_fetch_flow():
+    """Consent is approved after the delay and fetched data is seeded and repeatable"""
+    app = create_app(latency_ms=0, latency_jitter_ms=0, error_rate=0, transactions_per_account=100,
+                     approval_seconds=0.1, seed=1)
+
+    async def scenario():
+        aa_client = _client_for(app)
+        consent = await aa_client.initiate_consent("user-1", ["50100000000001", "50100000000002"])
+        status = await aa_client.poll_until_terminal(consent["id"], timeout=5)
+        first = await aa_client.fetch_data(consent["id"])
+        second = await aa_client.fetch_data(consent["id"])
+        streamed = [tx async for chunk in aa_client.fetch_data_stream(consent["id"], chunk_size=64) for tx in chunk]
+        await aa_client.aclose()
+        return status, first, second, streamed
+
+    status, first, second, streamed = asyncio.run(scenario())
+    assert status["status"] == "ACTIVE"
+    # 100 discretionary transactions per account plus recurring items
+    assert len(first["transactions"]) >= 200
+    assert first == second
+    assert len(streamed) == len(first["transactions"])
+
+def test_fetch_requires_active_consent_and_surfaces_errors():
+    """Pending consents cannot be fetched and injected failures come back as errors"""
+    async def scenario():
+        pending = _client_for(create_app(latency_ms=0, latency_jitter_ms=0, error_rate=0, approval_seconds=60))
+        consent = await pending.initiate_consent("user-2", [])
+        not_active = await pending.fetch_data(consent["id"])
+        await pending.aclose()
+
+        failing = _client_for(create_app(latency_ms=0, latency_jitter_ms=0, error_rate=1.0))
+        failed = await failing.check_status("anything")
+        await failing.aclose()
+        return not_active, failed
+
+    not_active, failed = asyncio.run(scenario())
+    assert not_active == {"error": "FI fetch failed"}
+    assert failed == {"error": "Status check failed"}
+
+def test_paid_job_fails_when_bank_data_cannot_be_fetched():
+    """A job without an approved consent fails and its payment is never completed"""
+    completed = []
+
+    class FakePayment:
+        async def complete_payment(self, payment_id, result):
+            completed.append(payment_id)
+
+    def paid_job(input_data):
+        job_id = str(uuid.uuid4())
+        main.job_store.create(job_id, input_data=input_data, identifier_from_purchaser="purchaser-aa",
+                              payment_id=f"pay-{job_id}", status="queued")
+        main.job_store.update(job_id, owner=main.WORKER_ID)
+        return job_id
+
+    async def scenario():
+        aa_client = _client_for(create_app(latency_ms=0, latency_jitter_ms=0, error_rate=0,
+                                           transactions_per_account=20, approval_seconds=60))
+        original_client, original_payment = main.aa_client, main.payment_for_job
+        main.aa_client, main.payment_for_job = aa_client, lambda job: FakePayment()
+        try:
+            with pytest.raises(ValueError):
+                await main.execute_crew_task({"user_id": "user-3"})
+            pending = await aa_client.initiate_consent("user-3", ["50100000000003"])
+            failed = paid_job({"user_id": "user-3", "consent_id": pending["id"]})
+            await main.run_paid_job(failed)
+
+            approved = await aa_client.initiate_consent("user-3", ["50100000000003"])
+            await aa_client._client.post(f"/consent/{approved['id']}/approve")
+            succeeded = paid_job({"user_id": "user-3", "consent_id": approved["id"]})
+            await main.run_paid_job(succeeded)
+        finally:
+            main.aa_client, main.payment_for_job = original_client, original_payment
+            await aa_client.aclose()
+        return main.job_store.get(failed), main.job_store.get(succeeded)
+
+    failed, succeeded = asyncio.run(scenario())
+    assert failed["status"] == "failed"
+    assert failed["error"] == "Could not fetch bank data: FI fetch failed"
+    assert succeeded["status"] == "completed"
+    assert completed == [succeeded["payment_id"]]
+
+if __name__ == "__main__":
+    print("Testing AA stand-in flow...")
+    test_consent_to_fetch_flow()
+    test_fetch_requires_active_consent_and_surfaces_errors()
+    test_paid_job_fails_when_bank_data_cannot_be_fetched()
+    print("All AA stand-in tests passed")
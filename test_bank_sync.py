@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Test script for bank sync deduplication
+Uses a throwaway SQLite database
+"""
+
+import asyncio
+import httpx
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("FIU_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'fiu_test.db')}")
+
+from datetime import datetime
+from app.fiu_models import create_tables, SessionLocal, User, BankAccount, Transaction
+from app.bank_sync_service import BankSyncService, transaction_fingerprint
+from app.synthetic_data import SyntheticBankDataGenerator
+from app.services.aa_client import AAClient
+
+create_tables()
+
+def _create_user(*account_numbers, bank_name="HDFC Bank"):
+    db = SessionLocal()
+    try:
+        user = User(name="Sync Test", email=f"{account_numbers[0]}@example.com", phone=account_numbers[0])
+        db.add(user)
+        db.flush()
+        accounts = [
+            BankAccount(
+                user_id=user.id, account_number=number, account_holder_name="Sync Test",
+                bank_name=bank_name, account_type="savings", ifsc_code="HDFC0001234"
+            )
+            for number in account_numbers
+        ]
+        db.add_all(accounts)
+        db.commit()
+        return user.user_id, [account.id for account in accounts]
+    finally:
+        db.close()
+
+def _create_account(account_number):
+    return _create_user(account_number)[1][0]
+
+def _transaction_count(account_id):
+    db = SessionLocal()
+    try:
+        account = db.query(BankAccount).filter(BankAccount.id == account_id).first()
+        return db.query(Transaction).filter(Transaction.user_id == account.user_id).count()
+    finally:
+        db.close()
+
+def test_fingerprint_is_deterministic():
+    """Whitespace and case in descriptions do not change the fingerprint, but the account and sign do"""
+    ts = datetime(2024, 1, 15, 10, 30)
+    assert transaction_fingerprint("123", ts, -2500, "Zomato  order") == transaction_fingerprint("123", ts, -2500, "ZOMATO ORDER")
+    assert transaction_fingerprint("123", ts, -2500, "ZOMATO ORDER") != transaction_fingerprint("124", ts, -2500, "ZOMATO ORDER")
+    assert transaction_fingerprint("123", ts, -2500, "ZOMATO ORDER") != transaction_fingerprint("123", ts, 2500, "ZOMATO ORDER")
+
+def test_reversal_is_kept_next_to_its_debit():
+    """A debit and its reversal credit at the same time are both stored, with or without ON CONFLICT support"""
+    import app.bank_sync_service as bank_sync_service
+    ts = datetime(2024, 3, 2, 14, 5)
+    records = [
+        {"timestamp": ts, "description": "AMAZON SHOPPING", "type": "debit", "amount": -2500},
+        {"timestamp": ts, "description": "AMAZON SHOPPING", "type": "credit", "amount": 2500}
+    ]
+
+    class ReversalSource:
+        def fetch_transactions(self, account_number, window_start, window_end):
+            return records
+
+    # The second pass takes the generic path used by dialects without ON CONFLICT
+    paths = (("50100000000011", bank_sync_service.ON_CONFLICT_INSERTS), ("50100000000012", {}))
+    for account_number, inserts in paths:
+        account_id = _create_account(account_number)
+        service = BankSyncService(data_source=ReversalSource())
+        original = bank_sync_service.ON_CONFLICT_INSERTS
+        bank_sync_service.ON_CONFLICT_INSERTS = inserts
+        try:
+            first = service.sync_transactions(account_id, mode="full")
+            second = service.sync_transactions(account_id, mode="full")
+        finally:
+            bank_sync_service.ON_CONFLICT_INSERTS = original
+        assert first["synced_count"] == 2
+        assert sorted(tx["type"] for tx in first["transactions"]) == ["credit", "debit"]
+        assert second["synced_count"] == 0
+        assert _transaction_count(account_id) == 2
+
+def test_resync_of_same_data_inserts_nothing():
+    """Replaying the same bank data is a no-op"""
+    account_id = _create_account("50100000000001")
+    service = BankSyncService()
+
+    random.seed(42)
+    first = service.sync_transactions(account_id, mode="full")
+    random.seed(42)
+    second = service.sync_transactions(account_id, mode="full")
+
+    assert first["success"] and second["success"]
+    assert first["synced_count"] > 0
+    assert second["synced_count"] == 0
+    assert _transaction_count(account_id) == first["synced_count"]
+
+def test_legitimate_repeats_are_kept():
+    """Same merchant and amount at different times are separate transactions"""
+    account_id = _create_account("50100000000002")
+    service = BankSyncService()
+    service.mock_transactions = [{"desc": "UBER RIDE", "amount": -450, "type": "debit", "category": "transport"}]
+
+    random.seed(7)
+    result = service.sync_transactions(account_id, mode="full")
+
+    assert result["synced_count"] > 1
+    assert all(tx["description"].startswith("UBER RIDE") for tx in result["transactions"])
+
+def test_incremental_sync_only_reads_since_watermark():
+    """A second sync right after the first only re-reads the overlap window"""
+    account_id = _create_account("50100000000006")
+    service = BankSyncService()
+
+    first = service.sync_transactions(account_id)
+    second = service.sync_transactions(account_id)
+
+    assert first["mode"] == "incremental"
+    assert second["window_start"] > first["window_start"]
+    assert second["watermark"] > first["watermark"]
+    assert second["fetched_count"] <= 1
+    assert service.sync_transactions(account_id, mode="bogus")["error"].startswith("Invalid sync mode")
+
+def test_stale_watermark_reads_the_whole_gap():
+    """An account last synced long ago is read from its watermark, not just the last `days` days"""
+    from datetime import timedelta
+    from app.fiu_models import SyncWatermark
+    account_id = _create_account("50100000000013")
+    windows = []
+
+    class RecordingSource:
+        def fetch_transactions(self, account_number, window_start, window_end):
+            windows.append((window_start, window_end))
+            return [{"timestamp": window_start + timedelta(days=1), "description": "OLD RENT PAYMENT",
+                     "type": "debit", "amount": -15000}]
+
+    service = BankSyncService(data_source=RecordingSource())
+    stale = datetime.utcnow() - timedelta(days=60)
+    db = SessionLocal()
+    try:
+        db.add(SyncWatermark(account_id=account_id, source=service.source_name, watermark=stale))
+        db.commit()
+    finally:
+        db.close()
+
+    result = service.sync_transactions(account_id, days=30)
+
+    assert result["synced_count"] == 1
+    assert windows[0][0] == stale - timedelta(hours=service.overlap_hours)
+    # Timestamps are naive UTC like the rest of the module
+    assert abs((windows[0][1] - datetime.utcnow()).total_seconds()) < 60
+    assert result["watermark"] == windows[0][1].isoformat()
+
+def test_sync_all_accounts_of_user():
+    """Every account of the user is synced and reported in one result"""
+    user_id, account_ids = _create_user("50100000000003", "50100000000004", "50100000000005")
+    service = BankSyncService(max_concurrency=4, per_bank_concurrency=2)
+
+    result = asyncio.run(service.sync_user_accounts(user_id))
+
+    assert result["success"]
+    assert result["accounts_synced"] == 3
+    assert sorted(a["account_id"] for a in result["accounts"]) == sorted(account_ids)
+    # All three accounts belong to the same user, so this is the user's total
+    assert result["transactions_synced"] == _transaction_count(account_ids[0])
+    assert asyncio.run(service.sync_user_accounts("missing-user")) == {"error": "User not found"}
+
+def test_throttled_bank_does_not_starve_others():
+    """Accounts waiting on one bank's cap leave global slots free for other banks"""
+    banks = ("HDFC Bank", "ICICI Bank", "Axis Bank")
+    user_ids = [
+        _create_user(*(f"5020{bank:02d}{n:08d}" for n in range(4)), bank_name=name)[0]
+        for bank, name in enumerate(banks)
+    ]
+    # Room for every bank's full share, so the first wave should cover all three
+    service = BankSyncService(max_concurrency=6, per_bank_concurrency=2)
+    lock = threading.Lock()
+    in_flight, events = {}, []
+
+    def fake_sync(account_id):
+        db = SessionLocal()
+        try:
+            bank_name = db.get(BankAccount, account_id).bank_name
+        finally:
+            db.close()
+        with lock:
+            in_flight[bank_name] = in_flight.get(bank_name, 0) + 1
+            assert in_flight[bank_name] <= 2
+            events.append(("start", bank_name))
+        time.sleep(0.1)
+        with lock:
+            in_flight[bank_name] -= 1
+            events.append(("end", bank_name))
+        return {"success": True, "transactions_sync": {"synced_count": 0}}
+    service.full_account_sync = fake_sync
+
+    async def run():
+        # Enough worker threads that the executor is not the limit
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=12))
+        return await service.sync_users(user_ids)
+
+    result = asyncio.run(run())
+
+    assert result["accounts_synced"] == 12
+    first_wave = events[:events.index(next(event for event in events if event[0] == "end"))]
+    assert sorted(bank for _, bank in first_wave) == sorted(banks * 2)
+
+def test_synthetic_source_is_deterministic():
+    """Same seed gives the same data, and overlapping re-syncs insert nothing new"""
+    window_end = datetime(2025, 6, 30, 23, 59)
+    first = SyntheticBankDataGenerator(seed=7).fetch_transactions("50100000000007", datetime(2025, 6, 1), window_end)
+    second = SyntheticBankDataGenerator(seed=7).fetch_transactions("50100000000007", datetime(2025, 6, 1), window_end)
+    assert first == second and first
+
+    account_id = _create_account("50100000000007")
+    service = BankSyncService(data_source=SyntheticBankDataGenerator(seed=7))
+    service.sync_transactions(account_id, days=60, mode="full")
+    count = _transaction_count(account_id)
+    assert service.sync_transactions(account_id, days=60, mode="full")["synced_count"] == 0
+    assert _transaction_count(account_id) == count
+
+def test_synthetic_load_can_be_rerun():
+    """Loading the same seed twice inserts nothing the second time and counts only inserted rows"""
+    from sqlalchemy import create_engine
+    from app.fiu_models import Base
+    from app.synthetic_data import load_into_database
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'synthetic.db')}")
+    Base.metadata.create_all(bind=engine)
+    load = lambda users: load_into_database(SyntheticBankDataGenerator(seed=11), engine, users, 2,
+                                            datetime(2025, 6, 30).date(), 90, batch_size=25)
+
+    first = load(3)
+    assert first["users"] == 3 and first["accounts"] == 6 and first["transactions"] >= 6 * 30
+    assert load(3) == {"users": 0, "accounts": 0, "transactions": 0}
+    # A larger run only adds the new user's rows
+    fourth = load(4)
+    assert fourth["users"] == 1 and fourth["accounts"] == 2
+
+    with engine.connect() as conn:
+        stored = conn.exec_driver_sql("SELECT COUNT(*) FROM transactions").scalar()
+        assert stored == first["transactions"] + fourth["transactions"]
+        # Pooled connections keep the default journal mode and durability setting (FULL)
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 2
+
+def test_synthetic_load_matches_sync_source():
+    """A sync over already loaded history finds every transaction stored"""
+    from app.fiu_models import engine
+    from app.synthetic_data import load_into_database
+
+    generator = SyntheticBankDataGenerator(seed=13, daily_rate=2.0)
+    end_date = datetime.utcnow().date()
+    load_into_database(generator, engine, 1, 1, end_date, 45)
+    account_number = next(generator.accounts(next(generator.users(1)), 1))["account_number"]
+    db = SessionLocal()
+    try:
+        account_id = db.query(BankAccount).filter(BankAccount.account_number == account_number).one().id
+    finally:
+        db.close()
+    count = _transaction_count(account_id)
+    assert count > 0
+
+    result = BankSyncService(data_source=SyntheticBankDataGenerator(seed=13, daily_rate=2.0)).sync_transactions(
+        account_id, days=30, mode="full")
+    assert result["synced_count"] == 0
+    assert _transaction_count(account_id) == count
+
+def test_full_sync_is_atomic():
+    """A failure after the insert stage leaves neither transactions nor balance behind"""
+    account_id = _create_account("50100000000008")
+    service = BankSyncService(data_source=SyntheticBankDataGenerator(seed=8))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("reconciliation failed")
+    service._reconcile_balance = fail
+
+    result = service.full_account_sync(account_id, days=60)
+    assert result == {"error": "reconciliation failed"}
+    assert _transaction_count(account_id) == 0
+
+    result = BankSyncService(data_source=SyntheticBankDataGenerator(seed=8)).full_account_sync(account_id, days=60)
+    assert result["success"]
+    assert result["transactions_sync"]["synced_count"] == _transaction_count(account_id) > 0
+    assert set(result["timings"]) == {
+        "load_ms", "fetch_ms", "normalize_ms", "insert_ms", "reconcile_ms", "commit_ms", "total_ms"
+    }
+
+def test_streamed_aa_payload_is_ingested_while_downloading():
+    """Chunks are inserted before the body finishes and none exceed the chunk size"""
+    account_id = _create_account("50100000000009")
+    total = 5000
+    seen_during_download = []
+
+    async def body():
+        yield b'{"consentId": "c-1", "transactions": ['
+        for i in range(total):
+            tx = {"date": f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+                  "amount": -(100 + i), "description": f"UPI PAYMENT {i}", "type": "debit"}
+            yield (b"," if i else b"") + json.dumps(tx).encode()
+        seen_during_download.append(_transaction_count(account_id))
+        yield b"]}"
+
+    async def scenario():
+        aa_client = AAClient()
+        aa_client._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body())),
+            base_url="http://aa.test"
+        )
+        service = BankSyncService()
+        result = await service.ingest_stream(account_id, aa_client.fetch_data_stream("c-1", chunk_size=250))
+        await aa_client.aclose()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result["success"]
+    assert result["fetched_count"] == result["synced_count"] == total
+    assert result["chunks"] == total // 250
+    assert _transaction_count(account_id) == total
+    assert 0 < seen_during_download[0] < total
+
+if __name__ == "__main__":
+    print("Testing bank sync deduplication...")
+    test_fingerprint_is_deterministic()
+    test_reversal_is_kept_next_to_its_debit()
+    test_resync_of_same_data_inserts_nothing()
+    test_legitimate_repeats_are_kept()
+    test_incremental_sync_only_reads_since_watermark()
+    test_stale_watermark_reads_the_whole_gap()
+    test_sync_all_accounts_of_user()
+    test_throttled_bank_does_not_starve_others()
+    test_synthetic_source_is_deterministic()
+    test_synthetic_load_can_be_rerun()
+    test_synthetic_load_matches_sync_source()
+    test_full_sync_is_atomic()
+    test_streamed_aa_payload_is_ingested_while_downloading()
+    print("All bank sync tests passed")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for consent status coalescing, caching and polling
+Uses an in-process mock transport instead of a real AA
+"""
+
+import asyncio
+import httpx
+from app.services.aa_client import AAClient
+
+def _client_with_states(states, delay=0.05):
+    """AAClient whose AA returns the given states in order, repeating the last"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(delay)
+        state = states[min(len(calls), len(states)) - 1]
+        return httpx.Response(200, json={"status": state})
+
+    aa_client = AAClient()
+    aa_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://aa.test")
+    aa_client.poll_initial_delay = 0.01
+    aa_client.poll_max_delay = 0.04
+    return aa_client, calls
+
+def test_concurrent_checks_share_one_request():
+    """Concurrent checks for one consent make a single upstream call"""
+    async def scenario():
+        aa_client, calls = _client_with_states(["PENDING"])
+        results = await asyncio.gather(*(aa_client.check_status("c-1") for _ in range(50)))
+        await aa_client.aclose()
+        return aa_client, calls, results
+
+    aa_client, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == {"status": "PENDING"} for r in results)
+    assert aa_client.status_stats()["coalesced_calls"] == 49
+
+def test_terminal_state_is_cached():
+    """Once ACTIVE, repeated checks are served without upstream calls"""
+    async def scenario():
+        aa_client, calls = _client_with_states(["ACTIVE"], delay=0)
+        for _ in range(10):
+            await aa_client.check_status("c-2")
+        await aa_client.aclose()
+        return calls
+
+    assert len(asyncio.run(scenario())) == 1
+
+def test_poll_stops_at_terminal_state():
+    """Polling backs off through pending states and stops at the terminal one"""
+    async def scenario():
+        aa_client, calls = _client_with_states(["PENDING", "PENDING", "PENDING", "REJECTED"], delay=0)
+        result = await aa_client.poll_until_terminal("c-3", timeout=5)
+        timed_out = await _client_with_states(["PENDING"], delay=0)[0].poll_until_terminal("c-4", timeout=0.05)
+        await aa_client.aclose()
+        return result, calls, timed_out
+
+    result, calls, timed_out = asyncio.run(scenario())
+    assert result == {"status": "REJECTED"}
+    assert len(calls) == 4
+    assert timed_out["error"].startswith("Consent c-4 not resolved")
+
+if __name__ == "__main__":
+    print("Testing consent status polling...")
+    test_concurrent_checks_share_one_request()
+    test_terminal_state_is_cached()
+    test_poll_stops_at_terminal_state()
+    print("All consent polling tests passed")
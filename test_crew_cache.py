@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the BudgetPlannerCrew task output cache
+Runs fully offline using the stub LLM
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+# Keep crewai fully offline
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("BUDGET_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'budget_test.db')}")
+os.environ.setdefault("RESULT_STORE_DIR", os.path.join(_tmp_dir, "results"))
+# Masumi needs a config to import the app; the payment service itself is never reached
+os.environ.setdefault("PAYMENT_SERVICE_URL", "http://localhost:9/api/v1")
+os.environ.setdefault("PAYMENT_API_KEY", "test-key")
+os.environ.setdefault("AGENT_IDENTIFIER", "test-agent")
+os.environ.setdefault("NETWORK", "Preprod")
+
+from app.crew import BudgetPlannerCrew
+from app.crew_cache import CrewCache, make_cache_key
+from app.stub_llm import StubLLM
+from app.services.aa_client import AAClient
+
+def _transactions_data():
+    data = asyncio.run(AAClient().fetch_data("test_user"))
+    return json.dumps(data)
+
+def test_repeated_run_is_served_from_cache():
+    """Second run with identical inputs makes no LLM calls"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CrewCache(db_path=os.path.join(tmp, "cache.db"))
+        llm = StubLLM(latency_seconds=0.05)
+        crew = BudgetPlannerCrew(verbose=False, llm=llm, cache=cache, compact_prompts=False)
+        inputs = {"transactions_data": _transactions_data()}
+
+        start = time.perf_counter()
+        first = crew.run(inputs)
+        cold_seconds = time.perf_counter() - start
+        cold_calls = llm.call_count
+
+        start = time.perf_counter()
+        second = crew.run(inputs)
+        warm_seconds = time.perf_counter() - start
+
+        stats = cache.stats()
+        print(f"Cold run: {cold_seconds:.2f}s, {cold_calls} LLM calls")
+        print(f"Warm run: {warm_seconds:.3f}s, hit rate {stats['hit_rate']:.0%}")
+
+        assert first == second
+        assert llm.call_count == cold_calls
+        assert stats["hits"] == 4
+        assert warm_seconds < cold_seconds
+        cache.close()
+
+def test_changed_input_misses():
+    """Different transactions produce different stage keys"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CrewCache(db_path=os.path.join(tmp, "cache.db"))
+        llm = StubLLM()
+        crew = BudgetPlannerCrew(verbose=False, llm=llm, cache=cache, compact_prompts=False)
+
+        crew.run({"transactions_data": _transactions_data()})
+        calls = llm.call_count
+        crew.run({"transactions_data": json.dumps({"transactions": []})})
+
+        assert llm.call_count > calls
+        assert cache.stats()["hits"] == 0
+        cache.close()
+
+def test_eviction_by_size_and_age():
+    """Entries beyond the byte budget or max age are evicted"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CrewCache(db_path=os.path.join(tmp, "cache.db"), max_bytes=250, max_age_seconds=3600)
+        for i in range(5):
+            cache.set(make_cache_key("stage", i), "x" * 100)
+        stats = cache.stats()
+        assert stats["size_bytes"] <= 250
+        assert cache.get(make_cache_key("stage", 0)) is None
+        assert cache.get(make_cache_key("stage", 4)) == "x" * 100
+
+        cache.max_age_seconds = 0.01
+        time.sleep(0.05)
+        assert cache.get(make_cache_key("stage", 4)) is None
+        cache.close()
+
+def test_zero_disables_a_limit():
+    """An explicit 0 is kept rather than replaced by the environment default, and turns that limit off"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CrewCache(db_path=os.path.join(tmp, "cache.db"), max_entries=0, max_bytes=0, max_age_seconds=0)
+        assert (cache.max_entries, cache.max_bytes, cache.max_age_seconds) == (0, 0, 0)
+        for i in range(50):
+            cache.set(make_cache_key("stage", i), "x" * 100)
+        time.sleep(0.05)
+        assert cache.stats()["entries"] == 50
+        assert cache.get(make_cache_key("stage", 0)) == "x" * 100
+        cache.close()
+
+def test_app_opens_the_cache_in_its_lifespan():
+    """The app builds its cache in the lifespan, from the settings at startup"""
+    from fastapi.testclient import TestClient
+    import main
+
+    settings = {"CREW_CACHE_PATH": os.path.join(_tmp_dir, "lifespan_cache.db"),
+                "CREW_CACHE_MAX_AGE_SECONDS": "0"}
+    original_env = {name: os.environ.get(name) for name in settings}
+    original_cache = main.crew_cache
+    os.environ.update(settings)
+    main.crew_cache = None
+    # The claim loop waits on this event, which binds to the loop of the first lifespan
+    main.jobs_available = asyncio.Event()
+    try:
+        with TestClient(main.app):
+            assert main.crew_cache.db_path == settings["CREW_CACHE_PATH"]
+            assert main.crew_cache.max_age_seconds == 0
+        assert os.path.exists(settings["CREW_CACHE_PATH"])
+    finally:
+        if main.crew_cache is not None:
+            main.crew_cache.close()
+        main.crew_cache = original_cache
+        for name, value in original_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+if __name__ == "__main__":
+    print("Testing crew cache...")
+    test_repeated_run_is_served_from_cache()
+    test_changed_input_misses()
+    test_eviction_by_size_and_age()
+    test_zero_disables_a_limit()
+    test_app_opens_the_cache_in_its_lifespan()
+    print("All crew cache tests passed")
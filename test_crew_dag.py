@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the BudgetPlannerCrew DAG execution mode
+Runs fully offline using the stub LLM
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+# Keep crewai fully offline
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+
+from app.crew import BudgetPlannerCrew, STAGE_INPUTS, STAGE_NAMES
+from app.stub_llm import StubLLM
+from app.services.aa_client import AAClient
+
+class TimedCrew(BudgetPlannerCrew):
+    """Records each stage's output and wall-clock span"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stage_outputs = {}
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def _run_stage(self, name, inputs, context_stages, outputs, keys):
+        start = time.perf_counter()
+        key, output = super()._run_stage(name, inputs, context_stages, outputs, keys)
+        with self._lock:
+            self.stage_outputs[name] = output
+            self.spans[name] = (start, time.perf_counter())
+        return key, output
+
+def _inputs():
+    data = asyncio.run(AAClient().fetch_data("test_user"))
+    return {"transactions_data": json.dumps(data)}
+
+def test_dag_matches_sequential_outputs():
+    """Stages whose context is the same in both modes give the same output"""
+    inputs = _inputs()
+    sequential = TimedCrew(verbose=False, llm=StubLLM(), execution_mode="sequential")
+    dag = TimedCrew(verbose=False, llm=StubLLM(), execution_mode="dag")
+
+    sequential_result = sequential.execute(inputs)
+    dag_result = dag.execute(inputs)
+
+    assert dag_result and sequential_result
+    assert set(dag.stage_outputs) == set(sequential.stage_outputs) == set(STAGE_NAMES)
+    # Sequential stages see every earlier stage, DAG stages only their STAGE_INPUTS
+    for index, name in enumerate(STAGE_NAMES):
+        if STAGE_INPUTS[name] == STAGE_NAMES[:index]:
+            assert dag.stage_outputs[name] == sequential.stage_outputs[name], name
+        else:
+            assert dag.stage_outputs[name] != sequential.stage_outputs[name], name
+
+def test_independent_stages_overlap():
+    """The strategist runs alongside the analyst and the reporter waits for both"""
+    crew = TimedCrew(verbose=False, llm=StubLLM(latency_seconds=0.2), execution_mode="dag")
+    crew.execute(_inputs())
+
+    analyze, strategy, report = crew.spans["analyze"], crew.spans["strategy"], crew.spans["report"]
+    assert strategy[0] < analyze[1] and analyze[0] < strategy[1]
+    assert crew.spans["categorize"][1] <= min(analyze[0], strategy[0])
+    assert report[0] >= max(analyze[1], strategy[1])
+
+if __name__ == "__main__":
+    print("Testing crew DAG mode...")
+    test_dag_matches_sequential_outputs()
+    test_independent_stages_overlap()
+    print("All crew DAG tests passed")
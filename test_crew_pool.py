@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test script for the prewarmed crew pool
+Uses lightweight fake crews, plus one real crew with the offline stub LLM
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import pandas as pd
+import pytest
+
+# Keep crewai fully offline
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+
+from app.crew import BudgetPlannerCrew, CrewCancelled
+from app.crew_pool import CrewPool, CrewPoolExhausted
+from app.stub_llm import StubLLM
+
+TRANSACTIONS = {"transactions": [
+    {"date": "2024-03-01", "amount": 50000, "description": "SALARY CREDIT", "type": "credit"},
+    {"date": "2024-03-05", "amount": -15000, "description": "RENT PAYMENT", "type": "debit"},
+    {"date": "2024-03-07", "amount": -2400, "description": "BIGBASKET GROCERY", "type": "debit"}
+]}
+
+class FakeCrew:
+    """Stands in for BudgetPlannerCrew; each job takes `seconds` and may raise `error`"""
+
+    execution_mode = "sequential"
+
+    def __init__(self, seconds=0.0, error=None):
+        self.seconds = seconds
+        self.error = error
+        self.resets = 0
+        self.jobs = []
+
+    def reset(self):
+        self.resets += 1
+
+    def run(self, inputs, cancel_event=None):
+        time.sleep(self.seconds)
+        if cancel_event is not None and cancel_event.is_set():
+            raise CrewCancelled("Cancelled before stage 'report'")
+        if self.error is not None:
+            raise self.error
+        self.jobs.append(inputs["job"])
+        return f"report for {inputs['job']}"
+
+    def execute(self, inputs):
+        return self.run(inputs)
+
+def test_prewarm_builds_every_crew_once():
+    """Prewarming constructs `size` crews up front and is a no-op when repeated"""
+    built = []
+
+    def factory():
+        built.append(FakeCrew())
+        return built[-1]
+
+    pool = CrewPool(size=3, crew_factory=factory)
+    assert pool.enabled and not CrewPool(size=0).enabled
+
+    pool.prewarm()
+    pool.prewarm()
+
+    assert len(built) == 3
+    stats = pool.stats()
+    assert stats["created"] == stats["available"] == 3
+    assert stats["in_use"] == 0 and stats["checkouts"] == 0
+
+def test_checkout_returns_a_reset_crew():
+    """A crew comes back from a job with no task outputs or artifacts left over"""
+    pool = CrewPool(size=1, crew_factory=lambda: BudgetPlannerCrew(verbose=False, llm=StubLLM()))
+    pool.prewarm()
+    inputs = {"transactions_data": json.dumps(TRANSACTIONS)}
+
+    with pool.acquire() as crew:
+        assert crew.run(inputs)
+        # Leave state behind the way a failed or partial job would
+        crew.artifacts.put(pd.DataFrame({"amount": [1.0]}), kind="leftover")
+        assert any(task.output is not None for task in crew.crew.tasks)
+
+    with pool.acquire() as crew:
+        assert len(crew.artifacts) == 0
+        assert all(task.output is None for task in crew.crew.tasks)
+        assert pool.stats()["in_use"] == 1
+    assert pool.stats()["available"] == 1
+
+def test_crew_returns_when_its_job_fails_or_is_cancelled():
+    """Raising and cancelled jobs both give their crew back, the cancelled one once its thread finishes"""
+    crew = FakeCrew(seconds=0.2)
+    pool = CrewPool(size=1, crew_factory=lambda: crew)
+    pool.prewarm()
+
+    async def scenario():
+        crew.error = ValueError("bad transactions")
+        with pytest.raises(ValueError):
+            await pool.arun({"job": "failing"})
+        assert pool.stats()["in_use"] == 0 and crew.resets == 1
+
+        crew.error = None
+        run = asyncio.create_task(pool.arun({"job": "cancelled"}))
+        await asyncio.sleep(0.05)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        assert pool.stats()["in_use"] == 1
+        while pool.stats()["in_use"]:
+            await asyncio.sleep(0.02)
+        assert crew.resets == 2
+
+        return await pool.arun({"job": "after"})
+
+    assert asyncio.run(scenario()) == "report for after"
+    assert crew.jobs == ["after"]
+    assert pool.stats()["available"] == 1
+
+def test_checkout_blocks_while_the_pool_is_empty():
+    """A second job waits for the only crew, and gives up after the acquire timeout"""
+    pool = CrewPool(size=1, crew_factory=FakeCrew, acquire_timeout=5)
+    pool.prewarm()
+    waited = []
+
+    def second_job():
+        start = time.perf_counter()
+        with pool.acquire():
+            waited.append(time.perf_counter() - start)
+
+    with pool.acquire():
+        with pytest.raises(CrewPoolExhausted):
+            with pool.acquire(timeout=0.1):
+                pass
+        waiter = threading.Thread(target=second_job)
+        waiter.start()
+        time.sleep(0.2)
+        assert waited == []
+    waiter.join(timeout=5)
+
+    assert len(waited) == 1 and waited[0] >= 0.15
+
+def test_stats_track_checkouts_and_utilization():
+    """Checkouts, peak use, utilization and wait time are reported"""
+    pool = CrewPool(size=2, crew_factory=FakeCrew)
+    pool.prewarm()
+
+    with pool.acquire():
+        with pool.acquire():
+            stats = pool.stats()
+            assert stats["in_use"] == 2 and stats["available"] == 0
+            assert stats["utilization"] == 1.0
+        assert pool.stats()["utilization"] == 0.5
+    assert pool.run({"job": "third"}) == "report for third"
+
+    stats = pool.stats()
+    assert stats["checkouts"] == 3
+    assert stats["peak_in_use"] == 2
+    assert stats["in_use"] == 0 and stats["utilization"] == 0.0
+    assert stats["avg_wait_ms"] >= 0.0
+
+if __name__ == "__main__":
+    print("Testing crew pool...")
+    test_prewarm_builds_every_crew_once()
+    test_checkout_returns_a_reset_crew()
+    test_crew_returns_when_its_job_fails_or_is_cancelled()
+    test_checkout_blocks_while_the_pool_is_empty()
+    test_stats_track_checkouts_and_utilization()
+    print("All crew pool tests passed")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script for encrypted FI data decryption and streaming ingest
+Uses locally generated Curve25519 key pairs and fixture payloads
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import pytest
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("FIU_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'fiu_test.db')}")
+
+import httpx
+from aa_stand_in_server import create_app
+from app.services.aa_client import AAClient
+from app.services.fi_decryption import (
+    FIDecryptionError, FIDecryptor, NONCE_SIZE, decrypt_account, encrypt_fi_data, generate_key_pair, key_material
+)
+
+def _fi_account(count, prefix="UPI"):
+    return {"Transactions": {"Transaction": [
+        {"txnId": str(i), "type": "DEBIT" if i % 3 else "CREDIT", "amount": f"{100 + i}.50",
+         "transactionTimestamp": f"2024-03-01T10:{i % 60:02d}:00+05:30", "narration": f"{prefix} {i}"}
+        for i in range(count)
+    ]}}
+
+def _fi_entry(session, accounts):
+    """One FIP's FI entry encrypted for the session's key material"""
+    fip_private, fip_public = generate_key_pair()
+    fip_nonce = os.urandom(NONCE_SIZE)
+    return {
+        "fipID": "TEST-FIP",
+        "KeyMaterial": key_material(fip_public, fip_nonce),
+        "data": [
+            {"maskedAccNumber": f"XXXX{i:04d}",
+             "encryptedFI": encrypt_fi_data(json.dumps(account).encode(), fip_private, fip_nonce,
+                                            session.key_material())}
+            for i, account in enumerate(accounts)
+        ]
+    }
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+def test_round_trip_and_tamper_detection():
+    """A blob decrypts to normalized rows and any tampering is rejected"""
+    session = FIDecryptor(max_workers=1).new_session()
+    entry = _fi_entry(session, [_fi_account(5)])
+    account = entry["data"][0]
+
+    rows = decrypt_account(session.private_key, session.nonce, entry["KeyMaterial"], account)
+    assert len(rows) == 5
+    assert rows[0] == {"timestamp": rows[0]["timestamp"], "description": "UPI 0", "type": "credit", "amount": 100.5}
+    assert rows[1]["amount"] == -101.5
+    # +05:30 timestamps are stored as naive UTC
+    assert rows[0]["timestamp"].hour == 4
+
+    tampered = dict(account, encryptedFI="A" + account["encryptedFI"][1:])
+    with pytest.raises(FIDecryptionError):
+        decrypt_account(session.private_key, session.nonce, entry["KeyMaterial"], tampered)
+
+    other = FIDecryptor(max_workers=1).new_session()
+    with pytest.raises(FIDecryptionError):
+        decrypt_account(other.private_key, other.nonce, entry["KeyMaterial"], account)
+
+def test_every_fi_request_gets_fresh_key_material():
+    """Each session draws a new nonce, and a new key pair unless the FIU key is configured"""
+    decryptor = FIDecryptor(max_workers=1)
+    first, second = decryptor.new_session(), decryptor.new_session()
+    assert first.nonce != second.nonce
+    assert first.public_key != second.public_key
+    assert decryptor.sessions == 2
+
+    private_key, public_key = generate_key_pair()
+    configured = FIDecryptor(private_key=private_key, max_workers=1)
+    first, second = configured.new_session(), configured.new_session()
+    assert first.public_key == second.public_key == public_key
+    assert first.nonce != second.nonce
+
+    # A response encrypted for one request cannot be decrypted with another request's nonce
+    entry = _fi_entry(first, [_fi_account(3)])
+    assert len(decrypt_account(first.private_key, first.nonce, entry["KeyMaterial"], entry["data"][0])) == 3
+    with pytest.raises(FIDecryptionError):
+        decrypt_account(second.private_key, second.nonce, entry["KeyMaterial"], entry["data"][0])
+
+def test_parallel_decrypt_stream_yields_every_row():
+    """Many account blobs across FIPs decrypt in the process pool into bounded chunks"""
+    decryptor = FIDecryptor(max_workers=2)
+    session = decryptor.new_session()
+    entries = [_fi_entry(session, [_fi_account(300, f"FIP{f} ACC{a}") for a in range(4)]) for f in range(3)]
+
+    async def scenario():
+        return [chunk async for chunk in decryptor.decrypt_stream(_aiter(entries), session, chunk_size=100)]
+
+    try:
+        chunks = asyncio.run(scenario())
+    finally:
+        decryptor.close()
+    assert sum(len(c) for c in chunks) == 3 * 4 * 300
+    assert max(len(c) for c in chunks) == 100
+    assert decryptor.accounts_decrypted == 12
+    assert len({row["description"].rsplit(" ", 1)[0] for c in chunks for row in c}) == 12
+
+def test_encrypted_stand_in_fetch_is_ingested():
+    """Encrypted FI from the stand-in is decrypted and lands in the account's transactions"""
+    from app.bank_sync_service import BankSyncService
+    from app.fiu_models import create_tables, SessionLocal, User, BankAccount, Transaction
+
+    create_tables()
+    db = SessionLocal()
+    user = User(user_id="fi-user", name="FI User", email="fi-user@example.com", phone="9000000010")
+    db.add(user)
+    db.flush()
+    account = BankAccount(user_id=user.id, account_number="50100000000010", account_holder_name="FI User",
+                          bank_name="HDFC Bank", account_type="savings", ifsc_code="HDFC0000001")
+    db.add(account)
+    db.commit()
+    account_id, user_pk = account.id, user.id
+    db.close()
+
+    app = create_app(latency_ms=0, latency_jitter_ms=0, error_rate=0, transactions_per_account=150,
+                     approval_seconds=0)
+    decryptor = FIDecryptor(max_workers=2)
+
+    async def scenario():
+        aa_client = AAClient()
+        aa_client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://aa.test")
+        consent = await aa_client.initiate_consent("fi-user", ["50100000000010", "50100000000011"])
+        session = decryptor.new_session()
+        entries = aa_client.fetch_encrypted_stream(consent["id"], session.key_material())
+        result = await BankSyncService().ingest_stream(account_id, decryptor.decrypt_stream(entries, session))
+        await aa_client.aclose()
+        return result
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        decryptor.close()
+
+    db = SessionLocal()
+    stored = db.query(Transaction).filter(Transaction.user_id == user_pk).count()
+    db.close()
+    assert result["success"]
+    assert decryptor.accounts_decrypted == 2
+    assert result["fetched_count"] >= 300
+    assert stored == result["synced_count"] == result["fetched_count"]
+
+if __name__ == "__main__":
+    print("Testing FI decryption...")
+    test_round_trip_and_tamper_detection()
+    test_every_fi_request_gets_fresh_key_material()
+    test_parallel_decrypt_stream_yields_every_row()
+    test_encrypted_stand_in_fetch_is_ingested()
+    print("All FI decryption tests passed")
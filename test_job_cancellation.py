@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test script for job cancellation and the job reaper
+Cancels queued jobs, running jobs and pooled crew runs with an offline stub LLM,
+and drives /cancel_job and the reaper against a temporary database
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+import pytest
+
+# Keep crewai fully offline
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("BUDGET_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'budget_test.db')}")
+os.environ.setdefault("RESULT_STORE_DIR", os.path.join(_tmp_dir, "results"))
+os.environ.setdefault("CREW_CACHE_PATH", os.path.join(_tmp_dir, "crew_cache.db"))
+# Masumi needs a config to import; the payment service itself is never reached
+os.environ.setdefault("PAYMENT_SERVICE_URL", "http://localhost:9/api/v1")
+os.environ.setdefault("PAYMENT_API_KEY", "test-key")
+os.environ.setdefault("AGENT_IDENTIFIER", "test-agent")
+os.environ.setdefault("NETWORK", "Preprod")
+
+from fastapi.testclient import TestClient
+import main
+
+from app.crew import BudgetPlannerCrew
+from app.crew_pool import CrewPool
+from app.job_queue import JobQueue
+from app.stub_llm import StubLLM
+
+TRANSACTIONS = {"transactions": [
+    {"date": "2024-03-01", "amount": 50000, "description": "SALARY CREDIT", "type": "credit"},
+    {"date": "2024-03-02", "amount": -15000, "description": "RENT PAYMENT", "type": "debit"},
+    {"date": "2024-03-03", "amount": -450, "description": "ZOMATO ORDER", "type": "debit"}
+]}
+
+def test_queued_and_running_jobs_can_be_cancelled():
+    """cancel() drops queued jobs and stops running ones without stopping the worker"""
+    started, finished = [], []
+
+    async def handler(job_id):
+        started.append(job_id)
+        await asyncio.sleep(0.2 if job_id == "slow" else 0)
+        finished.append(job_id)
+
+    queue = JobQueue(handler=handler, workers=1, max_queued=10)
+
+    async def scenario():
+        queue.submit("slow", "purchaser-a")
+        queue.submit("dropped", "purchaser-b")
+        queue.submit("after", "purchaser-a")
+        assert queue.cancel("dropped")
+        assert queue.position("after") == 2
+        await queue.start()
+        await asyncio.sleep(0.05)
+        assert queue.cancel("slow")
+        assert not queue.cancel("unknown")
+        while "after" not in finished:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert started == ["slow", "after"]
+    assert finished == ["after"]
+    stats = queue.stats()
+    assert stats["cancelled"] == 2 and stats["completed"] == 1 and stats["queued"] == 0
+
+def test_cancelled_crew_run_stops_before_next_stage():
+    """A cancelled pooled run finishes its current stage, skips the rest and returns its crew"""
+    llm = StubLLM(latency_seconds=0.2)
+    pool = CrewPool(size=1, crew_factory=lambda: BudgetPlannerCrew(verbose=False, llm=llm, compact_prompts=True))
+    pool.prewarm()
+    inputs = {"transactions_data": json.dumps(TRANSACTIONS)}
+
+    async def scenario():
+        run = asyncio.create_task(pool.arun(inputs))
+        await asyncio.sleep(0.1)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        # The stage thread is still running, so the crew is not back in the pool yet
+        assert pool.stats()["in_use"] == 1
+        while pool.stats()["in_use"]:
+            await asyncio.sleep(0.02)
+
+    asyncio.run(scenario())
+    # Only the analyst stage reached the LLM
+    assert llm.call_count == 1
+    assert pool.stats()["available"] == 1
+    assert pool.run(inputs)
+
+def _job(status="awaiting_payment"):
+    job_id = str(uuid.uuid4())
+    main.job_store.create(job_id, input_data={"user_id": "user123", "text": "plan my budget"},
+                          identifier_from_purchaser="purchaser-cancel", payment_id=f"pay-{job_id}",
+                          status=status)
+    return job_id
+
+def test_cancel_job_endpoint():
+    """/cancel_job cancels an unfinished job once, then reports a conflict"""
+    client = TestClient(main.app)
+    job_id = _job()
+
+    response = client.post("/cancel_job", json={"job_id": job_id})
+    assert response.status_code == 200
+    assert response.json() == {"status": "success", "job_id": job_id, "previous_status": "awaiting_payment",
+                               "stopped": False}
+    job = main.job_store.get(job_id)
+    assert job["status"] == "cancelled" and job["error"] == "Cancelled by request"
+
+    response = client.post("/cancel_job", json={"job_id": job_id})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Job is already cancelled"
+    assert client.post("/cancel_job", json={"job_id": "missing"}).status_code == 404
+
+def test_cancel_job_stops_a_running_job():
+    """Cancelling a job this worker is running stops it and never submits its result"""
+    completed = []
+
+    class FakePayment:
+        async def complete_payment(self, payment_id, result):
+            completed.append(payment_id)
+
+    async def slow_task(input_data):
+        await asyncio.sleep(30)
+        return "too late"
+
+    original_task, original_payment = main.execute_crew_task, main.payment_for_job
+    main.execute_crew_task = slow_task
+    main.payment_for_job = lambda job: FakePayment()
+    # The claim loop waits on this event, which binds to the loop of the first lifespan
+    main.jobs_available = asyncio.Event()
+    try:
+        with TestClient(main.app) as client:
+            job_id = _job(status="queued")
+            deadline = time.monotonic() + 10
+            while main.job_store.get(job_id)["status"] != "running" and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            response = client.post("/cancel_job", json={"job_id": job_id})
+            assert response.status_code == 200
+            assert response.json()["previous_status"] == "running" and response.json()["stopped"]
+            deadline = time.monotonic() + 5
+            while main.job_queue.job_ids() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert main.job_queue.job_ids() == []
+    finally:
+        main.execute_crew_task, main.payment_for_job = original_task, original_payment
+
+    assert main.job_store.get(job_id)["status"] == "cancelled"
+    assert completed == []
+
+def test_reaper_fails_unpaid_and_overdue_jobs():
+    """The leader's reaper pass fails jobs past the payment window or the execution deadline"""
+    unpaid, overdue, done = _job(), _job(status="running"), _job()
+    assert main.job_store.transition(done, ["awaiting_payment"], "cancelled")
+
+    original = main.JOB_PAYMENT_TIMEOUT_SECONDS, main.JOB_EXECUTION_TIMEOUT_SECONDS, main.leader.is_leader
+    main.JOB_PAYMENT_TIMEOUT_SECONDS, main.JOB_EXECUTION_TIMEOUT_SECONDS = 0, 0
+    main.leader.is_leader = True
+    try:
+        report = asyncio.run(main.reap_once())
+    finally:
+        main.JOB_PAYMENT_TIMEOUT_SECONDS, main.JOB_EXECUTION_TIMEOUT_SECONDS, main.leader.is_leader = original
+
+    assert report["expired"] >= 1 and report["overdue"] >= 1
+    assert main.job_store.get(unpaid)["status"] == "failed"
+    assert main.job_store.get(unpaid)["error"] == "Payment was not received in time"
+    assert main.job_store.get(overdue)["status"] == "failed"
+    assert main.job_store.get(overdue)["error"] == "Job exceeded its execution deadline"
+    assert main.job_store.get(done)["status"] == "cancelled"
+
+def test_reaper_only_runs_on_the_leader():
+    """Workers that are not the leader leave the shared store alone"""
+    unpaid = _job()
+    original = main.JOB_PAYMENT_TIMEOUT_SECONDS, main.leader.is_leader
+    main.JOB_PAYMENT_TIMEOUT_SECONDS, main.leader.is_leader = 0, False
+    try:
+        report = asyncio.run(main.reap_once())
+    finally:
+        main.JOB_PAYMENT_TIMEOUT_SECONDS, main.leader.is_leader = original
+
+    assert report["expired"] == 0
+    assert main.job_store.get(unpaid)["status"] == "awaiting_payment"
+    assert main.job_store.transition(unpaid, ["awaiting_payment"], "cancelled")
+
+if __name__ == "__main__":
+    print("Testing job cancellation...")
+    test_queued_and_running_jobs_can_be_cancelled()
+    test_cancelled_crew_run_stops_before_next_stage()
+    test_cancel_job_endpoint()
+    test_cancel_job_stops_a_running_job()
+    test_reaper_fails_unpaid_and_overdue_jobs()
+    test_reaper_only_runs_on_the_leader()
+    print("All job cancellation tests passed")
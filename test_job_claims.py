@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-worker job claims and leader election
+Each test uses its own temporary database
+"""
+
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.job_store import SQLJobStore
+from app.leader_election import LeaderElection
+
+def _session_factory():
+    path = os.path.join(tempfile.mkdtemp(), "claims_test.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _queued_job(store, purchaser="purchaser-1"):
+    job_id = str(uuid.uuid4())
+    store.create(job_id, input_data={"user_id": "u1", "text": "plan"}, identifier_from_purchaser=purchaser,
+                 payment_id=f"pay-{job_id}", status="queued")
+    # Keep created_at strictly increasing so oldest-first order is well defined
+    time.sleep(0.002)
+    return job_id
+
+def test_concurrent_workers_claim_each_job_once():
+    """Workers racing for the same queued jobs never claim one twice"""
+    store = SQLJobStore(session_factory=_session_factory())
+    job_ids = {_queued_job(store, f"purchaser-{i % 3}") for i in range(30)}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        batches = list(pool.map(lambda worker: store.claim(f"worker-{worker}", 10, 60), range(5)))
+
+    claimed = [job["job_id"] for batch in batches for job in batch]
+    assert sorted(claimed) == sorted(job_ids)
+    assert all(job["owner"] and job["attempts"] == 1 for batch in batches for job in batch)
+    assert store.claim("worker-late", 10, 60) == []
+
+def test_claims_are_fair_across_purchasers():
+    """A purchaser with a backlog does not crowd out a newer purchaser's jobs"""
+    store = SQLJobStore(session_factory=_session_factory())
+    burst = [_queued_job(store, "purchaser-a") for _ in range(10)]
+    other = [_queued_job(store, "purchaser-b") for _ in range(2)]
+
+    claimed = [job["job_id"] for job in store.claim("worker-1", 4, 60)]
+    assert claimed == [burst[0], other[0], burst[1], other[1]]
+
+def test_backlog_beyond_the_candidate_window_does_not_starve_others():
+    """A newer purchaser's job is claimed in the first round even behind a long backlog"""
+    store = SQLJobStore(session_factory=_session_factory())
+    backlog = [_queued_job(store, "purchaser-a") for _ in range(50)]
+    newcomer = _queued_job(store, "purchaser-b")
+
+    assert store.queue_position(backlog[0]) == 1
+    assert store.queue_position(newcomer) == 2
+    assert store.queue_position(backlog[1]) == 3
+    assert store.queue_position(backlog[-1]) == 51
+
+    claimed = [job["job_id"] for _ in range(3) for job in store.claim("worker-1", 1, 60)]
+    assert claimed == [backlog[0], newcomer, backlog[1]]
+    # Claimed jobs leave the shared queue
+    assert store.queue_position(newcomer) is None
+    assert store.queue_position(backlog[-1]) == 48
+
+def test_expired_claims_are_requeued_then_failed():
+    """A lapsed claim goes back to the pool, and a job abandoned too often is failed"""
+    store = SQLJobStore(session_factory=_session_factory())
+    job_id = _queued_job(store)
+
+    for attempt in range(1, 3):
+        [job] = store.claim(f"worker-{attempt}", 1, 0)
+        assert job["attempts"] == attempt
+        # A stale worker can no longer start a job it lost
+        time.sleep(0.01)
+        assert store.release_expired_claims(max_attempts=3) == ([job_id], [])
+        assert not store.transition(job_id, ["queued"], "running", expected_owner=f"worker-{attempt}")
+
+    [job] = store.claim("worker-3", 1, 60)
+    assert store.renew_claims("worker-3", 0) == 1
+    assert store.transition(job_id, ["queued"], "running", expected_owner="worker-3")
+    time.sleep(0.01)
+    assert store.release_expired_claims(max_attempts=3) == ([], [job_id])
+    assert store.get(job_id)["status"] == "failed"
+
+def test_single_leader_and_takeover():
+    """Only one worker holds the lease; another takes over once it is released or lapses"""
+    session_factory = _session_factory()
+    first = LeaderElection("payment_monitor", "worker-1", lease_seconds=30, session_factory=session_factory)
+    second = LeaderElection("payment_monitor", "worker-2", lease_seconds=0.05, session_factory=session_factory)
+
+    assert first.try_acquire()
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+
+    # worker-2 stops renewing, so its short lease lapses
+    time.sleep(0.1)
+    assert first.try_acquire()
+    assert not second.try_acquire()
+
+if __name__ == "__main__":
+    print("Testing job claims and leader election...")
+    test_concurrent_workers_claim_each_job_once()
+    test_claims_are_fair_across_purchasers()
+    test_backlog_beyond_the_candidate_window_does_not_starve_others()
+    test_expired_claims_are_requeued_then_failed()
+    test_single_leader_and_takeover()
+    print("All job claim tests passed")
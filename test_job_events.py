@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Test script for the job status event bus and the /status/stream and /status/ws endpoints
+Uses a temporary database and a fake Masumi payment
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("BUDGET_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'budget_test.db')}")
+os.environ.setdefault("RESULT_STORE_DIR", os.path.join(_tmp_dir, "results"))
+os.environ.setdefault("CREW_CACHE_PATH", os.path.join(_tmp_dir, "crew_cache.db"))
+# Masumi needs a config to import; the payment service itself is never reached
+os.environ.setdefault("PAYMENT_SERVICE_URL", "http://localhost:9/api/v1")
+os.environ.setdefault("PAYMENT_API_KEY", "test-key")
+os.environ.setdefault("AGENT_IDENTIFIER", "test-agent")
+os.environ.setdefault("NETWORK", "Preprod")
+
+from fastapi.testclient import TestClient
+import main
+from app.job_events import JobEventBus
+
+def test_updates_fan_out_to_the_job_subscribers_only():
+    """Publishing reaches every subscriber of one job and nobody else"""
+    bus = JobEventBus()
+
+    async def scenario():
+        with bus.subscribe("job-1") as first, bus.subscribe("job-1") as second, bus.subscribe("job-2") as other:
+            assert bus.publish("job-1", {"status": "running"}) == 2
+            assert first.get_nowait() == second.get_nowait() == {"status": "running"}
+            assert other.empty()
+        assert bus.subscriber_count() == 0
+        assert bus.publish("job-1", {"status": "completed"}) == 0
+
+    asyncio.run(scenario())
+    assert bus.stats()["jobs_watched"] == 0
+
+def test_slow_subscribers_keep_the_latest_updates():
+    """A full subscriber queue drops its oldest update instead of blocking the publisher"""
+    bus = JobEventBus(queue_size=2)
+
+    async def scenario():
+        with bus.subscribe("job-1") as updates:
+            for status in ("queued", "running", "completed"):
+                bus.publish("job-1", {"status": status})
+            return [updates.get_nowait()["status"] for _ in range(updates.qsize())]
+
+    assert asyncio.run(scenario()) == ["running", "completed"]
+    assert bus.stats()["dropped"] == 1
+
+def test_thousands_of_idle_subscribers():
+    """Idle subscribers are cheap and a publish only wakes the job's own subscribers"""
+    bus = JobEventBus()
+
+    async def waiter(job_id, started):
+        with bus.subscribe(job_id) as updates:
+            started.release()
+            return await updates.get()
+
+    async def scenario():
+        started = asyncio.Semaphore(0)
+        tasks = [asyncio.create_task(waiter(f"job-{i % 1000}", started)) for i in range(5000)]
+        for _ in tasks:
+            await started.acquire()
+        assert bus.subscriber_count() == 5000
+        assert bus.publish("job-7", {"status": "completed"}) == 5
+        done, pending = await asyncio.wait(tasks, timeout=0.2)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(done)
+
+    assert asyncio.run(scenario()) == 5
+    assert bus.subscriber_count() == 0
+
+class FakePayment:
+    """Stands in for Masumi when a finished job submits its result"""
+
+    def __init__(self, completed):
+        self.completed = completed
+
+    async def complete_payment(self, payment_id, result):
+        self.completed.append(payment_id)
+
+@contextmanager
+def _api():
+    """TestClient running the app lifespan, so queued jobs are claimed and run"""
+    completed = []
+    original = main.payment_for_job
+    main.payment_for_job = lambda job: FakePayment(completed)
+    # The claim loop waits on this event, which binds to the loop of the first lifespan
+    main.jobs_available = asyncio.Event()
+    try:
+        with TestClient(main.app) as client:
+            yield client, completed
+    finally:
+        main.payment_for_job = original
+
+def _queued_job():
+    job_id = str(uuid.uuid4())
+    main.job_store.create(job_id, input_data={"user_id": "user123", "text": "plan my budget"},
+                          identifier_from_purchaser="purchaser-stream", payment_id=f"pay-{job_id}",
+                          status="queued")
+    return job_id
+
+def test_status_stream_sends_transitions_until_the_job_finishes():
+    """/status/stream sends the current status, each transition and ends with the terminal event"""
+    with _api() as (client, completed):
+        job_id = _queued_job()
+        with client.stream("GET", "/status/stream", params={"job_id": job_id}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = [json.loads(line[len("data: "):]) for line in response.iter_lines() if line.startswith("data: ")]
+        assert client.get("/status/stream", params={"job_id": "missing"}).status_code == 404
+
+    statuses = [event["status"] for event in events]
+    assert statuses[0] == "queued" and "running" in statuses
+    assert statuses[-1] == "completed" and statuses.count("completed") == 1
+    assert events[-1]["result"] and events[-1]["payment_status"] == "completed"
+    assert completed == [f"pay-{job_id}"]
+
+def test_status_websocket_sends_transitions_and_closes():
+    """/status/ws sends the same updates as JSON messages and closes after the terminal one"""
+    with _api() as (client, completed):
+        job_id = _queued_job()
+        with client.websocket_connect(f"/status/ws?job_id={job_id}") as websocket:
+            updates = [websocket.receive_json()]
+            while updates[-1]["status"] not in ("completed", "failed", "cancelled"):
+                updates.append(websocket.receive_json())
+            assert websocket.receive()["type"] == "websocket.close"
+
+        with client.websocket_connect("/status/ws?job_id=missing") as websocket:
+            assert websocket.receive_json() == {"error": "Job not found"}
+            assert websocket.receive()["code"] == 1008
+
+    assert updates[0]["status"] == "queued" and updates[-1]["status"] == "completed"
+    assert "running" in [update["status"] for update in updates]
+    assert main.job_events.subscriber_count() == 0
+
+class WatchedStore:
+    """Wraps the job store, counting reads and reporting the job gone after `gone_after` reads"""
+
+    def __init__(self, store, gone_after=None):
+        self.store = store
+        self.gone_after = gone_after
+        self.gets = 0
+
+    def get(self, job_id):
+        self.gets += 1
+        if self.gone_after is not None and self.gets > self.gone_after:
+            return None
+        return self.store.get(job_id)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+@contextmanager
+def _watched_store(keepalive, resync, gone_after=None):
+    settings = {"STATUS_STREAM_KEEPALIVE_SECONDS": str(keepalive), "STATUS_STREAM_RESYNC_SECONDS": str(resync)}
+    original_env = {name: os.environ.get(name) for name in settings}
+    original_store = main.job_store
+    os.environ.update(settings)
+    main.job_store = WatchedStore(original_store, gone_after)
+    try:
+        yield main.job_store
+    finally:
+        main.job_store = original_store
+        for name, value in original_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def _collect(job_id, limit):
+    async def scenario():
+        updates = []
+        async for update in main.job_updates(job_id):
+            updates.append(update)
+            if len(updates) == limit:
+                break
+        return updates
+    return asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+def test_keepalives_come_from_the_last_snapshot():
+    """Idle keepalive ticks do not re-read the job store"""
+    job_id = _queued_job()
+    with _watched_store(keepalive=0.02, resync=60) as store:
+        updates = _collect(job_id, limit=6)
+    assert updates[0]["status"] == "queued"
+    assert updates[1:] == [None] * 5
+    assert store.gets == 1
+
+def test_stream_ends_when_the_job_is_purged():
+    """A job that disappears mid-stream gets a final not_found update instead of crashing the handler"""
+    job_id = _queued_job()
+    with _watched_store(keepalive=0.02, resync=0.05, gone_after=1):
+        updates = _collect(job_id, limit=100)
+    assert updates[0]["status"] == "queued"
+    assert updates[-1] == {"job_id": job_id, "status": "not_found", "error": "Job not found"}
+    assert set(updates[1:-1]) <= {None}
+
+    client = TestClient(main.app)
+    # The endpoint's own existence check and the first snapshot see the job, the resync does not
+    with _watched_store(keepalive=0.02, resync=0.05, gone_after=2):
+        with client.stream("GET", "/status/stream", params={"job_id": job_id}) as response:
+            events = [json.loads(line[len("data: "):]) for line in response.iter_lines() if line.startswith("data: ")]
+    assert [event["status"] for event in events] == ["queued", "not_found"]
+
+    with _watched_store(keepalive=0.02, resync=0.05, gone_after=2):
+        with client.websocket_connect(f"/status/ws?job_id={job_id}") as websocket:
+            assert websocket.receive_json()["status"] == "queued"
+            assert websocket.receive_json()["status"] == "not_found"
+            assert websocket.receive()["code"] == 1008
+    assert main.job_events.subscriber_count() == 0
+
+if __name__ == "__main__":
+    print("Testing job event bus...")
+    test_updates_fan_out_to_the_job_subscribers_only()
+    test_slow_subscribers_keep_the_latest_updates()
+    test_thousands_of_idle_subscribers()
+    test_status_stream_sends_transitions_until_the_job_finishes()
+    test_status_websocket_sends_transitions_and_closes()
+    test_keepalives_come_from_the_last_snapshot()
+    test_stream_ends_when_the_job_is_purged()
+    print("All job event bus tests passed")
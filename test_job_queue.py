@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the paid job queue
+Uses a fake job handler instead of the crew
+"""
+
+import asyncio
+from app.job_queue import JobQueue
+
+def test_purchasers_are_served_round_robin():
+    """A burst from one purchaser does not delay another purchaser's jobs"""
+    order = []
+
+    async def handler(job_id):
+        order.append(job_id)
+
+    queue = JobQueue(handler=handler, workers=1, max_queued=100)
+    for i in range(10):
+        queue.submit(f"a{i}", "purchaser-a")
+    queue.submit("b0", "purchaser-b")
+    queue.submit("b1", "purchaser-b")
+
+    assert queue.position("a0") == 1
+    assert queue.position("b0") == 2
+    assert queue.position("b1") == 4
+    assert queue.position("a9") == 12
+    assert queue.position("missing") is None
+    assert not queue.submit("a0", "purchaser-a")
+
+    async def scenario():
+        await queue.start()
+        while queue.stats()["completed"] < 12:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert order[:4] == ["a0", "b0", "a1", "b1"]
+    assert order[4:] == [f"a{i}" for i in range(2, 10)]
+
+def test_workers_bound_concurrency_and_capacity_sheds():
+    """No more than `workers` jobs run at once and a full queue reports overload"""
+    running, peak = 0, 0
+
+    async def handler(job_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if job_id == "p0-0":
+            raise RuntimeError("boom")
+
+    queue = JobQueue(handler=handler, workers=3, max_queued=20)
+
+    async def scenario():
+        await queue.start()
+        for i in range(20):
+            queue.submit(f"p{i % 4}-{i}", f"purchaser-{i % 4}")
+        assert queue.overloaded()
+        # The API sheds on the backlog shared by all workers
+        assert not queue.overloaded(backlog=19) and queue.overloaded(backlog=20)
+        while queue.stats()["completed"] + queue.stats()["failed"] < 20:
+            await asyncio.sleep(0.01)
+        assert not queue.overloaded()
+        await queue.stop()
+
+    asyncio.run(scenario())
+    stats = queue.stats()
+    assert peak == 3
+    assert stats["completed"] == 19 and stats["failed"] == 1
+    assert stats["queued"] == 0 and stats["running"] == 0
+
+if __name__ == "__main__":
+    print("Testing job queue...")
+    test_purchasers_are_served_round_robin()
+    test_workers_bound_concurrency_and_capacity_sheds()
+    print("All job queue tests passed")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQL-backed MIP-003 job store
+Uses a temporary database
+"""
+
+import os
+import tempfile
+import uuid
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.job_store import JobStore, SQLJobStore
+
+# Bound to a temporary engine: app.models may already be imported with the real database URL
+_engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'budget_test.db')}",
+                        connect_args={"timeout": 30})
+Base.metadata.create_all(bind=_engine)
+_session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+
+def _new_job(store):
+    job_id = str(uuid.uuid4())
+    store.create(job_id, input_data={"user_id": "u1", "text": "plan"},
+                 identifier_from_purchaser="purchaser-1", payment_id=f"pay-{job_id}")
+    return job_id
+
+def test_create_and_get():
+    """Jobs round-trip through the store with their input data"""
+    store = SQLJobStore(session_factory=_session_factory)
+    job_id = _new_job(store)
+    job = store.get(job_id)
+    assert job["status"] == "awaiting_payment"
+    assert job["payment_status"] == "pending"
+    assert job["input_data"] == {"user_id": "u1", "text": "plan"}
+    assert store.get("missing") is None
+
+def test_only_one_worker_wins_a_transition():
+    """Concurrent attempts to start the same job succeed exactly once"""
+    store = SQLJobStore(session_factory=_session_factory)
+    job_id = _new_job(store)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        wins = list(pool.map(lambda _: store.transition(job_id, ["awaiting_payment"], "running"), range(8)))
+    assert wins.count(True) == 1
+
+    assert store.transition(job_id, ["running"], "completed", result="done", payment_status="completed")
+    job = store.get(job_id)
+    assert job["status"] == "completed" and job["result"] == "done"
+    assert job["finished_at"] is not None
+    # Finished jobs cannot be moved again
+    assert not store.transition(job_id, ["awaiting_payment", "running"], "failed", error="late")
+
+def test_purge_removes_only_expired_finished_jobs():
+    """TTL purge drops old finished jobs and keeps active ones"""
+    store = SQLJobStore(session_factory=_session_factory)
+    finished = _new_job(store)
+    store.transition(finished, ["awaiting_payment"], "failed", error="boom")
+    active = _new_job(store)
+
+    assert store.purge_finished(ttl_seconds=3600) == 0
+    assert store.purge_finished(ttl_seconds=0) >= 1
+    assert store.get(finished) is None
+    assert store.get(active)["status"] == "awaiting_payment"
+    assert store.count_by_status().get("awaiting_payment", 0) >= 1
+
+def test_expire_moves_only_idle_jobs():
+    """Jobs idle past the cutoff expire once and fresher or finished jobs are untouched"""
+    store = SQLJobStore(session_factory=_session_factory)
+    idle = _new_job(store)
+    assert idle not in store.expire(["awaiting_payment"], 3600, "failed", error="late")
+    assert idle in store.expire(["awaiting_payment"], 0, "failed", error="late")
+    assert store.get(idle)["status"] == "failed" and store.get(idle)["error"] == "late"
+    assert idle not in store.expire(["awaiting_payment"], 0, "failed")
+
+    cancelled = _new_job(store)
+    assert store.transition(cancelled, ["awaiting_payment"], "cancelled")
+    assert store.get(cancelled)["finished_at"] is not None
+
+def test_incomplete_store_cannot_be_created():
+    """A JobStore missing part of the interface fails when built, not on first use"""
+    class PartialStore(JobStore):
+        def get(self, job_id):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialStore()
+
+if __name__ == "__main__":
+    print("Testing job store...")
+    test_create_and_get()
+    test_only_one_worker_wins_a_transition()
+    test_purge_removes_only_expired_finished_jobs()
+    test_expire_moves_only_idle_jobs()
+    test_incomplete_store_cannot_be_created()
+    print("All job store tests passed")
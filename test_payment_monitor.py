@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test script for the central payment status monitor
+Uses a fake payment service instead of Masumi
+"""
+
+import asyncio
+from app.payment_monitor import PaymentMonitor
+
+class FakePaymentService:
+    def __init__(self, locked=()):
+        self.locked = set(locked)
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def check(self, payment_id):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        state = "FundsLocked" if payment_id in self.locked else None
+        return {"status": "success", "data": {"onChainState": state}}
+
+def _monitor(service, pending, dispatched, statuses, **settings):
+    async def on_funds_locked(job_id, payment_id):
+        dispatched.append(job_id)
+        pending.remove((job_id, payment_id))
+
+    return PaymentMonitor(
+        check_status=service.check,
+        load_pending=lambda: list(pending),
+        on_funds_locked=on_funds_locked,
+        on_status=lambda job_id, state: statuses.append((job_id, state)),
+        **settings
+    )
+
+def test_calls_per_tick_are_capped_by_batch_size():
+    """Each tick makes at most batch_size checks, round-robin over all pending payments"""
+    pending = [(f"job-{i}", f"pay-{i}") for i in range(200)]
+    service = FakePaymentService()
+    monitor = _monitor(service, pending, [], [], interval=1, batch_size=20, max_concurrency=5)
+
+    async def scenario():
+        for _ in range(10):
+            await monitor.tick()
+
+    asyncio.run(scenario())
+    assert service.calls == 200
+    assert service.peak_in_flight <= 5
+    assert monitor.metrics()["pending"] == 200
+
+def test_funds_locked_payments_are_dispatched_once():
+    """Locked payments dispatch their job once and report their state"""
+    pending = [(f"job-{i}", f"pay-{i}") for i in range(10)]
+    service = FakePaymentService(locked={"pay-3", "pay-7"})
+    dispatched, statuses = [], []
+    monitor = _monitor(service, pending, dispatched, statuses, interval=1, batch_size=50, max_concurrency=4)
+
+    async def scenario():
+        await monitor.tick()
+        # Let the dispatched handlers run
+        await asyncio.sleep(0.01)
+        await monitor.tick()
+
+    asyncio.run(scenario())
+    assert sorted(dispatched) == ["job-3", "job-7"]
+    assert ("job-3", "FundsLocked") in statuses
+    assert monitor.metrics()["dispatches"] == 2
+    assert len(pending) == 8
+
+def test_failed_dispatch_is_retried_on_the_next_tick():
+    """A handler that raises leaves the payment to be dispatched again"""
+    pending = [("job-1", "pay-1")]
+    service = FakePaymentService(locked={"pay-1"})
+    attempts = []
+
+    async def on_funds_locked(job_id, payment_id):
+        attempts.append(job_id)
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        pending.remove((job_id, payment_id))
+
+    monitor = PaymentMonitor(check_status=service.check, load_pending=lambda: list(pending),
+                             on_funds_locked=on_funds_locked, interval=1, batch_size=50, max_concurrency=4)
+
+    async def scenario():
+        for _ in range(3):
+            await monitor.tick()
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert attempts == ["job-1", "job-1"]
+    assert pending == []
+    assert monitor.metrics()["dispatch_errors"] == 1
+
+def test_status_lookups_cost_one_call_per_ttl():
+    """Concurrent and repeated /status lookups share one upstream call per TTL"""
+    pending = [("job-1", "pay-1"), ("job-2", "pay-2")]
+    service = FakePaymentService(locked={"pay-2"})
+    dispatched = []
+    monitor = _monitor(service, pending, dispatched, [], interval=1, batch_size=1, max_concurrency=4,
+                       status_ttl=60)
+
+    async def scenario():
+        states = await asyncio.gather(*(monitor.current_status("job-1", "pay-1") for _ in range(100)))
+        for _ in range(50):
+            await monitor.current_status("job-1", "pay-1")
+        assert service.calls == 1
+        # The poller's results are served without another call
+        await monitor.tick()
+        calls = service.calls
+        assert await monitor.current_status("job-1", "pay-1") is None
+        assert service.calls == calls
+        # A lookup that finds the funds locked dispatches the job like the poller would
+        assert await monitor.current_status("job-2", "pay-2") == "FundsLocked"
+        await asyncio.sleep(0.01)
+        return states
+
+    states = asyncio.run(scenario())
+    assert states == [None] * 100
+    assert dispatched == ["job-2"]
+    assert monitor.metrics()["status_lookups_shared"] == 99
+
+def test_failed_lookups_are_cached_for_the_error_ttl():
+    """During an outage /status lookups serve the last known state and reach upstream once per error TTL"""
+    service = FakePaymentService(locked={"pay-1"})
+    monitor = _monitor(service, [("job-1", "pay-1")], [], [], interval=1, batch_size=1, max_concurrency=4,
+                       status_ttl=0.01, error_ttl=0.05)
+
+    async def failing(payment_id):
+        service.calls += 1
+        raise ConnectionError("payment service unavailable")
+
+    async def scenario():
+        assert await monitor.current_status("job-1", "pay-1") == "FundsLocked"
+        await asyncio.sleep(0.02)
+        monitor._check_status = failing
+        calls = service.calls
+        states = await asyncio.gather(*(monitor.current_status("job-1", "pay-1") for _ in range(50)))
+        for _ in range(50):
+            states.append(await monitor.current_status("job-1", "pay-1"))
+        assert service.calls == calls + 1
+        await asyncio.sleep(0.06)
+        await monitor.current_status("job-1", "pay-1")
+        assert service.calls == calls + 2
+        return states
+
+    states = asyncio.run(scenario())
+    assert states == ["FundsLocked"] * 100
+    assert monitor.metrics()["check_errors"] == 2
+
+def test_lookups_are_pruned_on_workers_that_do_not_poll():
+    """A worker that only serves /status does not keep every payment it was asked about"""
+    service = FakePaymentService(locked={"pay-0"})
+    dispatched = []
+    monitor = _monitor(service, [("job-0", "pay-0")], dispatched, [], interval=1, batch_size=1,
+                       max_concurrency=4, status_ttl=0.01)
+
+    async def scenario():
+        await asyncio.gather(*(monitor.current_status(f"job-{i}", f"pay-{i}") for i in range(100)))
+        await asyncio.sleep(0.01)
+        assert monitor.metrics()["status_cache_size"] == 100
+        await asyncio.sleep(0.1)
+        await monitor.current_status("job-new", "pay-new")
+
+    asyncio.run(scenario())
+    assert dispatched == ["job-0"]
+    assert monitor.metrics()["status_cache_size"] == 1
+    assert monitor._dispatched == set()
+
+if __name__ == "__main__":
+    print("Testing payment monitor...")
+    test_calls_per_tick_are_capped_by_batch_size()
+    test_funds_locked_payments_are_dispatched_once()
+    test_failed_dispatch_is_retried_on_the_next_tick()
+    test_status_lookups_cost_one_call_per_ttl()
+    test_failed_lookups_are_cached_for_the_error_ttl()
+    test_lookups_are_pruned_on_workers_that_do_not_poll()
+    print("All payment monitor tests passed")
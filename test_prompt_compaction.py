@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for aggregate-only prompt compaction
+Checks that the summary passed to the agents stays bounded
+"""
+
+import json
+import os
+import random
+
+# Keep crewai fully offline
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+
+from app.crew import (
+    BudgetPlannerCrew, FinancialAnalysisTool, TransactionCategorizerTool,
+    categorize_transactions, summarize_transactions
+)
+from app.stub_llm import StubLLM
+
+DESCRIPTIONS = [
+    ("SALARY CREDIT", "credit", 50000), ("RENT PAYMENT", "debit", 15000),
+    ("ZOMATO ONLINE ORDER", "debit", 450), ("UBER RIDE", "debit", 300),
+    ("NETFLIX SUBSCRIPTION", "debit", 199), ("ELECTRICITY BILL", "debit", 2000),
+    ("GROCERY STORE", "debit", 1800), ("AMAZON SHOPPING", "debit", 2500),
+    ("MOVIE TICKETS", "debit", 600), ("PETROL PUMP", "debit", 1200)
+]
+
+def _transactions(count, seed=7):
+    rng = random.Random(seed)
+    transactions = []
+    for i in range(count):
+        desc, tx_type, amount = rng.choice(DESCRIPTIONS)
+        transactions.append({
+            "date": f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+            "amount": amount if tx_type == "credit" else -amount,
+            "description": f"{desc} {i % 40}",
+            "type": tx_type
+        })
+    return {"transactions": transactions}
+
+def test_summary_size_is_bounded():
+    """Summary size barely moves between 10 and 100k transactions"""
+    small = json.dumps(summarize_transactions(categorize_transactions(_transactions(10)["transactions"])))
+    large = json.dumps(summarize_transactions(categorize_transactions(_transactions(100_000)["transactions"])))
+    print(f"Summary size: {len(small)} bytes for 10 rows, {len(large)} bytes for 100k rows")
+    assert len(large) < 3 * len(small)
+    assert len(large) < 8000
+
+def test_summary_numbers_match_analysis_tool():
+    """Deterministic totals are identical to the financial_analyzer output"""
+    data = _transactions(500)
+    analysis = json.loads(FinancialAnalysisTool()._run(TransactionCategorizerTool()._run(json.dumps(data))))
+    summary = summarize_transactions(categorize_transactions(data["transactions"]))
+
+    assert summary["total_income"] == analysis["total_income"]
+    assert summary["total_expenses"] == analysis["total_expenses"]
+    assert summary["savings_rate"] == analysis["savings_rate"]
+    assert summary["expense_breakdown"] == {k: float(v) for k, v in analysis["expense_breakdown"].items()}
+
+def test_presummary_hands_over_a_handle_instead_of_rows():
+    """The prompt carries an artifact handle, and the analyzer reads the same numbers from it as from CSV"""
+    data = _transactions(2000)
+    crew = BudgetPlannerCrew(verbose=False, llm=StubLLM(), compact_prompts=True)
+
+    _, output = crew._presummarize({"transactions_data": json.dumps(data)})
+    handle = json.loads(output)["artifact"]
+    assert handle.startswith("artifact://categorized/")
+    assert len(crew.artifacts.get(handle)) == 2000
+    # Aggregates only: no per-transaction records and a fraction of the raw size
+    assert '"type"' not in output and '"date": ' not in output
+    assert len(output) < len(json.dumps(data)) / 20
+
+    from_handle = json.loads(FinancialAnalysisTool(artifact_store=crew.artifacts)._run(
+        f"Analyze the categorized data at {handle}"))
+    from_csv = json.loads(FinancialAnalysisTool()._run(TransactionCategorizerTool()._run(json.dumps(data))))
+    for key in ("total_income", "total_expenses", "savings_rate", "expense_breakdown",
+                "expense_percentages", "top_expenses"):
+        assert from_handle[key] == from_csv[key], key
+
+    # The categorizer tool hands over a handle the same way when given the shared store
+    tool_summary = json.loads(TransactionCategorizerTool(artifact_store=crew.artifacts)._run(json.dumps(data)))
+    assert tool_summary["artifact"] != handle
+    assert json.loads(FinancialAnalysisTool(artifact_store=crew.artifacts)._run(tool_summary["artifact"])) == from_handle
+
+def test_unknown_handle_is_a_clear_error():
+    """A handle the store does not know is reported as such instead of being parsed as CSV"""
+    crew = BudgetPlannerCrew(verbose=False, llm=StubLLM(), compact_prompts=True)
+    result = FinancialAnalysisTool(artifact_store=crew.artifacts)._run("artifact://categorized/0123456789ab")
+    assert result.startswith("Error: Unknown artifact artifact://categorized/0123456789ab")
+
+def test_compact_run_skips_categorizer_llm_call():
+    """Only the analyst, strategist and reporter reach the LLM"""
+    llm = StubLLM()
+    crew = BudgetPlannerCrew(verbose=False, llm=llm, compact_prompts=True)
+    crew.run({"transactions_data": json.dumps(_transactions(1000))})
+    assert llm.call_count == 3
+
+if __name__ == "__main__":
+    print("Testing prompt compaction...")
+    test_summary_size_is_bounded()
+    test_summary_numbers_match_analysis_tool()
+    test_presummary_hands_over_a_handle_instead_of_rows()
+    test_unknown_handle_is_a_clear_error()
+    test_compact_run_skips_categorizer_llm_call()
+    print("All prompt compaction tests passed")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for the compressed, content-addressed result store and /results/{digest}
+Uses a temporary directory and database
+"""
+
+import gzip
+import os
+import tempfile
+import pytest
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("BUDGET_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'budget_test.db')}")
+os.environ.setdefault("RESULT_STORE_DIR", os.path.join(_tmp_dir, "results"))
+os.environ.setdefault("CREW_CACHE_PATH", os.path.join(_tmp_dir, "crew_cache.db"))
+# Masumi needs a config to import; the payment service itself is never reached
+os.environ.setdefault("PAYMENT_SERVICE_URL", "http://localhost:9/api/v1")
+os.environ.setdefault("PAYMENT_API_KEY", "test-key")
+os.environ.setdefault("AGENT_IDENTIFIER", "test-agent")
+os.environ.setdefault("NETWORK", "Preprod")
+
+from fastapi.testclient import TestClient
+import main
+from app.result_store import ResultStore, zstd_available
+
+REPORT = "# Budget Report\n\n" + "".join(f"| Category {i} | ₹{i * 125:,} |\n" for i in range(400))
+
+def test_results_are_compressed_and_deduplicated():
+    """Identical reports share one compressed blob addressed by their digest"""
+    store = ResultStore(root=tempfile.mkdtemp(), encoding="gzip")
+    first = store.put(REPORT)
+    second = store.put(REPORT)
+
+    assert first == second
+    assert first["size"] == len(REPORT.encode("utf-8"))
+    assert store.stats()["writes"] == 1 and store.stats()["deduplicated"] == 1
+    path, encoding = store.locate(first["digest"])
+    assert encoding == "gzip" and path.endswith(".gz")
+    assert os.path.getsize(path) < first["size"] / 4
+    assert store.read_text(first["digest"]) == REPORT
+
+    blob, encoding = store.read_encoded(first["digest"])
+    assert gzip.decompress(blob).decode("utf-8") == REPORT
+
+def test_unknown_or_malformed_digests_are_not_found():
+    """Lookups only ever resolve well-formed digests inside the store"""
+    store = ResultStore(root=tempfile.mkdtemp(), encoding="gzip")
+    assert store.read("0" * 64) is None
+    assert store.locate("../../etc/passwd") is None
+    with pytest.raises(ValueError):
+        ResultStore(root=tempfile.mkdtemp(), encoding="brotli")
+
+@pytest.mark.skipif(not zstd_available(), reason="zstandard is not installed")
+def test_zstd_blobs_stay_readable_alongside_gzip():
+    """A store switched to zstd still reads earlier gzip blobs"""
+    root = tempfile.mkdtemp()
+    old = ResultStore(root=root, encoding="gzip").put("old report")
+    store = ResultStore(root=root, encoding="zstd")
+    new = store.put(REPORT)
+    assert new["encoding"] == "zstd"
+    assert store.read_text(old["digest"]) == "old report"
+    assert store.read_text(new["digest"]) == REPORT
+
+def _served_report():
+    """A client for the app with REPORT stored gzip-compressed, and its digest"""
+    main.result_store = ResultStore(root=tempfile.mkdtemp(), encoding="gzip")
+    return TestClient(main.app), main.result_store.put(REPORT)["digest"]
+
+def test_parse_range():
+    """Single byte ranges are parsed, unsupported ones ignored and unsatisfiable ones rejected"""
+    assert main.parse_range("bytes=0-9", 100) == (0, 9)
+    assert main.parse_range("bytes=90-", 100) == (90, 99)
+    assert main.parse_range("bytes=-10", 100) == (90, 99)
+    assert main.parse_range("bytes=50-500", 100) == (50, 99)
+    assert main.parse_range("bytes=100-", 100) == "invalid"
+    assert main.parse_range("bytes=9-0", 100) == "invalid"
+    assert main.parse_range("bytes=0-1,5-6", 100) is None
+    assert main.parse_range("items=0-9", 100) is None
+    assert main.parse_range("bytes=a-b", 100) is None
+
+def test_results_endpoint_serves_ranges():
+    """A Range request gets 206 with the slice of the plain text, a bad one 416"""
+    client, digest = _served_report()
+    body = REPORT.encode("utf-8")
+
+    response = client.get(f"/results/{digest}", headers={"Range": "bytes=0-99", "Accept-Encoding": "gzip"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-99/{len(body)}"
+    assert "content-encoding" not in response.headers
+    assert response.content == body[:100]
+
+    response = client.get(f"/results/{digest}", headers={"Range": "bytes=-50", "Accept-Encoding": "identity"})
+    assert response.status_code == 206 and response.content == body[-50:]
+
+    response = client.get(f"/results/{digest}", headers={"Range": f"bytes={len(body)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(body)}"
+
+def test_results_endpoint_passes_gzip_through():
+    """Clients accepting gzip get the stored blob as is; others get plain text; both revalidate"""
+    client, digest = _served_report()
+    blob, _ = main.result_store.read_encoded(digest)
+
+    with client.stream("GET", f"/results/{digest}", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == f'"{digest}-gzip"'
+    assert "immutable" in response.headers["cache-control"]
+    assert raw == blob
+
+    response = client.get(f"/results/{digest}", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == REPORT
+    assert response.headers["etag"] == f'"{digest}"'
+
+    response = client.get(f"/results/{digest}", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{digest}-gzip"'})
+    assert response.status_code == 304
+    assert client.get(f"/results/{'0' * 64}").status_code == 404
+
+if __name__ == "__main__":
+    print("Testing result store...")
+    test_results_are_compressed_and_deduplicated()
+    test_unknown_or_malformed_digests_are_not_found()
+    if zstd_available():
+        test_zstd_blobs_stay_readable_alongside_gzip()
+    test_parse_range()
+    test_results_endpoint_serves_ranges()
+    test_results_endpoint_passes_gzip_through()
+    print("All result store tests passed")
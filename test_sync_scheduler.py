@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test script for the background bank sync scheduler
+Uses a throwaway SQLite database and a fake sync service
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("FIU_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'fiu_test.db')}")
+
+from datetime import datetime, timedelta
+from app.fiu_models import create_tables, SessionLocal, User, BankAccount, Transaction
+from app.sync_scheduler import SyncScheduler
+
+create_tables()
+
+class FakeSyncService:
+    """Records scheduled syncs; each takes `seconds` in its worker thread"""
+
+    def __init__(self, seconds=0.0, write_ms=1.0):
+        self.seconds = seconds
+        self.write_ms = write_ms
+        self.synced = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def full_account_sync(self, account_id, mode="incremental"):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.in_flight -= 1
+            self.synced.append(account_id)
+        db = SessionLocal()
+        try:
+            if db.get(BankAccount, account_id) is None:
+                return {"error": "Account not found"}
+        finally:
+            db.close()
+        return {"success": True, "timings": {"insert_ms": self.write_ms / 2, "commit_ms": self.write_ms / 2}}
+
+def _create_account(active, last_sync=None):
+    """An account whose user has recently made a transaction in the app when `active`"""
+    db = SessionLocal()
+    try:
+        number = f"9{random.randrange(10 ** 12):012d}"
+        user = User(name="Scheduler Test", email=f"{number}@example.com", phone=number)
+        db.add(user)
+        db.flush()
+        account = BankAccount(user_id=user.id, account_number=number, account_holder_name="Scheduler Test",
+                              bank_name="HDFC Bank", account_type="savings", ifsc_code="HDFC0001234",
+                              last_sync=last_sync)
+        db.add(account)
+        if active:
+            db.add(Transaction(user_id=user.id, from_account=number, amount=-100.0, transaction_type="debit",
+                               description="RECENT SPEND", created_at=datetime.utcnow()))
+        db.commit()
+        return account.id
+    finally:
+        db.close()
+
+def _delete_account(account_id):
+    db = SessionLocal()
+    try:
+        db.delete(db.get(BankAccount, account_id))
+        db.commit()
+    finally:
+        db.close()
+
+def _due(scheduler, account_id):
+    return next(due for due, queued_id in scheduler._queue if queued_id == account_id)
+
+def _scheduler(service, **settings):
+    scheduler = SyncScheduler(service, max_concurrency=settings.pop("max_concurrency", None))
+    scheduler.active_interval = 900
+    scheduler.idle_interval = 21600
+    scheduler.jitter_ratio = 0.1
+    for name, value in settings.items():
+        setattr(scheduler, name, value)
+    return scheduler
+
+def test_active_users_get_the_shorter_interval():
+    """Recently active users sync on the active interval, others on the idle one, with due times jittered"""
+    active = _create_account(active=True)
+    idle = _create_account(active=False)
+    recent = _create_account(active=False, last_sync=datetime.utcnow() - timedelta(hours=1))
+    scheduler = _scheduler(FakeSyncService())
+
+    now = time.time()
+    scheduler.refresh_accounts()
+    assert scheduler._intervals[active] == 900
+    assert scheduler._intervals[idle] == scheduler._intervals[recent] == 21600
+    # Never synced: due within the first jitter window
+    assert now <= _due(scheduler, active) <= now + 90 + 1
+    assert now <= _due(scheduler, idle) <= now + 2160 + 1
+    # Synced an hour ago: due one jittered interval after that
+    assert now + 21600 * 0.9 - 3600 - 1 <= _due(scheduler, recent) <= now + 21600 * 1.1 - 3600 + 1
+
+    # A second refresh does not queue the same accounts twice
+    assert scheduler.refresh_accounts() == 0
+
+def test_synced_bank_activity_is_not_user_activity():
+    """An account whose recent rows all came from bank syncs stays on the idle interval"""
+    account_id = _create_account(active=False)
+    db = SessionLocal()
+    try:
+        account = db.get(BankAccount, account_id)
+        db.add(Transaction(user_id=account.user_id, from_account=account.account_number, amount=250.0,
+                           transaction_type="debit", description="UBER RIDE - Synced from bank",
+                           created_at=datetime.utcnow(), fingerprint=f"scheduler-test-{account_id}"))
+        db.commit()
+    finally:
+        db.close()
+    scheduler = _scheduler(FakeSyncService())
+
+    scheduler.refresh_accounts()
+    assert scheduler._intervals[account_id] == 21600
+
+def test_jitter_stays_within_the_ratio():
+    """Jittered intervals spread over +/- the jitter ratio"""
+    scheduler = _scheduler(FakeSyncService(), jitter_ratio=0.2)
+    samples = [scheduler._jittered(1000) for _ in range(2000)]
+    assert min(samples) >= 800 and max(samples) <= 1200
+    assert min(samples) < 850 and max(samples) > 1150
+
+def test_concurrent_syncs_are_capped():
+    """No more than max_concurrency syncs run at once and every due account is synced"""
+    service = FakeSyncService(seconds=0.05)
+    scheduler = _scheduler(service, max_concurrency=2)
+    account_ids = [_create_account(active=False) for _ in range(8)]
+
+    async def scenario():
+        now = time.time()
+        for account_id in account_ids:
+            scheduler._intervals[account_id] = 3600
+            scheduler._schedule(account_id, now)
+        # Skip the DB refresh so only these accounts are scheduled
+        scheduler._last_refresh = now
+        scheduler._task = asyncio.create_task(scheduler._run())
+        while scheduler.metrics()["syncs_completed"] < len(account_ids):
+            await asyncio.sleep(0.02)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sorted(service.synced) == sorted(account_ids)
+    assert service.peak_in_flight == 2
+    # Each synced account is queued again for its next interval
+    assert scheduler.metrics()["queue_depth"] == len(account_ids)
+    assert scheduler.metrics()["overdue"] == 0
+
+def test_slow_writes_pause_dispatching():
+    """Dispatching holds off while the write latency estimate is over the threshold"""
+    service = FakeSyncService()
+    scheduler = _scheduler(service, latency_threshold_ms=500)
+    account_id = _create_account(active=False)
+
+    async def scenario():
+        scheduler._intervals[account_id] = 3600
+        scheduler._schedule(account_id, time.time())
+        scheduler._last_refresh = time.time()
+        scheduler._write_latency_ms = 800
+        scheduler._task = asyncio.create_task(scheduler._run())
+        await asyncio.sleep(0.3)
+        paused = scheduler.metrics()["paused"], list(service.synced)
+        # The estimate decays while paused, so the overdue account is synced once the DB has had a break
+        while not service.synced:
+            await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return paused
+
+    (was_paused, synced_while_paused) = asyncio.run(scenario())
+    assert was_paused and synced_while_paused == []
+    assert service.synced == [account_id]
+    assert not scheduler.metrics()["paused"]
+
+def test_deleted_accounts_leave_the_schedule():
+    """Accounts deleted from the DB are dropped on refresh, or after a sync finds them gone"""
+    service = FakeSyncService()
+    scheduler = _scheduler(service)
+    kept = _create_account(active=False)
+    deleted = _create_account(active=False)
+    synced_after_delete = _create_account(active=False)
+    scheduler.refresh_accounts()
+    assert {kept, deleted, synced_after_delete} <= scheduler._queued
+
+    _delete_account(deleted)
+    scheduler.refresh_accounts()
+    assert deleted not in scheduler._queued and deleted not in scheduler._intervals
+    assert kept in scheduler._queued
+
+    async def scenario():
+        _delete_account(synced_after_delete)
+        scheduler._queued.discard(synced_after_delete)
+        scheduler._queue = [entry for entry in scheduler._queue if entry[1] != synced_after_delete]
+        scheduler._in_flight.add(synced_after_delete)
+        await scheduler._semaphore.acquire()
+        await scheduler._sync_account(synced_after_delete)
+
+    asyncio.run(scenario())
+    assert service.synced == [synced_after_delete]
+    assert synced_after_delete not in scheduler._queued and synced_after_delete not in scheduler._intervals
+    assert scheduler.metrics()["syncs_failed"] == 0
+
+if __name__ == "__main__":
+    print("Testing sync scheduler...")
+    test_active_users_get_the_shorter_interval()
+    test_synced_bank_activity_is_not_user_activity()
+    test_jitter_stays_within_the_ratio()
+    test_concurrent_syncs_are_capped()
+    test_slow_writes_pause_dispatching()
+    test_deleted_accounts_leave_the_schedule()
+    print("All sync scheduler tests passed")